@@ -1,54 +1,97 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
+
+from kneechat import perfil
+
+# Perfilado opcional por sección (KNEECHAT_PERFIL=1 o ?perfil=1 en la URL)
+perfilador = perfil.iniciar()
+perfil.seccion("Importaciones")
+
+# Los módulos de gráficos (plotly, matplotlib/seaborn, wordcloud) se importan
+# dentro de cada sección, al abrir la pestaña que los usa: la primera página
+# de un worker nuevo no espera a los de las pestañas cerradas
+from kneechat import arranque
+from kneechat.bootstrap import MIN_FRASES_IC
+from kneechat.calculo import METODOS_IC, estadisticas_entrevistas, tabla_distribucion_sentimiento
+from kneechat.cohortes import COHORTE_PRINCIPAL, comparar_categorias, comparar_sentimiento, leer_registro
+from kneechat.datos import cargar_dataset
+from kneechat.ingesta import DIR_ALMACEN, INTERVALO_REFRESCO, estado_ingesta
+from kneechat.navegador import navegador_frases
+from kneechat.recursos import COLOR_CARD_GENERAL, CSS_PAGINA, HTML_CARD, HTML_TITULO, html_logo
 
 # ---------------------------
 # Cargar dataset principal y mapeos
 # ---------------------------
-df = pd.read_excel("Dataset kneechat - ES.xlsx")
-df = df[df['tipo'] != 'Interacción Irrelevante']
-
-df_frases = pd.read_excel("Dataset kneechat - ES.xlsx")
+perfil.seccion("Carga de datos")
+# Cohortes registradas (hospitales/oleadas); sin registro, solo el dataset principal
+cohortes = leer_registro()
+if len(cohortes) > 1:
+    cohorte = st.sidebar.selectbox("Cohorte", cohortes, format_func=lambda c: c.nombre)
+else:
+    cohorte = cohortes[0]
+
+# Se lee una sola vez por versión del fichero y se comparte entre sesiones,
+# con sus vistas y columnas derivadas ya calculadas (datos.df_relevante,
+# datos.df_comentarios, datos.categorias, ...); sus DataFrames son de solo
+# lectura. Cada cohorte se carga al seleccionarla por primera vez. Al dataset
+# principal se le añaden las entrevistas ingeridas (kneechat.ingesta).
+almacen = DIR_ALMACEN if cohorte.id == COHORTE_PRINCIPAL else None
+estado = estado_ingesta(cargar_dataset(cohorte.ruta), almacen)
+datos = estado.datos
+
+# Conteos de frases y pacientes por categoría e indicadores (cards): una vez
+# por versión, y con solo las filas nuevas al ingerir entrevistas
+cubo = estado.cubo
+metricas = estado.metricas
+# Índices para las tablas de frases (filtrado y paginación en el servidor);
+# al ingerir entrevistas se amplían con solo las filas nuevas
+indice = estado.indices.frases
+busqueda = estado.indices.busqueda
 
 # ---------------------------
 # Configuración de la página y encabezados
 # ---------------------------
 st.set_page_config(page_title="📊Dashboard de Análisis de Texto", layout="wide")
 
+
+# Entrevistas nuevas: cada sesión comprueba el almacén cada pocos segundos (un
+# stat del manifiesto) y, si hay una versión nueva, vuelve a ejecutar la
+# página sin recargarla
+@st.fragment(run_every=INTERVALO_REFRESCO)
+def vigilar_ingesta():
+    if estado_ingesta(cargar_dataset(cohorte.ruta), almacen).datos.version != datos.version:
+        st.rerun(scope="app")
+
+
+if almacen is not None:
+    with st.sidebar:
+        vigilar_ingesta()
+        if estado.particiones:
+            st.caption(f"Entrevistas añadidas por ingesta: {estado.particiones}")
+
 # ---------------------------
 # Cabecera con logo + título
 # ---------------------------
-# Asegúrate de que 'chatbotlogo.png' esté en la misma carpeta que tu script,
-# o pon la ruta correcta (por ejemplo "assets/chatbotlogo.png")
-# Logo centrado arriba
-import base64
-from pathlib import Path
-import streamlit as st
-
-img_path = Path("chatbotlogo.png")
-if img_path.exists():
-    b64 = base64.b64encode(img_path.read_bytes()).decode()
-    data_uri = f"data:image/png;base64,{b64}"
-    st.markdown(f"<div style='text-align:center;'><img src='{data_uri}' width='140'></div>", unsafe_allow_html=True)
+perfil.seccion("Cabecera y logo")
+# Logo centrado arriba ('chatbotlogo.png' junto a app.py); el HTML con el
+# logo en base64 se construye una vez por proceso (kneechat.recursos)
+logo = html_logo()
+if logo is not None:
+    perfil.registrar(logo)
+    st.markdown(logo, unsafe_allow_html=True)
 else:
     st.error("Imagen no encontrada: chatbotlogo.png")
 
 # Título centrado debajo del logo
-st.markdown(
-    "<h1 style='text-align: center; font-size:calc(24px + 1.2vw); margin:6px 0; line-height:1.1;'>📊 Dashboard de KneeChat 🦿</h1>",
-    unsafe_allow_html=True
-)
+st.markdown(HTML_TITULO, unsafe_allow_html=True)
 
 
 
 st.header("Información del estudio")
-st.write("""
+st.write(f"""
 **Este tablero presenta la información cualitativa recopilada en el estudio:**
 **'Empleo de canales de comunicación digitales para la evaluación y detección de necesidades de información en pacientes pendientes de intervención de Artroplastia Total de Rodilla.'** Cuyo investigador principal es el Dr. Manuel Zapatero del Hospital Universitario Costa del Sol (Marbella, España).
 
-- Los datos fueron recolectados a través de **41 entrevistas telefónicas** realizadas a pacientes con diagnóstico de **gonartrosis de rodilla** y con un procedimiento pendiente de Artroplastia Total de Rodilla.
+- Los datos fueron recolectados a través de **{metricas.entrevistas} entrevistas telefónicas** realizadas a pacientes con diagnóstico de **gonartrosis de rodilla** y con un procedimiento pendiente de Artroplastia Total de Rodilla.
 """)
 
 st.header("Análisis de intervenciones/frases recogidas por pacientes en las entrevistas")
@@ -64,185 +107,341 @@ st.write("""
 # ---------------------------
 # Aumentar tamaño de fuente general mediante CSS
 # ---------------------------
-st.markdown(
-    """
-    <style>
-    p, div[class^="css"] {
-        font-size: 30px;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+st.markdown(CSS_PAGINA, unsafe_allow_html=True)
 
 # ---------------------------
 # 1. Indicadores (Cards)
 # ---------------------------
-entrevistas_count = 41
-frases_relevantes = df.shape[0]
+perfil.seccion("Indicadores generales")
+entrevistas_count = metricas.entrevistas
 
 st.markdown("### Indicadores Generales")
 col_card1, col_card2, col_card3, col_card4 = st.columns(4)
 
-# Definir estilo para todas las cards con un color uniforme
-card_style_general = """
-    <div style="padding: 10px; border-radius: 10px; background-color: #34a3d3; text-align: center; color: white;">
-        <h4 style="margin: 0;">{title}</h4>
-        <p style="font-size: 24px; font-weight: bold; margin: 5px 0;">{value}</p>
-    </div>
-"""
-
 # Mostrar los cards con el mismo color azul
-col_card1.markdown(card_style_general.format(title="Entrevistas realizadas", value=entrevistas_count), unsafe_allow_html=True)
-col_card2.markdown(card_style_general.format(title="Número total de frases de pacientes", value=635), unsafe_allow_html=True)
-col_card3.markdown(card_style_general.format(title="Comentarios espontáneos", value=230), unsafe_allow_html=True)
-col_card4.markdown(card_style_general.format(title="Preguntas o dudas", value=54), unsafe_allow_html=True)
+col_card1.markdown(HTML_CARD.format(title="Entrevistas realizadas", value=entrevistas_count, bg_color=COLOR_CARD_GENERAL), unsafe_allow_html=True)
+col_card2.markdown(HTML_CARD.format(title="Número total de frases de pacientes", value=metricas.frases_totales, bg_color=COLOR_CARD_GENERAL), unsafe_allow_html=True)
+col_card3.markdown(HTML_CARD.format(title="Comentarios espontáneos", value=metricas.frases_tipo("Comentario/reflexión"), bg_color=COLOR_CARD_GENERAL), unsafe_allow_html=True)
+col_card4.markdown(HTML_CARD.format(title="Preguntas o dudas", value=metricas.frases_tipo("Duda/pregunta"), bg_color=COLOR_CARD_GENERAL), unsafe_allow_html=True)
 
 
 
+# ---------------------------
+# Secciones en pestañas
+# ---------------------------
+# Solo se ejecuta la pestaña abierta (cambiar de pestaña vuelve a ejecutar el
+# script), y cada bloque con widgets es un fragmento: un cambio en sus
+# widgets vuelve a ejecutar y a enviar solo ese bloque, no toda la página.
+nombres_pestanas = ["Categorización general", "Dudas y reflexiones", "Análisis de sentimiento"]
+if len(cohortes) > 1:
+    nombres_pestanas.append("Comparación entre cohortes")
+pestanas = st.tabs(nombres_pestanas, key="pestana", on_change="rerun")
 
-import pandas as pd
-import plotly.graph_objects as go
-import streamlit as st
 
-# Cargar dataset de frases (se usa solo para la tabla/selección)
-df_frases = pd.read_excel("Dataset kneechat - ES.xlsx")
+# -----------------------------------------
+# Categorización general: selector para alternar entre Frases y Pacientes
+# -----------------------------------------
+@perfil.fragmento("Categorización General")
+def seccion_categorizacion():
+    from kneechat.graficos import figura_categorizacion
+
+    st.markdown('<h3 style="text-align: center;">Categorización General y Ejemplos de Frases</h3>', unsafe_allow_html=True)
+
+    # Selector (botón) — radio es apropiado para alternar vistas
+    choice = st.radio("Mostrar:", ["Frases", "Pacientes"], index=0, horizontal=True)
+
+    # Construir figura según elección (solo una métrica visible)
+    fig = figura_categorizacion(cubo, choice)
+
+    # Mostrar gráfico y tabla lado a lado
+    col_chart, col_table = st.columns(2)
+    with col_chart:
+        st.plotly_chart(fig, width="stretch")
+        perfil.registrar(fig)
+    with col_table:
+        selected_tipo_frase = st.selectbox("Selecciona el tipo de frase", datos.categorias["tipo"])
+        navegador_frases(
+            indice, "frases_tipo", busqueda=busqueda,
+            filtros={"tipo": selected_tipo_frase},
+            filtros_usuario=["num_entrevista"],
+        )
+
 
 # ---------------------------
-# Valores fijos (tal como indicaste)
+# Búsqueda de frases
 # ---------------------------
-fixed_total_frases = {
-    "Comentario/reflexión": 230,
-    "Duda/pregunta": 54,
-    "Sin interacción relevante": 351
-}
-total_frases = sum(fixed_total_frases.values())  # 635
-pacientes_totales = 41
-
-unique_counts_fixed = {
-    "Comentario/reflexión": 37,
-    "Duda/pregunta": 23,
-    "Sin interacción relevante": 4
-}
-
-tipos = ["Comentario/reflexión", "Duda/pregunta", "Sin interacción relevante"]
-
-# Valores para trazas y etiquetas (fijos)
-phrases_vals = [fixed_total_frases[t] for t in tipos]
-patients_vals = [unique_counts_fixed[t] for t in tipos]
-phrases_labels = [f"{(v / total_frases * 100):.1f}%\n({v})" for v in phrases_vals]
-patients_labels = [f"{(v / pacientes_totales * 100):.1f}%\n({v})" for v in patients_vals]
-
-# Hover text explicativo (fijos)
-hover_phrases = []
-hover_patients = []
-for i, t in enumerate(tipos):
-    v_f = phrases_vals[i]
-    pct_f = v_f / total_frases * 100
-    hover_phrases.append(
-        f"<b>Categoría:</b> {t}<br>"
-        f"<b>Métrica:</b> Frases en categoría: {v_f:,}<br>"
-        f"<b>Denominador (fijo):</b> total de frases = {total_frases:,}<br>"
-        f"<b>%:</b> {v_f:,} / {total_frases:,} = {pct_f:.1f}%"
+@perfil.fragmento("Búsqueda de frases")
+def seccion_busqueda():
+    st.markdown('<h3 style="text-align: center;">Búsqueda de frases</h3>', unsafe_allow_html=True)
+    st.write("Busca cualquier término en las frases de todas las entrevistas (sin distinguir mayúsculas ni acentos).")
+    navegador_frases(
+        indice, "frases_busqueda", busqueda=busqueda,
+        columnas=["frase", "tipo", "DudasFrecuentes", "Tiporeflexión", "num_entrevista"],
+        filtros_usuario=["tipo", "DudasFrecuentes", "Tiporeflexión"],
     )
 
-    v_p = patients_vals[i]
-    pct_p = v_p / pacientes_totales * 100
-    hover_patients.append(
-        f"<b>Categoría:</b> {t}<br>"
-        f"<b>Métrica:</b> Pacientes únicos en categoría: {v_p:,}<br>"
-        f"<b>Denominador (fijo):</b> total de pacientes = {pacientes_totales:,}<br>"
-        f"<b>%:</b> {v_p:,} / {pacientes_totales:,} = {pct_p:.1f}%"
-    )
 
-# -----------------------------------------
-# Selector para alternar entre Frases y Pacientes
-# -----------------------------------------
-st.markdown('<h3 style="text-align: center;">Categorización General y Ejemplos de Frases</h3>', unsafe_allow_html=True)
-
-# Selector (botón) — radio es apropiado para alternar vistas
-choice = st.radio("Mostrar:", ["Frases", "Pacientes"], index=0, horizontal=True)
-
-# Construir figura según elección (solo una métrica visible)
-if choice == "Frases":
-    fig = go.Figure()
-    fig.add_trace(
-        go.Bar(
-            x=tipos,
-            y=phrases_vals,
-            name=f"Frases (N: {total_frases})",
-            text=phrases_labels,
-            textposition="outside",
-            hovertext=hover_phrases,
-            hoverinfo="text",
-            marker=dict(line=dict(width=0))
+# Términos más frecuentes de una categoría: nube y tabla, desde el índice de
+# términos (uno por versión) y con la nube en la caché de PNG
+def terminos_categoria(dimension, categoria):
+    from kneechat.figuras import figura_nube_terminos
+
+    terminos = estado.indices.terminos
+    st.markdown(f"#### Términos más frecuentes: {categoria}")
+    col_nube, col_top = st.columns([2, 1])
+    png = figura_nube_terminos(terminos, datos.version, dimension, categoria)
+    if png is None:
+        col_nube.info("No hay términos para esta categoría.")
+    else:
+        col_nube.image(png, width="stretch")
+        perfil.registrar(png)
+    col_top.dataframe(terminos.top_terminos(dimension, categoria), hide_index=True, width="stretch")
+
+
+# 3.1 Dudas/Preguntas: gráfico y tabla de ejemplos
+@perfil.fragmento("Dudas/Preguntas")
+def seccion_dudas():
+    from kneechat.figuras import figura_barras_frecuencia
+
+    st.markdown("### Dudas/Preguntas")
+    col_dudas_chart, col_dudas_table = st.columns(2)
+
+    with col_dudas_chart:
+        tipo_seleccionado_dudas = st.multiselect(
+           "Selecciona qué frecuencia mostrar (Dudas):",
+           ["Frases", "Pacientes"],
+           default=["Frases", "Pacientes"]
+        )
+        # PNG cacheado por (versión, gráfico, selección); la figura se cierra al renderizar
+        png_fig2 = figura_barras_frecuencia(cubo, datos.version, "DudasFrecuentes", tipo_seleccionado_dudas)
+        st.image(png_fig2, width="stretch")
+        perfil.registrar(png_fig2)
+
+    with col_dudas_table:
+        categoria_dudas = st.selectbox(
+            "Selecciona una categoría de dudas:",
+            datos.categorias["DudasFrecuentes"]
+        )
+        navegador_frases(
+            indice, "frases_dudas", busqueda=busqueda,
+            filtros={"DudasFrecuentes": categoria_dudas},
+            filtros_usuario=["num_entrevista"],
         )
-    )
-    fig.update_layout(
-        title="Frases por tipo (N: 635)",
-        xaxis=dict(title=""),
-        yaxis=dict(title=f"Cantidad de frases (N: {total_frases})", rangemode="tozero", showgrid=True),
-        margin=dict(t=90, b=110, l=60, r=60),
-        uniformtext_minsize=9,
-        uniformtext_mode='hide'
-    )
 
-else:  # Pacientes
-    fig = go.Figure()
-    fig.add_trace(
-        go.Bar(
-            x=tipos,
-            y=patients_vals,
-            name=f"Pacientes únicos (N: {pacientes_totales})",
-            text=patients_labels,
-            textposition="outside",
-            hovertext=hover_patients,
-            hoverinfo="text",
-            marker=dict(line=dict(width=0))
+    terminos_categoria("DudasFrecuentes", categoria_dudas)
+
+
+# 3.2 Reflexiones/Comentarios: gráfico y tabla de ejemplos
+@perfil.fragmento("Reflexiones/Comentarios")
+def seccion_reflexiones():
+    from kneechat.figuras import figura_barras_frecuencia
+
+    col_reflexion_chart, col_reflexion_table = st.columns(2)
+
+    with col_reflexion_chart:
+        tipo_seleccionado_reflexion = st.multiselect(
+           "Selecciona qué frecuencia mostrar (Reflexiones):",
+           ["Frases", "Pacientes"],
+           default=["Frases", "Pacientes"]
+        )
+        # PNG cacheado por (versión, gráfico, selección); la figura se cierra al renderizar
+        png_fig3 = figura_barras_frecuencia(cubo, datos.version, "Tiporeflexión", tipo_seleccionado_reflexion)
+        st.image(png_fig3, width="stretch")
+        perfil.registrar(png_fig3)
+
+    with col_reflexion_table:
+        categoria_reflexion = st.selectbox(
+            "Selecciona una categoría de comentario:",
+            datos.categorias["Tiporeflexión"]
         )
+        navegador_frases(
+            indice, "frases_reflexion", busqueda=busqueda,
+            filtros={"Tiporeflexión": categoria_reflexion},
+            columnas=["frase", "sent_robertuito", "Sentimiento"],
+            filtros_usuario=["Sentimiento", "num_entrevista"],
+        )
+
+    terminos_categoria("Tiporeflexión", categoria_reflexion)
+
+
+# ---------------------------
+# Pacientes por categoría: co-ocurrencias y perfil de cada paciente, desde la
+# matriz dispersa pacientes x categorías (cacheada por versión)
+# ---------------------------
+ETIQUETAS_DIMENSION = {"DudasFrecuentes": "Dudas/preguntas", "Tiporeflexión": "Comentarios/reflexiones"}
+# Pacientes que se listan en el selector del perfil (el resto, acotando por categorías)
+MAX_PACIENTES_SELECTOR = 1000
+
+
+@perfil.fragmento("Pacientes por categoría")
+def seccion_pacientes():
+    from kneechat.graficos import figura_coocurrencia
+
+    matriz = estado.indices.pacientes
+    st.markdown("### Pacientes por categoría")
+    col_filas, col_columnas = st.columns(2)
+    dimension_filas = col_filas.selectbox(
+        "Categorías en filas:", list(ETIQUETAS_DIMENSION), format_func=ETIQUETAS_DIMENSION.get
     )
-    fig.update_layout(
-        title="Pacientes únicos por tipo (N: 41)",
-        xaxis=dict(title=""),
-        yaxis=dict(title=f"Pacientes únicos (N: {pacientes_totales})", rangemode="tozero", showgrid=True),
-        margin=dict(t=90, b=110, l=60, r=60),
-        uniformtext_minsize=9,
-        uniformtext_mode='hide'
+    dimension_columnas = col_columnas.selectbox(
+        "Categorías en columnas:", list(ETIQUETAS_DIMENSION), index=1, format_func=ETIQUETAS_DIMENSION.get
+    )
+    fig_coocurrencia = figura_coocurrencia(matriz.coocurrencia(dimension_filas, dimension_columnas))
+    st.plotly_chart(fig_coocurrencia, width="stretch")
+    perfil.registrar(fig_coocurrencia)
+
+    seleccion = st.multiselect(
+        "Pacientes que plantean todas estas categorías:",
+        [(dimension, categoria) for dimension in ETIQUETAS_DIMENSION for categoria in datos.categorias[dimension]],
+        format_func=lambda opcion: f"{ETIQUETAS_DIMENSION[opcion[0]]}: {opcion[1]}",
+    )
+    filas = matriz.filas_con(seleccion)
+    sentimiento = matriz.sentimiento_medio(filas)
+    col_pacientes, col_sentimiento = st.columns(2)
+    col_pacientes.metric("Pacientes", f"{len(filas):,}")
+    col_sentimiento.metric(
+        "Sentimiento medio por paciente",
+        f"{sentimiento.mean():.2f}" if sentimiento.notna().any() else "—",
+    )
+    if not len(filas):
+        st.info("Ningún paciente plantea todas las categorías seleccionadas.")
+        return
+    if len(filas) > MAX_PACIENTES_SELECTOR:
+        st.caption(f"Se listan los primeros {MAX_PACIENTES_SELECTOR:,} pacientes; añade categorías para acotar.")
+
+    paciente = st.selectbox("Perfil del paciente:", tuple(matriz.ids[filas[:MAX_PACIENTES_SELECTOR]]))
+    tabla_perfil, resumen = matriz.perfil(paciente)
+    col_perfil, col_resumen = st.columns([2, 1])
+    col_perfil.dataframe(tabla_perfil, hide_index=True, width="stretch")
+    col_resumen.metric("Frases", resumen["frases"])
+    col_resumen.metric("Comentarios", resumen["comentarios"])
+    col_resumen.metric(
+        "Sentimiento medio",
+        "—" if resumen["comentarios"] == 0 else f"{resumen['sentimiento']:.2f}",
+    )
+    navegador_frases(
+        indice, "frases_paciente",
+        filtros={"num_entrevista": paciente},
+        columnas=["frase", "tipo", "DudasFrecuentes", "Tiporeflexión", "Sentimiento"],
     )
 
-# Ajuste de fuente de etiqueta multilínea para que quepa mejor
-fig.update_traces(textfont=dict(size=11, family="Arial"))
-
-# Mostrar gráfico y tabla lado a lado
-col_chart, col_table = st.columns(2)
-with col_chart:
-    st.plotly_chart(fig, use_container_width=True)
-with col_table:
-    selected_tipo_frase = st.selectbox("Selecciona el tipo de frase", df_frases["tipo"].unique())
-    filtered_frases = df_frases[df_frases["tipo"] == selected_tipo_frase].reset_index(drop=True)
-    st.dataframe(filtered_frases[["frase"]].reset_index(drop=True), use_container_width=True)
 
+###########################################
+@perfil.fragmento("Sentimiento por entrevista")
+def seccion_sentimiento_entrevistas():
+    from kneechat.dispersion import UMBRAL_BANDAS, figura_sentimiento_entrevistas
+
+    # Intervalo de confianza (IC ~95%): bootstrap por percentiles (cacheado por
+    # versión) o aproximación normal con 1.96·SEM
+    col_ic, col_min_frases = st.columns(2)
+    metodo_ic = col_ic.radio("Intervalo de confianza:", METODOS_IC, index=0, horizontal=True)
+    min_frases = col_min_frases.number_input(
+        "Mínimo de comentarios por entrevista:", min_value=MIN_FRASES_IC, max_value=20, value=MIN_FRASES_IC,
+        step=1, help=f"Con menos de {MIN_FRASES_IC} comentarios el IC de una entrevista no es estimable.",
+    )
 
+    # Media por entrevista de los comentarios, ordenada por sentimiento. Las
+    # entrevistas con muy pocos comentarios no tienen un IC estimable y se
+    # excluyen del gráfico (en lugar de descartar a mano la de mayor IC).
+    df_sorted, excluidas = estadisticas_entrevistas(
+        datos, metodo_ic, min_frases, ic=estado.indices.intervalos
+    )
 
+    # Con muchas entrevistas el gráfico pasa a WebGL y después a bandas de
+    # cuantiles calculadas en el servidor; el rango permite acercarse a un tramo
+    if len(df_sorted) > UMBRAL_BANDAS:
+        desde, hasta = st.slider(
+            "Entrevistas a detallar (ordenadas por sentimiento):",
+            0, len(df_sorted), (0, len(df_sorted)),
+        )
+        df_sorted = df_sorted.iloc[desde:hasta]
+    fig_sentimiento, modo_sentimiento = figura_sentimiento_entrevistas(df_sorted)
+
+    st.plotly_chart(fig_sentimiento, width="stretch")
+    perfil.registrar(fig_sentimiento)
+    if modo_sentimiento == "bandas":
+        st.caption(
+            f"{len(df_sorted):,} entrevistas: se muestra la mediana por tramos con bandas de cuantiles. "
+            f"Acota el rango a {UMBRAL_BANDAS:,} entrevistas o menos para ver cada entrevista."
+        )
+    if excluidas:
+        st.caption(
+            f"{excluidas} entrevista(s) con menos de {min_frases} comentarios no se muestran: "
+            "con tan pocas frases el intervalo de confianza no es estimable."
+        )
 
 
+@perfil.fragmento("Tabla de frases con sentimiento")
+def seccion_tabla_sentimiento():
+    navegador_frases(
+        indice, "frases_sentimiento", busqueda=busqueda,
+        filtros={"tipo": "Comentario/reflexión"},
+        columnas=["frase", "sent_robertuito", "Tiporeflexión", "Sentimiento"],
+        filtros_usuario=["Tiporeflexión", "Sentimiento", "num_entrevista"],
+    )
 
 
 # ---------------------------
-# 3. Reorganización de Gráficos 2 y 3 con sus Tablas
+# Comparación entre cohortes (a partir de los resúmenes precalculados)
 # ---------------------------
+@perfil.fragmento("Comparación entre cohortes")
+def seccion_cohortes():
+    import plotly.express as px
 
-st.subheader("--------------------------------------------------------")
+    st.markdown("## Comparación entre cohortes")
+    cohortes_comparadas = st.multiselect(
+        "Cohortes a comparar:", cohortes, default=cohortes, format_func=lambda c: c.nombre
+    )
+    if cohortes_comparadas:
+        dimension_comparada = st.selectbox(
+            "Categorías a comparar:", ["tipo", "DudasFrecuentes", "Tiporeflexión"],
+            format_func={"tipo": "Tipo de frase", "DudasFrecuentes": "Dudas/preguntas",
+                         "Tiporeflexión": "Comentarios/reflexiones"}.get,
+        )
+        df_comparacion = comparar_categorias(cohortes_comparadas, dimension_comparada)
+        fig_comparacion = px.bar(
+            df_comparacion, x=dimension_comparada, y="% frases", color="Cohorte", barmode="group",
+            hover_data=["Frases", "Pacientes", "% pacientes"],
+            labels={dimension_comparada: ""},
+            title="Porcentaje de frases por categoría y cohorte",
+        )
+        st.plotly_chart(fig_comparacion, width="stretch")
+        perfil.registrar(fig_comparacion)
+
+        df_sent_cohortes = comparar_sentimiento(cohortes_comparadas)
+        fig_sent_cohortes = px.scatter(
+            df_sent_cohortes, x="Cohorte", y="media",
+            error_y=df_sent_cohortes["ic_superior"] - df_sent_cohortes["media"],
+            hover_data=["Entrevistas", "Negativas", "Positivas", "Neutras"],
+            labels={"media": "Sentimiento medio por entrevista"},
+            title="Sentimiento medio por cohorte (IC ~95%)",
+        )
+        fig_sent_cohortes.add_hline(y=0, line_dash="dash", line_color="grey", opacity=0.3)
+        st.plotly_chart(fig_sent_cohortes, width="stretch")
+        perfil.registrar(fig_sent_cohortes)
 
 
+# ---------------------------
+# Pestaña 1: categorización general y búsqueda
+# ---------------------------
+with pestanas[0]:
+    if pestanas[0].open:
+        seccion_categorizacion()
+        seccion_busqueda()
 
 
-st.header("Frases y pacientes por categoría")
+# ---------------------------
+# Pestaña 2: frases y pacientes por categoría (dudas y reflexiones)
+# ---------------------------
+with pestanas[1]:
+    if pestanas[1].open:
+        perfil.seccion("Frases y pacientes por categoría")
+        st.header("Frases y pacientes por categoría")
 
-st.write("**En una segunda fase, la clasificación se profundizó aún más utilizando Grandes Modelos de Lenguaje (LLM)**")
-st.subheader("❓ Clasificación de dudas/preguntas")
-st.write("""
-Las frases que reflejaban **necesidad de información (54 en total)** fueron categorizadas con base en la guía de **Preguntas Frecuentes sobre Prótesis Total de Rodilla**, que abarca los siguientes temas:
+        st.write("**En una segunda fase, la clasificación se profundizó aún más utilizando Grandes Modelos de Lenguaje (LLM)**")
+        st.subheader("❓ Clasificación de dudas/preguntas")
+        st.write(f"""
+Las frases que reflejaban **necesidad de información ({cubo.frases("tipo", "Duda/pregunta")} en total)** fueron categorizadas con base en la guía de **Preguntas Frecuentes sobre Prótesis Total de Rodilla**, que abarca los siguientes temas:
 
 1️⃣ **Información general sobre la artroplastia de rodilla:** Explica qué es el procedimiento, su necesidad y comparaciones con otras intervenciones.  
 2️⃣ **Preparación para la cirugía:** Consejos sobre cómo prepararse física y mentalmente, incluyendo cambios en el estilo de vida y adaptaciones en el hogar.  
@@ -258,60 +457,15 @@ Las frases que reflejaban **necesidad de información (54 en total)** fueron cat
 🕒 **Logística y tiempos de espera:** Debido a la cantidad de preguntas sobre este tema, se agregó una categoría específica para abordar consultas sobre tiempos de espera, costos, trámites administrativos y pruebas preoperatorias.  
 """)
 
-# 3.1 Dudas/Preguntas: gráfico y tabla de ejemplos
-st.markdown("### Dudas/Preguntas")
-col_dudas_chart, col_dudas_table = st.columns(2)
-
-with col_dudas_chart:
-    tipo_seleccionado_dudas = st.multiselect(
-       "Selecciona qué frecuencia mostrar (Dudas):",
-       ["Frases", "Pacientes"],
-       default=["Frases", "Pacientes"]
-    )
-    df_dudas = df.groupby("DudasFrecuentes").agg(
-        Frases=("DudasFrecuentes", "count"),
-        Pacientes=("num_entrevista", "nunique")
-    ).reset_index().sort_values(by="Frases", ascending=False)
-    df_dudas_melted = df_dudas.melt(id_vars="DudasFrecuentes", var_name="Tipo", value_name="Frecuencia")
-    df_dudas_melted = df_dudas_melted[df_dudas_melted["Tipo"].isin(tipo_seleccionado_dudas)]
-    
-    fig2, ax2 = plt.subplots(figsize=(8, 5))
-    sns.barplot(
-        data=df_dudas_melted,
-        x="Frecuencia",
-        y="DudasFrecuentes",
-        hue="Tipo",
-        palette={"Frases": "#34a3d3", "Pacientes": "#b7b7bd"},
-        ax=ax2
-    )
-    ax2.set_yticklabels(ax2.get_yticklabels(), rotation=0, ha="right")
-    ax2.set_xlabel("Frecuencia")
-    ax2.set_ylabel("")
-    ax2.legend(title="Tipo")
-    for container in ax2.containers:
-        ax2.bar_label(container, fmt='%d', label_type='edge', fontsize=10)
-    plt.tight_layout()
-    st.pyplot(fig2)
-
-
-with col_dudas_table:
-    categoria_dudas = st.selectbox(
-        "Selecciona una categoría de dudas:",
-        df["DudasFrecuentes"].dropna().unique()
-    )
-    df_dudas_table = df[df["DudasFrecuentes"] == categoria_dudas][[ "frase"]]
-    st.dataframe(df_dudas_table, use_container_width=True)
-
-st.subheader("--------------------------------------------------------")
-st.subheader("--------------------------------------------------------")
+        seccion_dudas()
 
-# 3.2 Reflexiones/Comentarios: gráfico y tabla de ejemplos
-st.markdown("### Reflexiones/Comentarios")
+        st.subheader("--------------------------------------------------------")
+        st.markdown("### Reflexiones/Comentarios")
 
-st.subheader("📌 Clasificación de comentarios/reflexiones")
+        st.subheader("📌 Clasificación de comentarios/reflexiones")
 
-st.write("""
-Para las frases en las que los pacientes expresaban reflexiones o comentarios, que fueron **230**, se establecieron las siguientes categorías:
+        st.write(f"""
+Para las frases en las que los pacientes expresaban reflexiones o comentarios, que fueron **{cubo.frases("tipo", "Comentario/reflexión")}**, se establecieron las siguientes categorías:
 
 ✅ **Dolor/Complicaciones:** Relacionadas con dolor, sufrimiento o complicaciones físicas derivadas de la rodilla.  
 ✅ **Deseo de operarse:** Expresan urgencia por la cirugía o críticas sobre la espera prolongada.  
@@ -321,289 +475,79 @@ Para las frases en las que los pacientes expresaban reflexiones o comentarios, q
 ✅ **Otros:** Frases que no encajan en las categorías anteriores.  
 """)
 
+        seccion_reflexiones()
 
+        st.subheader("--------------------------------------------------------")
+        seccion_pacientes()
 
-col_reflexion_chart, col_reflexion_table = st.columns(2)
 
-with col_reflexion_chart:
-    tipo_seleccionado_reflexion = st.multiselect(
-       "Selecciona qué frecuencia mostrar (Reflexiones):",
-       ["Frases", "Pacientes"],
-       default=["Frases", "Pacientes"]
-    )
-    df_reflexion = df.groupby("Tiporeflexión").agg(
-        Frases=("Tiporeflexión", "count"),
-        Pacientes=("num_entrevista", "nunique")
-    ).reset_index().sort_values(by="Frases", ascending=False)
-    df_reflexion_melted = df_reflexion.melt(id_vars="Tiporeflexión", var_name="Tipo", value_name="Frecuencia")
-    df_reflexion_melted = df_reflexion_melted[df_reflexion_melted["Tipo"].isin(tipo_seleccionado_reflexion)]
-    
-    fig3, ax3 = plt.subplots(figsize=(8, 5))
-    sns.barplot(
-        data=df_reflexion_melted,
-        x="Frecuencia",
-        y="Tiporeflexión",
-        hue="Tipo",
-        palette={"Frases": "#34a3d3", "Pacientes": "#b7b7bd"},
-        ax=ax3
-    )
-    ax3.set_yticklabels(ax3.get_yticklabels(), rotation=0, ha="right")
-    ax3.set_xlabel("Frecuencia")
-    ax3.set_ylabel("")
-    ax3.legend(title="Tipo")
-    for container in ax3.containers:
-        ax3.bar_label(container, fmt='%d', label_type='edge', fontsize=10)
-    plt.tight_layout()
-    st.pyplot(fig3)
-
-with col_reflexion_table:
-    categoria_reflexion = st.selectbox(
-        "Selecciona una categoría de comentario:",
-        df["Tiporeflexión"].dropna().unique()
-    )
-    df_reflexion_table = df[df["Tiporeflexión"] == categoria_reflexion][[ "frase"]]
-    st.dataframe(df_reflexion_table, use_container_width=True)
+# ---------------------------
+# Pestaña 3: análisis de sentimiento
+# ---------------------------
+with pestanas[2]:
+    if pestanas[2].open:
+        perfil.seccion("Análisis de sentimiento")
+        # Sección "Análisis de Sentimiento"
+        st.markdown("## Análisis de Sentimiento")
 
+        st.write("El análisis de sentimiento es una técnica de procesamiento del lenguaje natural que permite identificar y evaluar las emociones expresadas en un texto. En este caso, se aplica a los comentarios y reflexiones obtenidos en las entrevistas para determinar si el tono general es positivo, negativo o neutral.")
 
+        st.write("La puntuación de sentimiento se representa en una escala de -1 a 1, donde los valores negativos indican sentimientos negativos, los valores positivos reflejan sentimientos positivos y los valores cercanos a 0 representan un tono neutral. Esta puntuación se obtiene mediante modelos de análisis de texto y permite identificar patrones emocionales en los datos recopilados.")
 
-###########################################
+        st.write("*Para esta parte del Análisis se usaron solo las frases categorizadas como Comentario/reflexión ya que eran las que expresaban algún sentimiento o emoción*")
 
 
-st.subheader("--------------------------------------------------------")
-st.subheader("--------------------------------------------------------")
+        st.markdown("### Datos Generales")
+
+        col_card5, col_card6, col_card7, col_card8 = st.columns(4)
+
+        # Valores de los cards a partir del motor de métricas
+        media_sent, ic_inf_sent, ic_sup_sent = metricas.sentimiento_medio()
+        entrevistas_sent = metricas.entrevistas_por_sentimiento()
+        total_entrevistas_sent = sum(entrevistas_sent.values())
+
+        def formato_entrevistas(n):
+            pct = n / total_entrevistas_sent * 100 if total_entrevistas_sent else 0
+            return f"{n} ({pct:.0f}%)"
+
+        # Mostrar los cards con colores personalizados
+        col_card5.markdown(HTML_CARD.format(title="Promedio General de Sentimiento", value=f"*{media_sent:.2f}* \nIC:[{ic_inf_sent:.3f}, {ic_sup_sent:.3f}]", bg_color="#FF4B4B"), unsafe_allow_html=True)
+        col_card6.markdown(HTML_CARD.format(title="Entrevistas Negativas (Promedio)", value=formato_entrevistas(entrevistas_sent["Negativas"]), bg_color="#D9534F"), unsafe_allow_html=True)
+        col_card7.markdown(HTML_CARD.format(title="Entrevistas Positivas (Promedio)", value=formato_entrevistas(entrevistas_sent["Positivas"]), bg_color="#5CB85C"), unsafe_allow_html=True)
+        col_card8.markdown(HTML_CARD.format(title="Entrevistas Neutras", value=formato_entrevistas(entrevistas_sent["Neutras"]), bg_color="#5BC0DE"), unsafe_allow_html=True)
+
+        seccion_sentimiento_entrevistas()
 
-def clasificar_sentimiento(sent):
-    if sent < -0.6:
-        return 'Muy negativo'
-    elif sent < -0.3:
-        return 'Negativo'
-    elif sent > 0.6:
-        return 'Muy positivo'
-    elif sent > 0.3:
-        return 'Positivo'
-    else:
-        return 'Neutral'
-
-# Crear la columna 'Sentimiento'
-df['Sentimiento'] = df['sent_robertuito'].apply(clasificar_sentimiento)
-
-
-import plotly.express as px
-import pandas as pd
-
-# Filtrar solo el tipo "Comentario/reflexión"
-df_comentarioreflexion = df[df["tipo"] == "Comentario/reflexión"].copy()
-df_comentarioreflexion['num_entrevista'] = df_comentarioreflexion['num_entrevista'].astype(str)
-
-# Agrupar por 'num_entrevista' y calcular la media, SEM y cantidad de frases
-df_grouped = df_comentarioreflexion.groupby('num_entrevista', as_index=False).agg({
-    'sent_robertuito': ['mean', 'sem', 'count']
-})
-df_grouped.columns = ['num_entrevista', 'mean_robertuito', 'sem_robertuito', 'count_frases']
-
-# Clasificar sentimiento (se asume que la función clasificar_sentimiento está definida)
-df_grouped['Sentimiento'] = df_grouped['mean_robertuito'].apply(clasificar_sentimiento)
-
-# Calcular el intervalo de confianza (IC ~95%)
-df_grouped['ci_robertuito'] = 1.96 * df_grouped['sem_robertuito']
-idx_max_ci = df_grouped['ci_robertuito'].idxmax()
-
-# Eliminar ese registro del dataframe
-df_grouped = df_grouped.drop(idx_max_ci).reset_index(drop=True)
-# Mapeo de colores para cada categoría de sentimiento
-color_dict = {
-    "Muy negativo": "darkred",
-    "Negativo": "lightcoral",
-    "Neutral": "gray",
-    "Positivo": "lightgreen",
-    "Muy positivo": "darkgreen"
-}
-
-df_grouped['point_size'] = df_grouped['count_frases'] * 2  # Ajusta el factor de escala según sea necesario
-# Crear gráfico interactivo con Plotly Express
-df_sorted = df_grouped.sort_values("mean_robertuito").reset_index(drop=True)
-
-# Crear el gráfico con el dataframe ordenado
-fig_sentimiento = px.scatter(
-    df_sorted,
-    x=df_sorted.index,  # ahora el índice ya representa el orden
-    y="mean_robertuito",
-    color="Sentimiento",
-    color_discrete_map=color_dict,
-    error_y="ci_robertuito",
-    labels={
-        "index": "Entrevistas ordenadas por sentimiento",  
-        "mean_robertuito": "Puntuación de Sentimiento"
-    },
-    title="Sentimientos Promedio por Entrevista (IC ~95%)",
-    size="point_size",
-    hover_data={
-        "count_frases": True,
-        "mean_robertuito": ':.2f',
-        "num_entrevista": True  # mostramos el número real de entrevista en hover
-    }
-)
-
-fig_sentimiento.update_layout(
-    title_x=0.4  # Centra el título horizontalmente
-
-)
-
-
-fig_sentimiento.update_layout(
-    title_x=0.1,
-    legend_title_text="",   # centra el título
-    legend=dict(
-        orientation="h",   # horizontal -> todos los elementos en una fila
-        xanchor="left",  # centra la fila de la leyenda
-        yanchor="middle",
-        x=0.0,
-        y=1.1,
-        traceorder="normal", 
-        bgcolor="rgba(0,0,0,0)",
-        borderwidth=0
-    ),
-    margin=dict(t=140)  # deja espacio arriba para título + leyenda
-)
-
-
-# Agregar líneas horizontales de referencia
-fig_sentimiento.add_hline(y=0.3, line_dash="dash", line_color="green", opacity=0.3)
-fig_sentimiento.add_hline(y=0, line_dash="dash", line_color="grey", opacity=0.3)
-fig_sentimiento.add_hline(y=-0.3, line_dash="dash", line_color="red", opacity=0.3)
-
-# Actualizar hovertemplate para incluir información detallada
-fig_sentimiento.update_traces(
-    hovertemplate=(
-        "<b>Entrevista: %{x}</b><br>" +
-        "Puntuación: %{y:.2f}<br>" +
-        "Cantidad de frases: %{customdata[0]}<extra></extra>"
-    ),
-    customdata=df_grouped[['count_frases', 'num_entrevista']].values,
-
-    
-)
-
-# Sección "Análisis de Sentimiento"
-st.markdown("## Análisis de Sentimiento")
-
-st.write("El análisis de sentimiento es una técnica de procesamiento del lenguaje natural que permite identificar y evaluar las emociones expresadas en un texto. En este caso, se aplica a los comentarios y reflexiones obtenidos en las entrevistas para determinar si el tono general es positivo, negativo o neutral.")
-
-st.write("La puntuación de sentimiento se representa en una escala de -1 a 1, donde los valores negativos indican sentimientos negativos, los valores positivos reflejan sentimientos positivos y los valores cercanos a 0 representan un tono neutral. Esta puntuación se obtiene mediante modelos de análisis de texto y permite identificar patrones emocionales en los datos recopilados.")
-
-st.write("*Para esta parte del Análisis se usaron solo las frases categorizadas como Comentario/reflexión ya que eran las que expresaban algún sentimiento o emoción*")
-
-
-st.markdown("### Datos Generales")
-
-col_card5, col_card6, col_card7, col_card8 = st.columns(4)
-
-
-card_style = """
-    <div style="padding: 10px; border-radius: 10px; background-color: {bg_color}; text-align: center; color: white;">
-        <h4 style="margin: 0;">{title}</h4>
-        <p style="font-size: 24px; font-weight: bold; margin: 5px 0;">{value}</p>
-    </div>
-"""
-
-# Mostrar los cards con colores personalizados
-col_card5.markdown(card_style.format(title="Promedio General de Sentimiento", value="*-0.22* \nIC:[-0.281, -0.149]", bg_color="#FF4B4B"), unsafe_allow_html=True)
-col_card6.markdown(card_style.format(title="Entrevistas Negativas (Promedio)", value="12 (40%)", bg_color="#D9534F"), unsafe_allow_html=True)
-col_card7.markdown(card_style.format(title="Entrevistas Positivas (Promedio)", value="3 (10%)", bg_color="#5CB85C"), unsafe_allow_html=True)
-col_card8.markdown(card_style.format(title="Entrevistas Neutras", value="15 (50%)", bg_color="#5BC0DE"), unsafe_allow_html=True)
-
-
-st.plotly_chart(fig_sentimiento, use_container_width=True)
-
-
-################################
-
-# Definir el orden de sentimientos y los colores
-sentiment_order = ["Muy negativo", "Negativo", "Neutral", "Positivo", "Muy positivo"]
-color_dict = {
-    "Muy negativo": "darkred",
-    "Negativo": "lightcoral",
-    "Neutral": "gray",
-    "Positivo": "lightgreen",
-    "Muy positivo": "darkgreen"
-}
-
-# Contar cantidad de frases por categoría de sentimiento
-sentiment_counts = df_comentarioreflexion["Sentimiento"].value_counts().reindex(sentiment_order, fill_value=0)
-sentiment_percent = (sentiment_counts / sentiment_counts.sum()) * 100
-
-# Crear DataFrame para visualización
-df_percent = pd.DataFrame({
-    "Sentimiento": sentiment_order,
-    "Porcentaje": sentiment_percent.values,
-    "Cantidad de frases": sentiment_counts.values
-})
-df_percent["dummy"] = "Total"  # Columna dummy para generar una única barra
-
-# Crear gráfico de barra 100% apilado horizontalmente con Plotly Express,
-# usando custom_data para que cada segmento tenga su "Cantidad de frases"
-fig_sentimiento_bar = px.bar(
-    df_percent,
-    x="Cantidad de frases",
-    y="dummy",
-    color="Sentimiento",
-    text="Porcentaje",
-    orientation="h",
-    custom_data=["Cantidad de frases"],
-    color_discrete_map=color_dict,
-    labels={"Cantidad de frases": "Cantidad de frases", "dummy": ""},
-    title="Porcentaje de Frases por Categoría de Sentimiento",
-    hover_data={"Cantidad de frases": True}
-)
-
-fig_sentimiento_bar.update_layout(
-    title="",
-    legend_title_text="",
-    legend=dict(
-        orientation="h",   # horizontal -> todos los elementos en una fila
-        xanchor="left",  # centra la fila de la leyenda
-        yanchor="middle",
-        x=0.0,
-        y=1,
-        traceorder="normal", 
-        bgcolor="rgba(0,0,0,0)",
-        borderwidth=0
-    )# deja espacio arriba para título + leyenda
-)
-
-# Configurar el gráfico para que sea 100% apilado
-fig_sentimiento_bar.update_layout(
-    barmode="stack",
-    barnorm="percent"
-)
 
-# Actualizar formato de etiquetas y tooltips:
-# - Texto centrado, en negrita y de mayor tamaño dentro de cada segmento.
-# - Tooltip que muestra correctamente la cantidad de frases de cada segmento.
-fig_sentimiento_bar.update_traces(
-    texttemplate="%{text:.1f}%",
-    textposition="inside",
-    textfont=dict(size=18, color="white", family="Arial Black"),
-    hovertemplate="<b>%{fullData.name}</b><br>Porcentaje: %{x:.1f}%<br>Cantidad de frases: %{customdata[0]}<extra></extra>"
-)
+        ################################
+        perfil.seccion("Distribución de sentimiento")
+        from kneechat.graficos import figura_distribucion_sentimiento
 
-st.markdown("## Distribución de Sentimiento")
-st.plotly_chart(fig_sentimiento_bar, use_container_width=True)
-
-
-
-#categoria_sentimiento = st.selectbox(
-#        "Selecciona una categoría de sentimiento:",
-#        df_comentarioreflexion["Sentimiento"].dropna().unique()
-#    )
-df__table = df_comentarioreflexion[["frase","sent_robertuito","Tiporeflexión", "Sentimiento"]]
-
-
-st.dataframe(df__table, use_container_width=True)
+        # Porcentaje de comentarios por categoría de sentimiento (una única barra 100% apilada)
+        df_percent = tabla_distribucion_sentimiento(metricas.comentarios_por_sentimiento())
+        fig_sentimiento_bar = figura_distribucion_sentimiento(df_percent)
 
+        st.markdown("## Distribución de Sentimiento")
+        st.plotly_chart(fig_sentimiento_bar, width="stretch")
+        perfil.registrar(fig_sentimiento_bar)
+
+        seccion_tabla_sentimiento()
+
+
+# ---------------------------
+# Pestaña 4: comparación entre cohortes
+# ---------------------------
+if len(cohortes) > 1:
+    with pestanas[3]:
+        if pestanas[3].open:
+            seccion_cohortes()
 
 
 #########################
 ########################
 
+perfilador.finalizar()
 
+# Primera ejecución del proceso: el resto de cachés (otras pestañas, gráficos)
+# se llenan en segundo plano, ya enviada esta página
+arranque.precalentar_en_segundo_plano()
@@ -0,0 +1,163 @@
+"""
+Tiempo hasta la primera página de un worker nuevo (arranque en frío).
+
+Copia el árbol (sin .kneechat_cache ni __pycache__, como un despliegue
+nuevo) a un directorio temporal, arranca el servidor y mide:
+
+    arranque          desde lanzar el proceso hasta que responde el health check
+    primera página    desde ahí hasta que termina la primera ejecución de una
+                      sesión que se conecta en ese momento
+    total             lanzar el proceso -> primera página (lo que espera el
+                      primer usuario si llega con el worker arrancando)
+    pestaña <n>       primera apertura de cada una de las otras pestañas,
+                      --pausa segundos después de la primera página (lo que
+                      tarda el usuario en leerla; 0 = el peor caso)
+
+Compara la revisión base (antes del cambio, con `streamlit run app.py`) con
+el árbol de trabajo arrancado con `streamlit run` y con
+`python -m kneechat.arranque` (precalentamiento antes de aceptar conexiones).
+Cada configuración arranca --repeticiones workers nuevos y da la mediana.
+
+Uso:
+    python benchmarks/bench_arranque.py [--base HEAD~1] [--repeticiones 3] [--pausa 5] [--sintetico 100000]
+"""
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+
+from bench_reejecucion import TIMEOUT_ARRANQUE, Sesion, puerto_libre
+from comun import RAIZ, parser_benchmark
+
+PESTANAS = ("Dudas y reflexiones", "Análisis de sentimiento")
+OPCIONES_SERVIDOR = ["--server.headless", "true", "--browser.gatherUsageStats", "false"]
+
+
+def copiar_arbol(revision, destino):
+    """Ficheros de la revisión (o del árbol de trabajo si es None) en destino."""
+    if revision is None:
+        ficheros = subprocess.run(
+            ["git", "ls-files", "-co", "--exclude-standard"], cwd=RAIZ, check=True,
+            capture_output=True, text=True,
+        ).stdout.splitlines()
+        for fichero in ficheros:
+            if (RAIZ / fichero).is_file():
+                (destino / fichero).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(RAIZ / fichero, destino / fichero)
+    else:
+        archivo = subprocess.run(
+            ["git", "archive", revision], cwd=RAIZ, check=True, capture_output=True
+        ).stdout
+        with tarfile.open(fileobj=BytesIO(archivo)) as tar:
+            tar.extractall(destino)
+
+
+def comando(modo, puerto):
+    if modo == "arranque":
+        return [sys.executable, "-m", "kneechat.arranque", "--server.port", str(puerto)] + OPCIONES_SERVIDOR
+    return [sys.executable, "-m", "streamlit", "run", "app.py", "--server.port", str(puerto)] + OPCIONES_SERVIDOR
+
+
+async def primera_visita(puerto, pausa):
+    """(primera página, {pestaña: primera apertura}) en segundos."""
+    import websockets
+
+    async with websockets.connect(
+        f"ws://localhost:{puerto}/_stcore/stream", max_size=None, subprotocols=["streamlit"]
+    ) as ws:
+        sesion = Sesion(ws)
+        primera, _ = await sesion.ejecutar()
+        await asyncio.sleep(pausa)
+        pestanas = {}
+        for pestana in PESTANAS:
+            cambio = await sesion.abrir_pestana(pestana)
+            pestanas[pestana] = cambio[0] if cambio is not None else None
+    return primera, pestanas
+
+
+def medir_worker(arbol, modo, entorno, pausa):
+    puerto = puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        comando(modo, puerto), cwd=arbol, env=entorno,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        limite = time.monotonic() + TIMEOUT_ARRANQUE
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://localhost:{puerto}/_stcore/health", timeout=1):
+                    break
+            except OSError:
+                if time.monotonic() > limite or proceso.poll() is not None:
+                    raise RuntimeError(f"el servidor no arrancó ({modo})")
+                time.sleep(0.05)
+        arranque = time.perf_counter() - inicio
+        primera, pestanas = asyncio.run(primera_visita(puerto, pausa))
+    finally:
+        proceso.terminate()
+        proceso.wait()
+    medidas = {"arranque": arranque, "primera página": primera, "total": arranque + primera}
+    medidas.update({f"pestaña {pestana}": segundos for pestana, segundos in pestanas.items()})
+    return medidas
+
+
+def medir(nombre, revision, modo, repeticiones, entorno, pausa):
+    medidas = []
+    for _ in range(repeticiones):
+        with tempfile.TemporaryDirectory() as arbol:
+            arbol = Path(arbol)
+            copiar_arbol(revision, arbol)
+            medidas.append(medir_worker(arbol, modo, dict(entorno, PYTHONPATH=str(arbol)), pausa))
+    resumen = {
+        clave: round(statistics.median(m[clave] for m in medidas) * 1000)
+        for clave in medidas[0] if all(m[clave] is not None for m in medidas)
+    }
+    print(f"{nombre}:")
+    for clave, ms in resumen.items():
+        print(f"  {clave:<34} {ms:7d} ms")
+    return resumen
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--base", default="HEAD~1", help="revisión de git de antes del cambio")
+    parser.add_argument("--repeticiones", type=int, default=3, help="workers nuevos por configuración")
+    parser.add_argument("--pausa", type=float, default=0,
+                        help="segundos entre la primera página y abrir las otras pestañas")
+    parser.add_argument("--sintetico", type=int, default=0,
+                        help="usar un corpus sintético de N frases (kneechat.sintetico)")
+    parser.add_argument("--json", help="guardar el resultado en este fichero")
+    args = parser.parse_args()
+
+    entorno = dict(os.environ)
+    if args.sintetico:
+        from kneechat.sintetico import dataset_sintetico
+
+        # Fuera del árbol copiado: se genera una vez y se comparte
+        entorno["KNEECHAT_DATASET"] = str(dataset_sintetico(args.sintetico, origen=RAIZ / "Dataset kneechat - ES.xlsx"))
+
+    configuraciones = [
+        (f"{args.base}, streamlit run", args.base, "run"),
+        ("árbol actual, streamlit run", None, "run"),
+        ("árbol actual, python -m kneechat.arranque", None, "arranque"),
+    ]
+    resultado = {
+        nombre: medir(nombre, revision, modo, args.repeticiones, entorno, args.pausa)
+        for nombre, revision, modo in configuraciones
+    }
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
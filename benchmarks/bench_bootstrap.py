@@ -0,0 +1,84 @@
+"""
+IC bootstrap por entrevista: un bucle de remuestreo por entrevista frente a
+kneechat.bootstrap (una sola matriz n_boot × n_frases y np.add.reduceat).
+
+Antes de medir comprueba que el resultado es reproducible con la misma
+semilla, que coincide con la referencia en bucle (mismos percentiles salvo el
+error de Monte Carlo), que las entrevistas con menos de MIN_FRASES_IC frases no
+tienen IC y que cada IC contiene su media.
+
+Uso:
+    python benchmarks/bench_bootstrap.py [--entrevistas 20000] [--n-boot 2000]
+"""
+import numpy as np
+import pandas as pd
+
+from comun import Cronometro, parser_benchmark
+from kneechat.bootstrap import MIN_FRASES_IC, ic_bootstrap
+
+# Tolerancia entre referencia y versión vectorizada (error de Monte Carlo)
+TOLERANCIA = 0.03
+
+
+def ic_en_bucle(valores, grupos, n_boot, semilla):
+    """Referencia: un remuestreo independiente por entrevista."""
+    rng = np.random.default_rng(semilla)
+    filas = {}
+    for grupo, serie in pd.Series(valores).groupby(grupos):
+        x = serie.to_numpy()
+        medias = rng.choice(x, size=(n_boot, len(x))).mean(axis=1)
+        filas[grupo] = np.quantile(medias, [0.025, 0.975])
+    return pd.DataFrame(filas, index=["ic_inferior", "ic_superior"]).T
+
+
+def corpus(entrevistas, rng):
+    # Comentarios por entrevista como en el libro: de 1 a 20, mediana ~5
+    n = np.minimum(rng.geometric(1 / 6, size=entrevistas), 20)
+    grupos = np.repeat([f"P_{i}" for i in range(entrevistas)], n)
+    centros = np.repeat(rng.uniform(-0.8, 0.8, size=entrevistas), n)
+    valores = np.clip(centros + rng.normal(0, 0.3, size=len(grupos)), -1, 1)
+    return valores, grupos
+
+
+def comprobar(valores, grupos, n_boot):
+    ic = ic_bootstrap(valores, grupos, n_boot, semilla=1)
+    assert ic.equals(ic_bootstrap(valores, grupos, n_boot, semilla=1)), "no reproducible con la misma semilla"
+
+    pocas = ic["n"] < MIN_FRASES_IC
+    assert ic.loc[pocas, ["ic_inferior", "ic_superior"]].isna().all().all()
+    validos = ic[~pocas]
+    assert ((validos["ic_inferior"] <= validos["media"] + 1e-12)
+            & (validos["media"] <= validos["ic_superior"] + 1e-12)).all(), "IC que no contiene la media"
+
+    # Con pocas frases las medias remuestreadas son discretas y los percentiles
+    # saltan entre valores vecinos: el máximo solo se exige con >= 8 frases.
+    referencia = ic_en_bucle(valores, grupos, n_boot, semilla=2).loc[validos.index]
+    diferencias = np.abs(referencia.to_numpy() - validos[["ic_inferior", "ic_superior"]].to_numpy())
+    assert diferencias.mean() < TOLERANCIA / 3, f"difiere de la referencia en {diferencias.mean():.3f} de media"
+    maxima = diferencias[validos["n"].to_numpy() >= 8].max()
+    assert maxima < TOLERANCIA, f"difiere de la referencia en {maxima:.3f}"
+    return maxima
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--entrevistas", type=int, default=20_000)
+    parser.add_argument("--n-boot", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    diferencia = comprobar(*corpus(200, rng), n_boot=20_000)
+    print(f"reproducibilidad, mínimo de frases y referencia en bucle: OK (dif. máx. {diferencia:.4f})")
+
+    valores, grupos = corpus(args.entrevistas, rng)
+    with Cronometro() as bucle:
+        ic_en_bucle(valores, grupos, args.n_boot, semilla=0)
+    with Cronometro() as vector:
+        ic_bootstrap(valores, grupos, args.n_boot, semilla=0)
+    t_bucle, t_vector = bucle.segundos, vector.segundos
+    print(f"{args.entrevistas} entrevistas, {len(valores)} frases, {args.n_boot} remuestreos: "
+          f"bucle {t_bucle:.2f} s, vectorizado {t_vector:.2f} s (x{t_bucle / t_vector:.1f})")
+
+
+if __name__ == "__main__":
+    main()
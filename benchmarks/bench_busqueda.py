@@ -0,0 +1,42 @@
+"""
+Benchmark del índice de búsqueda de frases.
+
+Replica las frases del libro hasta el tamaño pedido, construye el índice y
+mide la latencia de consultas típicas de los analistas.
+
+Uso:
+    python benchmarks/bench_busqueda.py [--frases 500000]
+"""
+import statistics
+
+import numpy as np
+
+from comun import Cronometro, parser_benchmark, tiempos
+from kneechat.busqueda import IndiceBusqueda
+from kneechat.datos import leer_dataset
+
+CONSULTAS = ["anestesia", "espera", "dolor", "tiempo de espera operación", "rehabilitación rodilla"]
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--frases", type=int, default=500_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    frases = leer_dataset().df["frase"]
+    repeticiones = int(np.ceil(args.frases / len(frases)))
+    corpus = frases.iloc[np.tile(np.arange(len(frases)), repeticiones)[:args.frases]]
+
+    with Cronometro() as t:
+        indice = IndiceBusqueda(corpus)
+    print(f"construcción ({len(corpus)} frases, {len(indice.vocabulario)} términos): {t.segundos:.2f} s")
+
+    for consulta in CONSULTAS:
+        _, segundos = tiempos(lambda: indice.buscar(consulta, limite=100), args.repeticiones)
+        print(f"{consulta!r:<32} mediana {statistics.median(segundos) * 1000:7.2f} ms "
+              f"({len(indice.puntuar(consulta)[0])} coincidencias)")
+
+
+if __name__ == "__main__":
+    main()
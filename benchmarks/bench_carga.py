@@ -0,0 +1,44 @@
+"""
+Benchmark de la carga del dataset.
+
+Compara la lectura directa del libro (lo que hacía app.py en cada rerun, tres
+veces) con la carga cacheada de kneechat.datos.
+
+Uso:
+    python benchmarks/bench_carga.py [--repeticiones 5]
+"""
+from comun import parser_benchmark, tiempos
+from kneechat import datos
+
+
+def medir(funcion, repeticiones):
+    _, segundos = tiempos(funcion, repeticiones)
+    return min(segundos), sum(segundos) / len(segundos)
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    def rerun_original():
+        for _ in range(3):
+            datos.leer_excel()
+
+    def carga_fria():
+        datos.limpiar_cache()
+        datos.cargar_dataset()
+
+    datos.cargar_dataset()
+
+    resultados = {
+        "rerun original (3x read_excel)": medir(rerun_original, args.repeticiones),
+        "cargar_dataset en frío": medir(carga_fria, args.repeticiones),
+        "cargar_dataset en caliente": medir(datos.cargar_dataset, args.repeticiones),
+    }
+    for nombre, (minimo, media) in resultados.items():
+        print(f"{nombre:<34} min {minimo * 1000:9.2f} ms   media {media * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
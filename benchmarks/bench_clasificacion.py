@@ -0,0 +1,103 @@
+"""
+Pipeline de clasificación (kneechat.clasificacion): precisión y rendimiento.
+
+Muestra la validación cruzada de cada modelo sobre el libro (la que decide
+qué columnas se escriben), mide el rendimiento (frases/s) clasificando las frases de un corpus
+sintético con hilos y con procesos, y vuelve a medir con la caché ya
+llena. Comprueba que todas las variantes dan las mismas etiquetas, que
+las subcategorías solo aparecen en su tipo, que las columnas que no
+superan a la clase mayoritaria quedan vacías y que el resultado se agrupa
+con kneechat.calculo como las filas del libro.
+
+Uso:
+    python benchmarks/bench_clasificacion.py [--frases 100000] [--trabajadores 1 2 4]
+"""
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from comun import Cronometro, parser_benchmark
+from kneechat import snapshot
+from kneechat.calculo import frecuencias_categorias
+from kneechat.clasificacion import (
+    COLUMNAS, SUBCATEGORIAS, CachePredicciones, Clasificador, clasificar_frases, etiquetar,
+)
+from kneechat.datos import RUTA_DATASET
+from kneechat.sintetico import dataset_sintetico
+
+
+def comprobar(resultado, fiables):
+    for columna in COLUMNAS:
+        if columna not in fiables:
+            assert resultado[columna].isna().all()
+            assert resultado[f"confianza_{columna}"].isna().all()
+    for columna, tipo in SUBCATEGORIAS.items():
+        otros = resultado["tipo"] != tipo
+        assert resultado.loc[otros, columna].isna().all()
+        assert resultado.loc[otros, f"confianza_{columna}"].isna().all()
+        if columna in fiables:
+            assert resultado.loc[~otros, columna].notna().all()
+    confianzas = resultado["confianza_tipo"]
+    assert ((confianzas > 0) & (confianzas <= 1)).all()
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--frases", type=int, default=100_000)
+    parser.add_argument("--trabajadores", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--lote", type=int, default=4096)
+    args = parser.parse_args()
+
+    libro = snapshot.leer_origen(RUTA_DATASET)
+    with Cronometro() as t:
+        clasificador = Clasificador(libro)
+    print(f"entrenamiento con validación cruzada: {t.segundos:.2f} s (modelo {clasificador.version})")
+    print("acierto / clase mayoritaria (filas):")
+    for columna, (acierto, referencia, filas) in clasificador.validacion.items():
+        escribe = "" if columna in clasificador.fiables else "  -> no se escribe"
+        print(f"  {columna:<16} {acierto:.3f} / {referencia:.3f} ({filas}){escribe}")
+
+    # Frases de un corpus sintético, sin etiquetas
+    df = snapshot.leer_origen(dataset_sintetico(args.frases))
+    df[list(COLUMNAS)] = None
+    frases = df["frase"].astype(str).tolist()
+    unicas = len(set(frases))
+    print(f"{len(frases):,} frases ({unicas:,} distintas), lotes de {args.lote}")
+
+    referencia = None
+    with tempfile.TemporaryDirectory() as directorio:
+        for procesos in (False, True):
+            for trabajadores in args.trabajadores:
+                cache = CachePredicciones(Path(directorio) / f"{procesos}_{trabajadores}.sqlite")
+                with Cronometro() as t:
+                    resultado = clasificar_frases(frases, clasificador, cache=cache, tamano_lote=args.lote,
+                                                  trabajadores=trabajadores, procesos=procesos)
+                segundos = t.segundos
+                modo = "procesos" if procesos else "hilos"
+                print(f"  {modo:<8} x{trabajadores}: {segundos:7.2f} s  {unicas / segundos:10,.0f} frases/s")
+                if referencia is None:
+                    referencia = resultado
+                    comprobar(resultado, clasificador.fiables)
+                else:
+                    assert resultado[list(COLUMNAS)].equals(referencia[list(COLUMNAS)])
+                    assert np.allclose(resultado["confianza_tipo"], referencia["confianza_tipo"], atol=1e-6)
+
+        # Segunda pasada con la caché llena: solo búsquedas en SQLite
+        with Cronometro() as t:
+            en_cache = clasificar_frases(frases, clasificador, cache=cache)
+        segundos = t.segundos
+        print(f"  caché llena:  {segundos:7.2f} s  {len(frases) / segundos:10,.0f} frases/s")
+        assert en_cache[list(COLUMNAS)].equals(referencia[list(COLUMNAS)])
+
+        # Las etiquetas alimentan las mismas agrupaciones que las del libro
+        etiquetado, n = etiquetar(df, clasificador, cache=cache)
+        assert n == len(df)
+        tabla = frecuencias_categorias(etiquetado, "tipo")
+        assert tabla["Frases"].sum() == len(df)
+        assert set(tabla["tipo"]) <= set(libro["tipo"].dropna())
+    print("comprobaciones: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Tamaño y tiempo del gráfico de sentimiento por entrevista según el número de
+entrevistas (puntos, WebGL o bandas de cuantiles).
+
+Comprueba que el JSON de la figura nunca supera MAX_BYTES_FIGURA, que cada
+modo se elige en su umbral y que al acotar el rango (drill-down) se vuelven a
+ver los puntos individuales.
+
+Uso:
+    python benchmarks/bench_dispersion.py [--entrevistas 41 1000 5000 100000 1000000]
+"""
+import numpy as np
+import pandas as pd
+
+from comun import Cronometro, parser_benchmark
+from kneechat.dispersion import (
+    MAX_BYTES_FIGURA, UMBRAL_BANDAS, UMBRAL_WEBGL, figura_sentimiento_entrevistas,
+)
+from kneechat.sentimiento import bucketizar_sentimiento
+
+
+def entrevistas_sinteticas(n, rng):
+    """DataFrame con las columnas que app.py pasa al gráfico, ya ordenado."""
+    frases = rng.integers(3, 21, size=n)
+    df = pd.DataFrame({
+        "num_entrevista": [f"P_{i}" for i in range(n)],
+        "mean_robertuito": np.sort(rng.uniform(-1, 1, size=n)),
+        "ci_sup": rng.uniform(0, 0.4, size=n),
+        "ci_inf": rng.uniform(0, 0.4, size=n),
+        "count_frases": frases,
+        "point_size": frases * 2,
+    })
+    df["Sentimiento"] = bucketizar_sentimiento(df["mean_robertuito"])
+    return df
+
+
+def medir(df):
+    with Cronometro() as t:
+        fig, modo = figura_sentimiento_entrevistas(df)
+        tamano = len(fig.to_json().encode("utf-8"))
+    return modo, tamano, t.segundos
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--entrevistas", type=int, nargs="+",
+                        default=[41, UMBRAL_WEBGL, UMBRAL_BANDAS, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in sorted(set(args.entrevistas + [UMBRAL_WEBGL + 1, UMBRAL_BANDAS + 1])):
+        modo, tamano, segundos = medir(entrevistas_sinteticas(n, rng))
+        esperado = "bandas" if n > UMBRAL_BANDAS else "webgl" if n > UMBRAL_WEBGL else "puntos"
+        assert modo == esperado, f"{n} entrevistas: modo {modo}, se esperaba {esperado}"
+        assert tamano <= MAX_BYTES_FIGURA, f"{n} entrevistas: {tamano} bytes > {MAX_BYTES_FIGURA}"
+        print(f"{n:>9} entrevistas  {modo:<7} {tamano / 1024:7.1f} KiB  {segundos * 1000:7.1f} ms")
+
+    # Drill-down: un tramo de UMBRAL_BANDAS entrevistas vuelve a mostrar puntos
+    df = entrevistas_sinteticas(100_000, rng)
+    tramo = df.iloc[50_000:50_000 + UMBRAL_BANDAS]
+    modo, tamano, _ = medir(tramo)
+    assert modo == "webgl" and tamano <= MAX_BYTES_FIGURA
+    print(f"tramo de {len(tramo)} entrevistas: {modo}, {tamano / 1024:.1f} KiB")
+    print(f"tope de {MAX_BYTES_FIGURA / 1024:.0f} KiB: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Crecimiento de memoria de la caché de figuras en muchos reruns.
+
+Simula cientos de reruns alternando las selecciones de los multiselect de
+Dudas y Reflexiones y comprueba que ni las figuras abiertas de pyplot ni la
+memoria del proceso crecen con el número de reruns.
+
+Uso:
+    python benchmarks/bench_figuras.py [--reruns 500]
+"""
+import itertools
+import resource
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+from comun import Cronometro, parser_benchmark  # noqa: E402
+from kneechat import figuras  # noqa: E402
+from kneechat.agregados import CuboAgregados  # noqa: E402
+from kneechat.datos import leer_dataset  # noqa: E402
+
+SELECCIONES = [["Frases", "Pacientes"], ["Frases"], ["Pacientes"], ["Pacientes", "Frases"]]
+# Margen de RSS permitido tras el calentamiento, en KiB
+MARGEN_RSS_KIB = 20 * 1024
+
+
+def rss_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--reruns", type=int, default=500)
+    args = parser.parse_args()
+
+    datos = leer_dataset()
+    cubo = CuboAgregados(datos.df, datos.df_relevante)
+    combinaciones = itertools.cycle(
+        itertools.product(SELECCIONES, SELECCIONES)
+    )
+
+    def rerun():
+        sel_dudas, sel_reflexion = next(combinaciones)
+        figuras.figura_barras_frecuencia(cubo, datos.version, "DudasFrecuentes", sel_dudas)
+        figuras.figura_barras_frecuencia(cubo, datos.version, "Tiporeflexión", sel_reflexion)
+
+    # Calentamiento: recorre todas las combinaciones una vez
+    with Cronometro() as frio:
+        for _ in range(len(SELECCIONES) ** 2):
+            rerun()
+    rss_base = rss_kib()
+
+    with Cronometro() as caliente:
+        for _ in range(args.reruns):
+            rerun()
+    rss_final = rss_kib()
+
+    print(f"calentamiento ({len(SELECCIONES) ** 2} reruns): {frio.ms:8.1f} ms")
+    print(f"{args.reruns} reruns cacheados:       {caliente.ms:8.1f} ms")
+    print(f"figuras abiertas en pyplot: {len(plt.get_fignums())}")
+    print(f"entradas en caché: {len(figuras._cache)}  ({figuras._cache.bytes_totales() / 1024:.0f} KiB)")
+    print(f"RSS: {rss_base} KiB -> {rss_final} KiB")
+
+    assert not plt.get_fignums(), "quedan figuras de pyplot sin cerrar"
+    assert len(figuras._cache) <= figuras._cache.max_entradas
+    assert rss_final - rss_base < MARGEN_RSS_KIB, "la memoria crece con los reruns"
+
+    # Sin caché: cada rerun renderiza, pero las figuras deben cerrarse igual
+    figuras.limpiar_cache()
+    rss_base = rss_kib()
+    for _ in range(args.reruns // 5):
+        figuras.limpiar_cache()
+        rerun()
+    print(f"sin caché, {args.reruns // 5} reruns: RSS {rss_base} KiB -> {rss_kib()} KiB, "
+          f"figuras abiertas {len(plt.get_fignums())}")
+    assert not plt.get_fignums(), "quedan figuras de pyplot sin cerrar"
+
+
+if __name__ == "__main__":
+    main()
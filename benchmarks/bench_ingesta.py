@@ -0,0 +1,182 @@
+"""
+Ingesta de entrevistas nuevas (kneechat.ingesta): coste por lote y corrección.
+
+Genera entrevistas sintéticas nuevas (un fichero por entrevista) en un
+directorio de entrada temporal, más un par de ficheros inválidos, y las
+ingiere por lotes sobre el libro o sobre un corpus sintético. Tras cada lote
+mide la actualización incremental del dataset, de sus agregados (cubo y
+métricas) y de sus índices (frases, búsqueda, términos, pacientes e
+intervalos bootstrap, todos ya calculados, como en un dashboard en uso) y la
+compara con recalcularlo todo sobre el corpus completo. Comprueba que los
+ficheros inválidos se rechazan, que lo incremental coincide con lo
+recalculado y que los estados anteriores no cambian.
+
+Uso:
+    python benchmarks/bench_ingesta.py [--sintetico 100000] [--entrevistas 40] [--lote 10]
+"""
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from comun import Cronometro, parser_benchmark
+from kneechat import snapshot
+from kneechat.agregados import DIMENSIONES, CuboAgregados
+from kneechat.bootstrap import ic_comentarios
+from kneechat.busqueda import IndiceBusqueda
+from kneechat.calculo import distribucion_sentimiento, frecuencias_categorias
+from kneechat.calculo import tabla_distribucion_sentimiento
+from kneechat.datos import RUTA_DATASET, Dataset, leer_dataset
+from kneechat.ingesta import COLUMNAS, INDICES, Almacen, DatosVivos, ingerir
+from kneechat.metricas import MetricasKPI
+from kneechat.navegador import IndiceFrases
+from kneechat.pacientes import MatrizPacientes
+from kneechat.sintetico import ModeloCorpus, dataset_sintetico
+from kneechat.terminos import DIMENSIONES as DIMENSIONES_TERMINOS
+from kneechat.terminos import IndiceTerminos
+
+CONSULTAS = ["anestesia", "espera", "dolor", "tiempo de espera operación", "rehabilitación rodilla"]
+
+
+def escribir_entrevistas(directorio, n_entrevistas, semilla=0):
+    """Un .parquet por entrevista nueva (N_<n>), con la forma del libro."""
+    modelo = ModeloCorpus(snapshot.leer_origen(RUTA_DATASET))
+    rng = np.random.default_rng(semilla)
+    bloque, _ = modelo.generar_bloque(int(n_entrevistas * modelo.frases_por_entrevista.mean()), rng, 1)
+    bloque["num_entrevista"] = bloque["num_entrevista"].str.replace("S_", "N_")
+    for i, (entrevista, filas) in enumerate(bloque.groupby("num_entrevista", sort=False)):
+        filas[list(COLUMNAS)].to_parquet(Path(directorio) / f"{i:04d}_{entrevista}.parquet", index=False)
+    return bloque
+
+
+def recalcular(datos):
+    """Dataset, agregados e índices de todas las filas, desde cero."""
+    datos = Dataset(datos.df, "completo")
+    return (
+        datos,
+        CuboAgregados(datos.df, datos.df_relevante),
+        MetricasKPI.desde_dataframe(datos.df),
+        IndiceFrases(datos.df),
+        IndiceBusqueda(datos.df["frase"]),
+        IndiceTerminos.desde_dataframe(datos.df),
+        MatrizPacientes.desde_dataframe(datos.df),
+        ic_comentarios(datos.df_comentarios),
+    )
+
+
+def comprobar_indices(estado, completo):
+    """Los índices incrementales coinciden con los recalculados."""
+    datos, _, _, frases, busqueda, terminos, _, ic = completo
+    indices = estado.indices
+    for columna, codigos in frases._codigos.items():
+        assert np.array_equal(indices.frases._codigos[columna], codigos), columna
+        assert indices.frases.valores(columna) == frases.valores(columna), columna
+    assert len(indices.frases) == len(datos.df)
+    for consulta in CONSULTAS:
+        posiciones, puntuaciones = busqueda.puntuar(consulta)
+        incremental = indices.busqueda.puntuar(consulta)
+        assert np.array_equal(incremental[0], posiciones), consulta
+        assert np.allclose(incremental[1], puntuaciones, rtol=1e-5), consulta
+    for dimension in DIMENSIONES_TERMINOS:
+        assert indices.terminos.categorias[dimension].keys() == terminos.categorias[dimension].keys()
+        for categoria in terminos.categorias[dimension]:
+            a = indices.terminos.top_terminos(dimension, categoria, None)
+            b = terminos.top_terminos(dimension, categoria, None)
+            # Los empates pueden salir en otro orden
+            assert a.sort_values("Término", ignore_index=True).equals(
+                b.sort_values("Término", ignore_index=True)), (dimension, categoria)
+    # Las entrevistas nuevas se remuestrean aparte: mismas medias y n, IC con otro ruido
+    intervalos = indices.intervalos
+    assert intervalos.index.equals(ic.index)
+    assert np.allclose(intervalos["media"], ic["media"]) and intervalos["n"].equals(ic["n"])
+
+
+def comprobar(estado):
+    """Los agregados incrementales coinciden con recalcularlos sobre estado.datos."""
+    datos = estado.datos
+    for dimension in DIMENSIONES:
+        origen = datos.df if dimension == "tipo" else datos.df_relevante
+        assert estado.cubo.tabla(dimension).equals(frecuencias_categorias(origen, dimension)), dimension
+    assert estado.cubo.frases_totales == len(datos.df) == estado.metricas.frases_totales
+    assert estado.cubo.pacientes_totales == datos.df["num_entrevista"].nunique() == estado.metricas.entrevistas
+    completo = MetricasKPI.desde_dataframe(datos.df).por_entrevista()
+    incremental = estado.metricas.por_entrevista().loc[completo.index]
+    assert np.allclose(incremental.to_numpy(), completo.to_numpy(), equal_nan=True)
+    assert tabla_distribucion_sentimiento(estado.metricas.comentarios_por_sentimiento()).equals(
+        distribucion_sentimiento(datos.df_relevante))
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--sintetico", type=int, default=0,
+                        help="usar como base un corpus sintético de N frases en lugar del libro")
+    parser.add_argument("--entrevistas", type=int, default=40)
+    parser.add_argument("--lote", type=int, default=10, help="ficheros por lote de ingesta")
+    args = parser.parse_args()
+
+    base = leer_dataset(dataset_sintetico(args.sintetico) if args.sintetico else RUTA_DATASET)
+    print(f"base: {len(base.df):,} frases, {base.df['num_entrevista'].nunique():,} entrevistas")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+        generados = directorio / "generados"
+        generados.mkdir()
+        escribir_entrevistas(generados, args.entrevistas)
+        ficheros = sorted(generados.iterdir())
+        # Inválidos: una entrevista que ya está en la base y un fichero sin columnas del esquema
+        repetida = base.df[base.df["num_entrevista"] == base.df["num_entrevista"].iat[0]]
+        invalidos = {"repetida.csv": repetida[list(COLUMNAS)], "sin_tipo.csv": repetida[["frase"]]}
+
+        entrada = directorio / "entrada"
+        entrada.mkdir()
+        almacen = Almacen(directorio / "almacen")
+        existentes = set(base.df["num_entrevista"].astype(str))
+        with Cronometro() as t:
+            vivos = DatosVivos(base, almacen)
+        print(f"agregados iniciales: {t.ms:.1f} ms")
+        for nombre, df in invalidos.items():
+            df.to_csv(entrada / nombre, index=False)
+
+        anteriores = []
+        for inicio_lote in range(0, len(ficheros), args.lote):
+            lote = ficheros[inicio_lote:inicio_lote + args.lote]
+            for fichero in lote:
+                fichero.replace(entrada / fichero.name)
+            with Cronometro() as t_ingesta:
+                ingeridos, rechazados = ingerir(entrada, almacen, existentes)
+            assert len(ingeridos) == len(lote)
+            if inicio_lote == 0:
+                assert sorted(nombre for nombre, _ in rechazados) == sorted(invalidos)
+                assert (entrada / "rechazados" / "sin_tipo.csv.errores.txt").exists()
+
+            anterior = vivos.estado
+            for nombre in INDICES:  # las sesiones ya han pedido todos los índices
+                getattr(anterior.indices, nombre)
+            anteriores.append((anterior, anterior.cubo.frases_totales, len(anterior.datos.df),
+                               anterior.indices.busqueda.n_frases, len(anterior.indices.intervalos)))
+            with Cronometro() as t_incremental:
+                estado = vivos.actualizar()
+            assert estado.particiones == inicio_lote + len(lote)
+            assert vivos.actualizar() is estado  # sin cambios en el almacén: nada que hacer
+
+            with Cronometro() as t_completo:
+                completo = recalcular(estado.datos)
+            frases = sum(p["frases"] for p in ingeridos)
+            print(f"  lote de {len(lote)} entrevistas ({frases} frases): ingesta {t_ingesta.ms:7.1f} ms, "
+                  f"actualización {t_incremental.ms:6.1f} ms, recalcular todo {t_completo.ms:7.1f} ms")
+            comprobar(estado)
+            comprobar_indices(estado, completo)
+
+        # Los estados publicados antes no cambian al actualizar
+        for anterior, frases, filas, indexadas, entrevistas in anteriores:
+            assert anterior.cubo.frases_totales == frases == anterior.metricas.frases_totales
+            assert len(anterior.datos.df) == filas == len(anterior.indices.frases) == indexadas
+            assert anterior.indices.busqueda.n_frases == indexadas
+            assert len(anterior.indices.intervalos) == entrevistas
+        print(f"final: {len(estado.datos.df):,} frases, {estado.cubo.pacientes_totales:,} entrevistas, "
+              f"versión {estado.datos.version}")
+    print("comprobaciones: OK")
+
+
+if __name__ == "__main__":
+    main()
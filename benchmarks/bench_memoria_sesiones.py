@@ -0,0 +1,124 @@
+"""
+Memoria por sesión: el Dataset se comparte y no se copia en cada sesión.
+
+Abre sesiones del dashboard (AppTest) en un mismo proceso, como las de un
+servidor de Streamlit, y las mantiene vivas. Cada una recorre las tres
+pestañas. Tras cada tanda mide la memoria de Python retenida (tracemalloc;
+el RSS se muestra, pero el allocator reutiliza memoria liberada y es ruidoso)
+y calcula cuánto añade cada sesión nueva. Con el Dataset compartido ese coste
+es solo el estado de los widgets (sobre todo las opciones del filtro de
+entrevista) y se mantiene estable al aumentar las sesiones. Si cada sesión
+copiara el DataFrame, crecería en su tamaño por sesión.
+
+Comprueba que el coste por sesión es una fracción pequeña del tamaño del
+Dataset, que no crece con el número de sesiones y que el Dataset compartido
+rechaza modificaciones en el sitio.
+
+Uso:
+    python benchmarks/bench_memoria_sesiones.py [--sintetico 100000] [--sesiones 1 2 4 8 16]
+"""
+import gc
+import os
+import tracemalloc
+
+from comun import RAIZ, parser_benchmark
+
+# Coste máximo por sesión, como fracción de la memoria del Dataset
+MAX_FRACCION_SESION = 0.25
+# Una tanda puede costar por sesión como mucho esto veces la primera
+MAX_CRECIMIENTO = 1.5
+PESTANAS = ("Categorización general", "Dudas y reflexiones", "Análisis de sentimiento")
+
+
+def rss_actual():
+    """RSS actual del proceso en bytes (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def abrir_sesion():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(RAIZ / "app.py"), default_timeout=600)
+    for pestana in PESTANAS:
+        at.session_state["pestana"] = pestana
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return at
+
+
+def comprobar_solo_lectura(datos):
+    intentos = {
+        "asignar columna": lambda: datos.df.__setitem__("x", 0),
+        "asignar con loc": lambda: datos.df_relevante.loc.__setitem__((datos.df_relevante.index[0], "frase"), ""),
+        "inplace": lambda: datos.df_comentarios.sort_values("sent_robertuito", inplace=True),
+        "atributo del Dataset": lambda: setattr(datos, "df", None),
+    }
+    for nombre, intento in intentos.items():
+        try:
+            intento()
+        except TypeError:
+            continue
+        raise AssertionError(f"el Dataset compartido admite '{nombre}'")
+    derivado = datos.df[datos.df["tipo"] == datos.df["tipo"].iat[0]]
+    derivado["x"] = 0  # los DataFrames derivados son normales
+    assert "x" not in datos.df.columns
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--sintetico", type=int, default=100_000,
+                        help="corpus sintético de N frases (0: el libro)")
+    parser.add_argument("--sesiones", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    if args.sintetico:
+        from kneechat.sintetico import dataset_sintetico
+
+        os.environ["KNEECHAT_DATASET"] = str(dataset_sintetico(args.sintetico, origen=RAIZ / "Dataset kneechat - ES.xlsx"))
+    os.chdir(RAIZ)
+    from kneechat.datos import RUTA_DATASET, cargar_dataset  # lee KNEECHAT_DATASET al importarse
+
+    datos = cargar_dataset(RUTA_DATASET)
+    comprobar_solo_lectura(datos)
+    memoria_dataset = sum(
+        df.memory_usage(deep=True).sum() for df in (datos.df, datos.df_relevante, datos.df_comentarios)
+    )
+    print(f"{RUTA_DATASET.name}: {len(datos.df):,} frases, Dataset {memoria_dataset / 2**20:.1f} MiB")
+
+    # Una sesión previa llena las cachés compartidas (índices, figuras, ...),
+    # también las del precalentamiento en segundo plano que lanza app.py
+    sesiones = [abrir_sesion()]
+    from kneechat.arranque import esperar_precalentamiento
+
+    esperar_precalentamiento()
+    gc.collect()
+    tracemalloc.start()
+    rss_base, base = rss_actual(), tracemalloc.get_traced_memory()[0]
+    anterior, n_anterior = None, len(sesiones)
+    costes = []
+    for objetivo in sorted(args.sesiones):
+        while len(sesiones) < objetivo + 1:
+            sesiones.append(abrir_sesion())
+        gc.collect()
+        retenida = tracemalloc.get_traced_memory()[0]
+        if anterior is not None:
+            costes.append((retenida - anterior) / (len(sesiones) - n_anterior))
+        print(f"  {objetivo:3d} sesiones: +{(retenida - base) / 2**20:7.1f} MiB "
+              f"(RSS +{(rss_actual() - rss_base) / 2**20:7.1f} MiB)"
+              + (f"  {costes[-1] / 2**20:5.2f} MiB por sesión nueva" if costes else ""))
+        anterior, n_anterior = retenida, len(sesiones)
+    tracemalloc.stop()
+
+    por_sesion = (anterior - base) / (len(sesiones) - 1)
+    print(f"media: {por_sesion / 2**20:.2f} MiB por sesión "
+          f"({por_sesion / memoria_dataset:.1%} del Dataset)")
+    assert por_sesion < MAX_FRACCION_SESION * memoria_dataset, por_sesion
+    primera = max(costes[0], 2**20)
+    assert all(coste < MAX_CRECIMIENTO * primera for coste in costes), costes
+    print("comprobaciones: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Matriz pacientes x categorías (kneechat.pacientes): construcción y consultas.
+
+Construye la matriz sobre el libro y sobre un corpus sintético con decenas
+de miles de pacientes y mide las consultas del panel de pacientes
+(co-ocurrencias, pacientes con varias categorías, sentimiento de los
+pacientes de una categoría y perfil de un paciente) frente a resolverlas
+recorriendo las frases con pandas. Comprueba que ambas dan lo mismo, que la
+diagonal de las co-ocurrencias son los pacientes del cubo de agregados y que
+construir por lotes (copiar y actualizar) da lo mismo que de una vez sin
+cambiar la matriz anterior.
+
+Uso:
+    python benchmarks/bench_pacientes.py [--frases 500000] [--lote 1000]
+"""
+import numpy as np
+import pandas as pd
+
+from comun import parser_benchmark, tiempo_ms
+from kneechat.agregados import CuboAgregados
+from kneechat.datos import RUTA_DATASET, leer_dataset
+from kneechat.pacientes import MatrizPacientes
+from kneechat.sintetico import dataset_sintetico
+
+MAX_CONSULTA_MS = 5.0
+DUDAS, REFLEXIONES = "DudasFrecuentes", "Tiporeflexión"
+
+
+# Lo mismo recorriendo las frases (lo que evita la matriz)
+def coocurrencia_directa(df, dimension_a, dimension_b):
+    a = df[["id_entrevista", dimension_a]].dropna().drop_duplicates()
+    b = df[["id_entrevista", dimension_b]].dropna().drop_duplicates()
+    pares = a.merge(b, on="id_entrevista", suffixes=("", "_b"))
+    columna_b = dimension_b if dimension_b != dimension_a else f"{dimension_b}_b"
+    return pd.crosstab(pares[dimension_a].astype(str), pares[columna_b].astype(str))
+
+
+def pacientes_directo(df, categorias):
+    conjuntos = [set(df.loc[df[dimension] == categoria, "id_entrevista"]) for dimension, categoria in categorias]
+    return set.intersection(*conjuntos)
+
+
+def sentimiento_directo(datos, dimension, categoria):
+    pacientes = pacientes_directo(datos.df, [(dimension, categoria)])
+    comentarios = datos.df_comentarios[datos.df_comentarios["id_entrevista"].isin(pacientes)]
+    return comentarios.groupby("id_entrevista")["sent_robertuito"].mean()
+
+
+def perfil_directo(df, paciente):
+    filas = df[df["id_entrevista"] == paciente]
+    return {dimension: filas[dimension].dropna().astype(str).value_counts() for dimension in ("tipo", DUDAS, REFLEXIONES)}
+
+
+def medir(nombre, datos, lote):
+    df = datos.df
+    matriz, ms = tiempo_ms(lambda: MatrizPacientes.desde_dataframe(df))
+    print(f"{nombre}: {len(df):,} frases, {len(matriz):,} pacientes, construcción {ms:.1f} ms")
+
+    # Por lotes: lo mismo que de una vez, y la matriz anterior no cambia
+    anterior = MatrizPacientes().actualizar(df.iloc[:-lote])
+    antes = anterior.coocurrencia(DUDAS, REFLEXIONES).copy()
+    incremental, ms = tiempo_ms(lambda: anterior.copiar().actualizar(df.iloc[-lote:]))
+    print(f"  copiar y actualizar con {lote:,} frases: {ms:.1f} ms")
+    assert anterior.coocurrencia(DUDAS, REFLEXIONES).equals(antes)
+    assert anterior._conteos.shape[0] == len(anterior) == len(anterior.ids)
+    a = matriz.coocurrencia(DUDAS, REFLEXIONES)
+    b = incremental.coocurrencia(DUDAS, REFLEXIONES).loc[a.index, a.columns]
+    assert (a.to_numpy() == b.to_numpy()).all()
+    assert np.allclose(matriz.sentimiento_medio(), incremental.sentimiento_medio().loc[matriz.ids], equal_nan=True)
+
+    cubo = CuboAgregados(df, datos.df_relevante)
+    diagonal = matriz.coocurrencia(DUDAS, DUDAS)
+    for categoria in diagonal.index:
+        assert diagonal.loc[categoria, categoria] == cubo.pacientes(DUDAS, categoria), categoria
+
+    categoria_a, categoria_b = datos.categorias[DUDAS][0], datos.categorias[REFLEXIONES][0]
+    seleccion = [(DUDAS, categoria_a), (REFLEXIONES, categoria_b)]
+    paciente = matriz.ids[len(matriz) // 2]
+
+    def coocurrencia():
+        matriz._coocurrencias.clear()  # medir el producto, no la caché
+        return matriz.coocurrencia(DUDAS, REFLEXIONES)
+
+    consultas = {
+        "co-ocurrencias": (
+            coocurrencia,
+            lambda: coocurrencia_directa(df, DUDAS, REFLEXIONES),
+        ),
+        "pacientes con 2 categorías": (
+            lambda: set(matriz.pacientes_con(seleccion)),
+            lambda: pacientes_directo(df, seleccion),
+        ),
+        "sentimiento de una categoría": (
+            lambda: matriz.sentimiento_categoria(REFLEXIONES, categoria_b),
+            lambda: sentimiento_directo(datos, REFLEXIONES, categoria_b),
+        ),
+        "perfil de un paciente": (
+            lambda: matriz.perfil(paciente),
+            lambda: perfil_directo(df, paciente),
+        ),
+    }
+    resultados = {}
+    for consulta, (con_matriz, directo) in consultas.items():
+        resultado, ms = tiempo_ms(con_matriz, 20)
+        esperado, ms_directo = tiempo_ms(directo, 3)
+        resultados[consulta] = resultado, esperado
+        assert ms < MAX_CONSULTA_MS, (consulta, ms)
+        print(f"  {consulta:<30} matriz {ms:7.3f} ms  recorriendo las frases {ms_directo:8.1f} ms")
+
+    tabla, esperada = resultados["co-ocurrencias"]
+    assert (tabla.loc[esperada.index, esperada.columns].to_numpy() == esperada.to_numpy()).all()
+    assert tabla.to_numpy().sum() == esperada.to_numpy().sum()
+    assert resultados["pacientes con 2 categorías"][0] == resultados["pacientes con 2 categorías"][1]
+    sentimiento, esperado = resultados["sentimiento de una categoría"]
+    assert np.allclose(sentimiento.dropna().sort_index(), esperado.sort_index())
+    (perfil, resumen), esperado = resultados["perfil de un paciente"]
+    for dimension, conteos in esperado.items():
+        filas = perfil[perfil["Dimensión"] == dimension]
+        assert dict(zip(filas["Categoría"], filas["Frases"])) == conteos[conteos > 0].to_dict(), dimension
+    assert resumen["frases"] == int((df["id_entrevista"] == paciente).sum())
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--frases", type=int, default=500_000)
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    libro = leer_dataset(RUTA_DATASET)
+    medir("libro", libro, min(args.lote, len(libro.df) // 2))
+    medir("sintético", leer_dataset(dataset_sintetico(args.frases)), args.lote)
+    print("comprobaciones: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Tiempo de cada interacción del dashboard contra un servidor real de Streamlit.
+
+Arranca `streamlit run` en modo headless y se conecta por WebSocket como lo
+haría el navegador. Para cada interacción (cambiar un widget) mide el tiempo
+hasta que el servidor termina la ejecución y los bytes que envía. Si el
+widget está dentro de un fragmento, pide solo la ejecución de ese fragmento,
+igual que el frontend; si está en una pestaña cerrada, primero la abre (y
+mide ese cambio aparte).
+
+Con --revision se extrae app.py de esa revisión de git y se mide igual (con
+el paquete kneechat actual), para comparar antes y después de un cambio.
+
+Uso:
+    python benchmarks/bench_reejecucion.py
+    python benchmarks/bench_reejecucion.py --revision HEAD~1 --repeticiones 5
+    python benchmarks/bench_reejecucion.py --sintetico 100000 --json reejecucion.json
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from comun import RAIZ, parser_benchmark
+
+DIR_BENCH = RAIZ / ".kneechat_cache" / "bench"
+TIMEOUT_ARRANQUE = 60
+TIMEOUT_EJECUCION = 600
+
+# (pestaña, etiqueta del widget, valor A, valor B): cada repetición alterna
+# entre A y B. Los valores son posiciones en las opciones del widget.
+INTERACCIONES = [
+    ("Categorización general", "Mostrar:", 1, 0),
+    ("Categorización general", "Selecciona el tipo de frase", 1, 0),
+    ("Dudas y reflexiones", "Selecciona qué frecuencia mostrar (Dudas):", [0], [0, 1]),
+    ("Dudas y reflexiones", "Selecciona una categoría de dudas:", 1, 0),
+    ("Dudas y reflexiones", "Selecciona una categoría de comentario:", 1, 0),
+    ("Análisis de sentimiento", "Intervalo de confianza:", 1, 0),
+]
+
+
+class Sesion:
+    """Una pestaña del navegador: envía BackMsg y recoge ForwardMsg."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}  # etiqueta -> (proto del widget, id del fragmento)
+        self.pestanas = None  # proto del contenedor de pestañas, si lo hay
+        self.estados = {}  # id -> WidgetState, como los guarda el frontend
+
+    async def ejecutar(self, fragmento=""):
+        """Pide una ejecución y espera a que termine. Devuelve (segundos, bytes)."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        mensaje = BackMsg()
+        mensaje.rerun_script.query_string = ""
+        mensaje.rerun_script.page_script_hash = ""
+        mensaje.rerun_script.fragment_id = fragmento
+        mensaje.rerun_script.widget_states.widgets.extend(self.estados.values())
+        if not fragmento:
+            self.widgets = {}
+
+        inicio = time.perf_counter()
+        await self.ws.send(mensaje.SerializeToString())
+        recibidos = 0
+        while True:
+            crudo = await asyncio.wait_for(self.ws.recv(), TIMEOUT_EJECUCION)
+            recibidos += len(crudo)
+            forward = ForwardMsg()
+            forward.ParseFromString(crudo)
+            tipo = forward.WhichOneof("type")
+            if tipo == "delta":
+                self._registrar(forward.delta)
+            elif tipo == "script_finished":
+                return time.perf_counter() - inicio, recibidos
+
+    def _registrar(self, delta):
+        tipo = delta.WhichOneof("type")
+        if tipo == "new_element":
+            elemento = delta.new_element
+            widget = getattr(elemento, elemento.WhichOneof("type"))
+            if getattr(widget, "label", "") and getattr(widget, "id", ""):
+                self.widgets[widget.label] = (widget, delta.fragment_id)
+        elif tipo == "add_block" and delta.add_block.WhichOneof("type") == "tab_container":
+            self.pestanas = delta.add_block.tab_container
+
+    def fijar(self, widget, valor):
+        """Guarda el nuevo valor del widget (posición o lista de posiciones en sus opciones)."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        estado = WidgetState(id=widget.id)
+        opciones = list(widget.options)
+        if isinstance(valor, list):
+            estado.string_array_value.data.extend(opciones[i] for i in valor)
+        else:
+            estado.string_value = opciones[valor]
+        self.estados[widget.id] = estado
+
+    async def abrir_pestana(self, nombre):
+        """Abre la pestaña si la página tiene pestañas y no está abierta. None si no hizo falta."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        if self.pestanas is None:
+            return None
+        estado = self.estados.get(self.pestanas.id)
+        abierta = estado.string_value if estado is not None else self.pestanas.default_tab_label
+        if abierta == nombre:
+            return None
+        self.estados[self.pestanas.id] = WidgetState(id=self.pestanas.id, string_value=nombre)
+        return await self.ejecutar()
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def arrancar_servidor(app, puerto, entorno):
+    """Lanza streamlit run y espera a que responda el health check."""
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(app),
+         "--server.headless", "true", "--server.port", str(puerto),
+         "--browser.gatherUsageStats", "false"],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + TIMEOUT_ARRANQUE
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f"http://localhost:{puerto}/_stcore/health", timeout=1):
+                return proceso
+        except OSError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError("el servidor de Streamlit no arrancó")
+
+
+async def medir(puerto, repeticiones):
+    """Primera carga, cambios de pestaña e interacciones: listas de (segundos, bytes)."""
+    import websockets
+
+    medidas = {"primera carga": [], "cambio de pestaña": []}
+    async with websockets.connect(
+        f"ws://localhost:{puerto}/_stcore/stream", max_size=None, subprotocols=["streamlit"]
+    ) as ws:
+        sesion = Sesion(ws)
+        medidas["primera carga"].append(await sesion.ejecutar())
+        for repeticion in range(repeticiones):
+            for pestana, etiqueta, valor_a, valor_b in INTERACCIONES:
+                cambio = await sesion.abrir_pestana(pestana)
+                if cambio is not None:
+                    medidas["cambio de pestaña"].append(cambio)
+                widget, fragmento = sesion.widgets[etiqueta]
+                sesion.fijar(widget, valor_a if repeticion % 2 == 0 else valor_b)
+                medidas.setdefault(etiqueta, []).append(await sesion.ejecutar(fragmento))
+    return medidas
+
+
+def resumir(medidas):
+    return {
+        nombre: {
+            "mediana_ms": round(statistics.median(s for s, _ in valores) * 1000, 1),
+            "kib": round(statistics.median(b for _, b in valores) / 1024, 1),
+            "n": len(valores),
+        }
+        for nombre, valores in medidas.items() if valores
+    }
+
+
+def app_de_revision(revision):
+    """Copia app.py de una revisión de git junto al actual (para que encuentre el logo y kneechat)."""
+    contenido = subprocess.run(
+        ["git", "show", f"{revision}:app.py"], cwd=RAIZ, check=True, capture_output=True
+    ).stdout
+    DIR_BENCH.mkdir(parents=True, exist_ok=True)
+    ruta = DIR_BENCH / f"app_{revision.replace('/', '_').replace('~', '-')}.py"
+    ruta.write_bytes(contenido)
+    return ruta
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--revision", help="medir app.py de esta revisión de git en lugar del actual")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sintetico", type=int, default=0,
+                        help="usar un corpus sintético de N frases (kneechat.sintetico)")
+    parser.add_argument("--json", help="guardar el resultado en este fichero")
+    args = parser.parse_args()
+
+    entorno = dict(os.environ, PYTHONPATH=str(RAIZ))
+    if args.sintetico:
+        from kneechat.sintetico import dataset_sintetico
+
+        entorno["KNEECHAT_DATASET"] = str(dataset_sintetico(args.sintetico))
+    app = app_de_revision(args.revision) if args.revision else RAIZ / "app.py"
+
+    puerto = puerto_libre()
+    servidor = arrancar_servidor(app, puerto, entorno)
+    try:
+        resultado = resumir(asyncio.run(medir(puerto, args.repeticiones)))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    print(f"{args.revision or 'árbol actual'}: {app.name}")
+    for nombre, medida in resultado.items():
+        print(f"  {nombre:<46} mediana {medida['mediana_ms']:8.1f} ms  {medida['kib']:8.1f} KiB  (n={medida['n']})")
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
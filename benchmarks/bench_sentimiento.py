@@ -0,0 +1,54 @@
+"""
+Bucketizado de sentimiento: .apply(clasificar_sentimiento) frente a
+bucketizar_sentimiento (np.digitize).
+
+Antes de medir comprueba que ambas dan el mismo resultado en los umbrales,
+justo a ambos lados de cada umbral, en los extremos y en valores aleatorios.
+
+Uso:
+    python benchmarks/bench_sentimiento.py [--valores 1000000]
+"""
+import numpy as np
+import pandas as pd
+
+from comun import parser_benchmark, tiempo_ms
+from kneechat.sentimiento import UMBRALES, bucketizar_sentimiento, clasificar_sentimiento
+
+
+def valores_frontera(tipo=np.float64):
+    valores = [-1.0, 0.0, 1.0]
+    for umbral in np.asarray(UMBRALES, dtype=tipo):
+        valores += [umbral, np.nextafter(umbral, tipo(-np.inf)), np.nextafter(umbral, tipo(np.inf))]
+    return np.array(valores, dtype=tipo)
+
+
+def comprobar_equivalencia(valores):
+    serie = pd.Series(valores)
+    # Valor a valor en su tipo (Series.apply pasaría los float32 a float de Python)
+    esperado = pd.Series([clasificar_sentimiento(valor) for valor in valores])
+    obtenido = bucketizar_sentimiento(serie).astype(str)
+    distintos = serie[esperado != obtenido]
+    assert distintos.empty, f"difieren en {distintos.tolist()}"
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--valores", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    comprobar_equivalencia(valores_frontera())
+    comprobar_equivalencia(valores_frontera(np.float32))
+    comprobar_equivalencia(rng.uniform(-1, 1, 100_000))
+    comprobar_equivalencia(rng.uniform(-1, 1, 100_000).astype(np.float32))
+    print("equivalencia con clasificar_sentimiento: OK")
+
+    serie = pd.Series(rng.uniform(-1, 1, args.valores))
+    _, t_apply = tiempo_ms(lambda: serie.apply(clasificar_sentimiento))
+    _, t_vector = tiempo_ms(lambda: bucketizar_sentimiento(serie))
+    print(f"{args.valores} valores: apply {t_apply:.1f} ms, "
+          f"vectorizado {t_vector:.1f} ms (x{t_apply / t_vector:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark de arranque en frío: read_excel frente al snapshot Arrow.
+
+Cada medición se hace en un proceso nuevo para que no influyan cachés de
+memoria ni módulos ya importados. Se reporta el tiempo de carga y el pico de
+memoria residente (RSS) que añade la carga sobre el proceso ya inicializado.
+
+Uso:
+    python benchmarks/bench_snapshot.py [--repeticiones 5]
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+from comun import RAIZ, parser_benchmark
+
+# Se ejecuta en el proceso hijo. Imprime un JSON con los resultados.
+CODIGO_HIJO = """
+import json, resource, sys, time
+sys.path.insert(0, {raiz!r})
+import pandas as pd
+from kneechat import datos, snapshot
+
+modo = {modo!r}
+ruta = datos.RUTA_DATASET
+if modo == "snapshot":
+    snapshot.ruta_snapshot(ruta).exists() or snapshot.convertir(ruta)
+
+rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+inicio = time.perf_counter()
+if modo == "excel":
+    df = pd.read_excel(ruta)
+else:
+    df = snapshot.leer_snapshot(snapshot.ruta_snapshot(ruta))
+segundos = time.perf_counter() - inicio
+rss_despues = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "segundos": segundos,
+    "rss_kib": rss_despues - rss_antes,
+    "memoria_df_kib": int(df.memory_usage(deep=True).sum() / 1024),
+}}))
+"""
+
+
+def ejecutar(modo):
+    salida = subprocess.run(
+        [sys.executable, "-c", CODIGO_HIJO.format(raiz=str(RAIZ), modo=modo)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    for modo in ("excel", "snapshot"):
+        resultados = [ejecutar(modo) for _ in range(args.repeticiones)]
+        tiempo = statistics.median(r["segundos"] for r in resultados)
+        rss = statistics.median(r["rss_kib"] for r in resultados)
+        print(
+            f"{modo:<9} carga {tiempo * 1000:8.2f} ms   "
+            f"+RSS {rss:7.0f} KiB   DataFrame {resultados[0]['memoria_df_kib']:6d} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
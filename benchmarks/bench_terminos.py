@@ -0,0 +1,89 @@
+"""
+Índice de términos por categoría (kneechat.terminos): construcción y consultas.
+
+Construye el índice sobre el libro y sobre un corpus sintético, mide el
+tiempo de la actualización incremental con un lote de frases nuevas y el de
+los términos más frecuentes de cada categoría (debe quedar por debajo del
+milisegundo), y compara ese último con recontar las palabras de la categoría
+desde las frases. Comprueba que construir por lotes da lo mismo que de una
+vez y que los conteos coinciden con los del recuento directo.
+
+Uso:
+    python benchmarks/bench_terminos.py [--frases 100000] [--lote 1000]
+"""
+from collections import Counter
+
+from comun import Cronometro, parser_benchmark, tiempo_ms
+from kneechat import snapshot
+from kneechat.datos import RUTA_DATASET
+from kneechat.figuras import figura_nube_terminos, limpiar_cache
+from kneechat.sintetico import dataset_sintetico
+from kneechat.terminos import DIMENSIONES, IndiceTerminos, _terminos
+
+MAX_TOP_MS = 1.0
+
+
+def recuento_directo(df, dimension, categoria, k):
+    """Top k recontando las frases de la categoría (lo que evita el índice)."""
+    frases = df.loc[df[dimension].astype(str) == categoria, "frase"]
+    return Counter(_terminos(frases)["raiz"]).most_common(k)
+
+
+def medir(nombre, df, lote, repeticiones=200):
+    with Cronometro() as t:
+        indice = IndiceTerminos.desde_dataframe(df)
+    print(f"{nombre}: {len(df):,} frases, {len(indice.vocabulario):,} términos, construcción {t.segundos:.2f} s")
+
+    # Por lotes: lo mismo que de una vez, y el índice copiado no cambia
+    anterior = IndiceTerminos().actualizar(df.iloc[:-lote])
+    tops_anteriores = {d: {c: anterior.top_terminos(d, c, None) for c in anterior.categorias[d]}
+                       for d in DIMENSIONES}
+    incremental, ms = tiempo_ms(lambda: anterior.copiar().actualizar(df.iloc[-lote:]))
+    print(f"  copiar y actualizar con {lote:,} frases: {ms:.1f} ms")
+    for dimension, tops in tops_anteriores.items():
+        for categoria, top in tops.items():
+            assert anterior.top_terminos(dimension, categoria, None).equals(top), (dimension, categoria)
+    for dimension in DIMENSIONES:
+        assert incremental.categorias[dimension].keys() == indice.categorias[dimension].keys()
+        for categoria in indice.categorias[dimension]:
+            a = indice.top_terminos(dimension, categoria, None)
+            b = incremental.top_terminos(dimension, categoria, None)
+            assert a.sort_values("Término").reset_index(drop=True).equals(
+                b.sort_values("Término").reset_index(drop=True)), (dimension, categoria)
+
+    for dimension in DIMENSIONES:
+        for categoria in indice.categorias[dimension]:
+            top = indice.top_terminos(dimension, categoria)
+            _, ms = tiempo_ms(lambda: indice.top_terminos(dimension, categoria), repeticiones)
+            directo, ms_directo = tiempo_ms(lambda: recuento_directo(df, dimension, categoria, len(top)))
+            # Mismos conteos (los empates pueden salir en otro orden)
+            assert top["Apariciones"].tolist() == [n for _, n in directo], (dimension, categoria)
+            assert ms < MAX_TOP_MS, (dimension, categoria, ms)
+            print(f"  {dimension[:8]:<8} {categoria[:32]:<32} top {ms:6.3f} ms  recuento {ms_directo:8.1f} ms")
+    return indice
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--frases", type=int, default=100_000)
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    libro = snapshot.leer_origen(RUTA_DATASET)
+    indice = medir("libro", libro, min(args.lote, len(libro) // 2))
+    medir("sintético", snapshot.leer_origen(dataset_sintetico(args.frases)), args.lote)
+
+    # Nubes: la segunda petición sale de la caché de PNG
+    limpiar_cache()
+    dimension = DIMENSIONES[0]
+    categoria = next(iter(indice.categorias[dimension]))
+    png, frio = tiempo_ms(lambda: figura_nube_terminos(indice, "bench", dimension, categoria))
+    _, caliente = tiempo_ms(lambda: figura_nube_terminos(indice, "bench", dimension, categoria), 100)
+    assert png.startswith(b"\x89PNG")
+    assert figura_nube_terminos(indice, "bench", dimension, "sin categoría") is None
+    print(f"nube de términos: {frio:.1f} ms sin caché, {caliente:.3f} ms con caché")
+    print("comprobaciones: OK")
+
+
+if __name__ == "__main__":
+    main()
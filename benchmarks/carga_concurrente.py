@@ -0,0 +1,209 @@
+"""
+Prueba de carga: muchas sesiones del dashboard a la vez.
+
+Cada sesión es un AppTest de Streamlit que ejecuta app.py y recorre una
+secuencia realista de interacciones (Frases/Pacientes, tipo de frase,
+cambios de pestaña, categorías de dudas y de comentarios y los dos
+multiselect de frecuencia). AppTest siempre vuelve a ejecutar el script
+completo, también con widgets dentro de fragmentos; el coste de las
+ejecuciones parciales lo mide benchmarks/bench_reejecucion.py.
+Se mide la latencia de cada rerun y se reportan p50/p95/p99, el tiempo de
+CPU y el pico de RSS.
+
+Modos:
+    procesos  (por defecto) cada sesión en su propio proceso nuevo: CPU y
+              pico de RSS exactos por sesión (sin cachés compartidas entre
+              sesiones).
+    hilos     todas las sesiones en un proceso, compartiendo cachés, como en
+              un servidor de Streamlit real. CPU y RSS son del proceso.
+              AppTest no está pensado para ejecutarse en varios hilos a la
+              vez (compila el script y reemplaza estado global en cada
+              ejecución), así que con concurrencia > 1 puede fallar de forma
+              intermitente; los fallos no son del dashboard.
+
+Uso:
+    python benchmarks/carga_concurrente.py --sesiones 8 --concurrencia 4
+    python benchmarks/carga_concurrente.py --escala 50
+    python benchmarks/carga_concurrente.py --modo hilos --concurrencia 1
+    python benchmarks/carga_concurrente.py --sintetico 100000
+"""
+import json
+import os
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from comun import RAIZ, Cronometro, parser_benchmark
+
+DIR_BENCH = RAIZ / ".kneechat_cache" / "bench"
+# Libro original (sin importar kneechat.datos, que lee KNEECHAT_DATASET al importarse)
+LIBRO = RAIZ / "Dataset kneechat - ES.xlsx"
+TIMEOUT_RERUN = 300
+
+
+def dataset_escalado(escala):
+    """
+    Parquet con el libro replicado `escala` veces (entrevistas renombradas).
+
+    Se reutiliza si ya existe para esa escala.
+    """
+    import pandas as pd
+
+    ruta = DIR_BENCH / f"kneechat_x{escala}.parquet"
+    if ruta.exists():
+        return ruta
+    base = pd.read_excel(LIBRO)
+    copias = []
+    for i in range(escala):
+        copia = base.copy()
+        copia["num_entrevista"] = copia["num_entrevista"].astype(str) + f"_{i}"
+        copias.append(copia)
+    DIR_BENCH.mkdir(parents=True, exist_ok=True)
+    pd.concat(copias, ignore_index=True).to_parquet(ruta, index=False)
+    return ruta
+
+
+def _widget(lista, etiqueta):
+    widget = next((w for w in lista if w.label == etiqueta), None)
+    if widget is None:
+        raise RuntimeError(
+            f"no hay ningún widget {etiqueta!r} en la página; hay: {[w.label for w in lista]}"
+        )
+    return widget
+
+
+def _abrir_pestana(at, nombre):
+    # AppTest no conserva la pestaña abierta entre ejecuciones (no es un
+    # widget de su árbol): se vuelve a fijar antes de cada acción en ella
+    at.session_state["pestana"] = nombre
+
+
+def _en_pestana(at, nombre, accion):
+    def ejecutar():
+        _abrir_pestana(at, nombre)
+        accion()
+    return ejecutar
+
+
+def interacciones(at, rng):
+    """Secuencia de acciones de un clínico típico (generador de callables)."""
+    yield lambda: _widget(at.radio, "Mostrar:").set_value("Pacientes")
+    tipo = _widget(at.selectbox, "Selecciona el tipo de frase")
+    yield lambda: tipo.set_value(rng.choice(tipo.options))
+    yield lambda: _abrir_pestana(at, "Dudas y reflexiones")
+    dudas = _widget(at.selectbox, "Selecciona una categoría de dudas:")
+    yield _en_pestana(at, "Dudas y reflexiones", lambda: dudas.set_value(rng.choice(dudas.options)))
+    reflexion = _widget(at.selectbox, "Selecciona una categoría de comentario:")
+    yield _en_pestana(at, "Dudas y reflexiones", lambda: reflexion.set_value(rng.choice(reflexion.options)))
+    yield _en_pestana(at, "Dudas y reflexiones", lambda: _widget(
+        at.multiselect, "Selecciona qué frecuencia mostrar (Dudas):"
+    ).set_value(rng.choice([["Frases"], ["Pacientes"], ["Frases", "Pacientes"]])))
+    yield _en_pestana(at, "Dudas y reflexiones", lambda: _widget(
+        at.multiselect, "Selecciona qué frecuencia mostrar (Reflexiones):"
+    ).set_value(rng.choice([["Frases"], ["Pacientes"], ["Frases", "Pacientes"]])))
+    yield lambda: _abrir_pestana(at, "Categorización general")
+    yield lambda: _widget(at.radio, "Mostrar:").set_value("Frases")
+
+
+def ejecutar_sesion(semilla, ciclos):
+    """Ejecuta una sesión y devuelve sus latencias y consumo."""
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(RAIZ)
+    rng = random.Random(semilla)
+    cpu_inicio = time.process_time()
+    latencias = []
+
+    at = AppTest.from_file(str(RAIZ / "app.py"), default_timeout=TIMEOUT_RERUN)
+    with Cronometro() as t:
+        at.run()
+    latencias.append(t.segundos)
+    for _ in range(ciclos):
+        for accion in interacciones(at, rng):
+            accion()
+            with Cronometro() as t:
+                at.run()
+            latencias.append(t.segundos)
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+
+    return {
+        "latencias": latencias,
+        "cpu_s": time.process_time() - cpu_inicio,
+        "rss_pico_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def percentiles(valores):
+    import numpy as np
+
+    p50, p95, p99 = np.percentile(np.array(valores) * 1000, [50, 95, 99])
+    return {"p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1)}
+
+
+def main():
+    parser = parser_benchmark(__doc__)
+    parser.add_argument("--sesiones", type=int, default=8)
+    parser.add_argument("--concurrencia", type=int, default=4)
+    parser.add_argument("--ciclos", type=int, default=2, help="repeticiones de la secuencia por sesión")
+    parser.add_argument("--modo", choices=["procesos", "hilos"], default="procesos")
+    parser.add_argument("--escala", type=int, default=1,
+                        help="replicar el libro N veces (1 = libro original)")
+    parser.add_argument("--sintetico", type=int, default=0,
+                        help="usar un corpus sintético de N frases (kneechat.sintetico)")
+    parser.add_argument("--dataset", help="ruta a un dataset propio (.xlsx, .csv o .parquet)")
+    parser.add_argument("--json", help="guardar el resultado en este fichero")
+    args = parser.parse_args()
+
+    if args.dataset:
+        os.environ["KNEECHAT_DATASET"] = str(Path(args.dataset).resolve())
+    elif args.sintetico:
+        from kneechat.sintetico import dataset_sintetico
+
+        os.environ["KNEECHAT_DATASET"] = str(dataset_sintetico(args.sintetico, origen=LIBRO))
+    elif args.escala > 1:
+        os.environ["KNEECHAT_DATASET"] = str(dataset_escalado(args.escala))
+
+    if args.modo == "hilos":
+        pool = ThreadPoolExecutor(max_workers=args.concurrencia)
+    else:
+        # Un proceso por sesión: sin max_tasks_per_child el pool reutiliza
+        # los procesos y la segunda sesión de cada uno encuentra las cachés llenas
+        pool = ProcessPoolExecutor(max_workers=args.concurrencia, max_tasks_per_child=1)
+    cpu_inicio = time.process_time()
+    with Cronometro() as t, pool:
+        sesiones = list(pool.map(ejecutar_sesion, range(args.sesiones), [args.ciclos] * args.sesiones))
+    duracion = t.segundos
+
+    latencias = [l for s in sesiones for l in s["latencias"]]
+    primeras = [s["latencias"][0] for s in sesiones]
+    resultado = {
+        "modo": args.modo,
+        "dataset": os.environ.get("KNEECHAT_DATASET", "Dataset kneechat - ES.xlsx"),
+        "sesiones": args.sesiones,
+        "concurrencia": args.concurrencia,
+        "reruns": len(latencias),
+        "duracion_s": round(duracion, 2),
+        "reruns_por_s": round(len(latencias) / duracion, 2),
+        "rerun": percentiles(latencias),
+        "primera_carga": percentiles(primeras),
+    }
+    if args.modo == "hilos":
+        cpu = time.process_time() - cpu_inicio
+        resultado["cpu_s_proceso"] = round(cpu, 2)
+        resultado["cpu_s_por_sesion"] = round(cpu / args.sesiones, 2)
+        resultado["rss_pico_kib_proceso"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    else:
+        cpu = sorted(s["cpu_s"] for s in sesiones)
+        resultado["cpu_s_por_sesion"] = {"mediana": round(cpu[len(cpu) // 2], 2), "max": round(cpu[-1], 2)}
+        resultado["rss_pico_kib_por_sesion"] = max(s["rss_pico_kib"] for s in sesiones)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
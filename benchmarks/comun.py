@@ -0,0 +1,58 @@
+"""
+Utilidades comunes de los scripts de benchmarks/.
+
+Al importarse añade la raíz del repositorio a sys.path, para que los scripts
+se puedan ejecutar directamente (python benchmarks/bench_x.py) e importar
+kneechat; bajo pytest lo hace ya pythonpath en pytest.ini. Por eso se importa
+antes que kneechat.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+
+def parser_benchmark(doc):
+    """ArgumentParser con la primera línea del docstring del script como descripción."""
+    return argparse.ArgumentParser(description=doc.strip().splitlines()[0])
+
+
+class Cronometro:
+    """
+    Tiempo de un bloque with.
+
+        with Cronometro() as t:
+            ...
+        print(t.segundos, t.ms)
+    """
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.segundos = time.perf_counter() - self._inicio
+
+    @property
+    def ms(self):
+        return self.segundos * 1000
+
+
+def tiempos(funcion, repeticiones):
+    """(resultado de la última llamada, segundos de cada llamada)."""
+    segundos = []
+    for _ in range(repeticiones):
+        with Cronometro() as t:
+            resultado = funcion()
+        segundos.append(t.segundos)
+    return resultado, segundos
+
+
+def tiempo_ms(funcion, repeticiones=1):
+    """(resultado de la última llamada, milisegundos por llamada de media)."""
+    resultado, segundos = tiempos(funcion, repeticiones)
+    return resultado, sum(segundos) / len(segundos) * 1000
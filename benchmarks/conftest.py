@@ -0,0 +1,35 @@
+"""Opciones y fixtures de los benchmarks de pytest-benchmark (benchmarks/test_*.py)."""
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--frases", type=int, default=100_000,
+                     help="tamaño del corpus sintético (kneechat.sintetico); 0 = solo el libro")
+
+
+def pytest_generate_tests(metafunc):
+    # Cada benchmark que pide un dataset se mide sobre el libro y el corpus sintético
+    if "ruta_dataset" in metafunc.fixturenames:
+        frases = metafunc.config.getoption("frases")
+        metafunc.parametrize("ruta_dataset", ["libro"] + ([f"sintetico_{frases}"] if frases else []),
+                             indirect=True, scope="session")
+
+
+@pytest.fixture(scope="session")
+def ruta_dataset(request):
+    from kneechat.datos import RUTA_DATASET
+    from kneechat.sintetico import dataset_sintetico
+
+    if request.param == "libro":
+        return RUTA_DATASET
+    return dataset_sintetico(request.config.getoption("frases"))
+
+
+@pytest.fixture(scope="session")
+def datos(ruta_dataset):
+    from kneechat.datos import leer_dataset
+
+    return leer_dataset(ruta_dataset)
@@ -0,0 +1,56 @@
+"""
+Benchmarks del núcleo de cálculo (kneechat.calculo y graficos.construir_figuras).
+
+Cada función se mide con pytest-benchmark sobre el libro incluido y sobre un
+corpus sintético (kneechat.sintetico, --frases), y se comprueba la
+coherencia de su resultado. Para detectar regresiones antes de desplegar se
+guarda una ejecución de referencia y se compara con ella:
+
+Uso:
+    python -m pytest benchmarks/test_calculo.py --benchmark-autosave
+    python -m pytest benchmarks/test_calculo.py --benchmark-compare --benchmark-compare-fail=median:50%
+    python -m pytest benchmarks/test_calculo.py --frases 0   # solo el libro
+"""
+import pytest
+
+from kneechat.calculo import (
+    comentarios, distribucion_sentimiento, estadisticas_entrevistas, frecuencias_categorias,
+)
+from kneechat.datos import leer_dataset
+from kneechat.graficos import construir_figuras
+
+METODOS = {"bootstrap": "Bootstrap", "normal": "Normal (1.96·SEM)"}
+
+
+def test_leer_dataset(benchmark, ruta_dataset):
+    datos = benchmark(leer_dataset, ruta_dataset)
+    assert len(datos.df) == len(datos.df_relevante) + (datos.df["tipo"] == "Interacción Irrelevante").sum()
+
+
+def test_frecuencias_tipo(benchmark, datos):
+    tabla = benchmark(frecuencias_categorias, datos.df, "tipo")
+    assert tabla["Frases"].sum() == len(datos.df)
+
+
+@pytest.mark.parametrize("dimension", ["DudasFrecuentes", "Tiporeflexión"])
+def test_frecuencias_categorias(benchmark, datos, dimension):
+    tabla = benchmark(frecuencias_categorias, datos.df_relevante, dimension)
+    assert (tabla["Pacientes"] <= tabla["Frases"]).all()
+    assert tabla["Frases"].is_monotonic_decreasing
+
+
+@pytest.mark.parametrize("metodo", list(METODOS))
+def test_estadisticas_entrevistas(benchmark, datos, metodo):
+    estadisticas, _ = benchmark(estadisticas_entrevistas, datos, METODOS[metodo], 1)
+    assert estadisticas["count_frases"].sum() == comentarios(datos.df_relevante)["sent_robertuito"].notna().sum()
+    assert estadisticas["mean_robertuito"].is_monotonic_increasing
+
+
+def test_distribucion_sentimiento(benchmark, datos):
+    tabla = benchmark(distribucion_sentimiento, datos.df_relevante)
+    assert tabla["Cantidad de frases"].sum() == comentarios(datos.df_relevante)["sent_robertuito"].notna().sum()
+
+
+def test_construir_figuras(benchmark, datos):
+    figuras = benchmark(construir_figuras, datos)
+    assert isinstance(figuras["dudas"], bytes) and figuras["sentimiento_entrevistas"].data
@@ -0,0 +1,3 @@
+"""
+Núcleo de datos y cálculo del dashboard de KneeChat.
+"""
@@ -0,0 +1,123 @@
+"""
+Cubo de agregados precalculados por (dimensión, categoría).
+
+Las secciones de Dudas/Preguntas y Reflexiones/Comentarios necesitan, para
+cada categoría, el número de frases y el de pacientes distintos. En lugar de
+repetir groupby + melt en cada rerun, el cubo se construye una vez por versión
+del dataset y los selectores solo recortan tablas ya calculadas. Al añadir
+entrevistas nuevas (kneechat.ingesta) el cubo se actualiza con solo esas
+filas.
+"""
+import copy
+
+import streamlit as st
+
+# "tipo" se agrega sobre todas las frases; el resto, sobre las relevantes.
+DIMENSIONES = ("tipo", "DudasFrecuentes", "Tiporeflexión")
+METRICAS = ("Frases", "Pacientes")
+
+# Nombre con el que se muestra cada tipo de frase en el dashboard
+ETIQUETAS_TIPO = {
+    "Comentario/reflexión": "Comentario/reflexión",
+    "Duda/pregunta": "Duda/pregunta",
+    "Interacción Irrelevante": "Sin interacción relevante",
+}
+
+
+class CuboAgregados:
+    """
+    Frases y pacientes distintos por (dimensión, categoría).
+
+    Las tablas devueltas son compartidas entre sesiones: no modificarlas.
+
+    Uso:
+        cubo = CuboAgregados(df, df_relevante)
+        cubo.actualizar(df_entrevistas_nuevas, df_relevante_nuevas)
+    """
+
+    def __init__(self, df=None, df_relevante=None):
+        self.frases_totales = 0
+        self.pacientes_totales = 0
+        self._conteos = {dimension: None for dimension in DIMENSIONES}
+        self._tablas = {}
+        self._melted = {}
+        self._celdas = {}
+        if df is not None:
+            self.actualizar(df, df_relevante)
+
+    def actualizar(self, df_nuevas, df_relevante_nuevas):
+        """
+        Suma las filas de entrevistas nuevas. El coste depende de df_nuevas y
+        del número de categorías, no del tamaño del cubo.
+
+        Los pacientes se suman por categoría, así que df_nuevas no debe traer
+        entrevistas que ya estén en el cubo (kneechat.ingesta lo comprueba).
+        """
+        self.frases_totales += len(df_nuevas)
+        self.pacientes_totales += df_nuevas["num_entrevista"].nunique()
+        for dimension in DIMENSIONES:
+            origen = df_nuevas if dimension == "tipo" else df_relevante_nuevas
+            # Lo mismo que frecuencias_categorias, sin ordenar ni pasar a texto
+            nuevos = origen.groupby(dimension, observed=True)["num_entrevista"].agg(["size", "nunique"])
+            nuevos.columns = list(METRICAS)
+            nuevos.index = nuevos.index.astype(str)
+            conteos = self._conteos[dimension]
+            if conteos is not None:
+                nuevos = conteos.add(nuevos, fill_value=0).astype("int64")
+            self._conteos[dimension] = nuevos
+            # Mismo orden que frecuencias_categorias: frases descendente y,
+            # a igualdad, por nombre de categoría
+            tabla = (
+                nuevos.sort_index().sort_values(by="Frases", ascending=False, kind="stable")
+                .rename_axis(dimension).reset_index()
+            )
+            self._tablas[dimension] = tabla
+            self._melted.pop(dimension, None)
+            for categoria, frases, pacientes in tabla.itertuples(index=False):
+                self._celdas[(dimension, categoria)] = (int(frases), int(pacientes))
+        return self
+
+    def copiar(self):
+        """Copia que se puede actualizar sin cambiar esta (comparten las tablas, que no se modifican)."""
+        copia = copy.copy(self)
+        copia._conteos = dict(self._conteos)
+        copia._tablas = dict(self._tablas)
+        copia._melted = dict(self._melted)
+        copia._celdas = dict(self._celdas)
+        return copia
+
+    def tabla(self, dimension):
+        """Tabla [dimension, Frases, Pacientes] ordenada por frases descendente."""
+        return self._tablas[dimension]
+
+    def melted(self, dimension, metricas=METRICAS):
+        """Formato largo [dimension, Tipo, Frecuencia] con solo las métricas pedidas."""
+        melted = self._melted.get(dimension)
+        if melted is None:
+            melted = self._tablas[dimension].melt(
+                id_vars=dimension, var_name="Tipo", value_name="Frecuencia"
+            )
+            self._melted[dimension] = melted
+        if set(metricas) >= set(METRICAS):
+            return melted
+        return melted[melted["Tipo"].isin(metricas)]
+
+    def categorias(self, dimension):
+        return self._tablas[dimension][dimension].tolist()
+
+    def frases(self, dimension, categoria):
+        return self._celdas.get((dimension, categoria), (0, 0))[0]
+
+    def pacientes(self, dimension, categoria):
+        return self._celdas.get((dimension, categoria), (0, 0))[1]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cubo_version(version, _datos):
+    # Solo la versión forma parte de la clave; el Dataset no se hashea.
+    return CuboAgregados(_datos.df, _datos.df_relevante)
+
+
+def cubo_agregados(datos):
+    """Cubo cacheado para la versión del Dataset."""
+    return _cubo_version(datos.version, datos)
@@ -0,0 +1,144 @@
+"""
+Arranque en caliente: precalentamiento de cachés y servidor.
+
+Un worker nuevo importaba matplotlib, seaborn y plotly, codificaba el logo y
+leía el libro antes de enviar nada al primer usuario, y cada pestaña pagaba
+después sus índices y figuras la primera vez que alguien la abría.
+precalentar() hace todo eso de antemano, con las mismas funciones cacheadas
+que usa app.py (st.cache_resource y la caché de PNG son globales del
+proceso), así que las sesiones lo encuentran hecho:
+
+    python -m kneechat.arranque [opciones de streamlit run]
+
+precalienta y después arranca el servidor en el mismo proceso; el health
+check no responde hasta que las cachés están llenas. Con `streamlit run
+app.py` (p. ej. en Streamlit Community Cloud) app.py lanza el mismo
+precalentamiento en un hilo tras la primera ejecución del proceso
+(precalentar_en_segundo_plano), de modo que la primera página no lo espera
+y las demás pestañas ya lo encuentran hecho. KNEECHAT_PRECALENTAR=0 lo
+desactiva.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ENV_PRECALENTAR = "KNEECHAT_PRECALENTAR"
+VALORES_INACTIVO = ("0", "false", "no")
+RUTA_APP = Path(__file__).resolve().parent.parent / "app.py"
+# Selección por defecto de los gráficos de barras de app.py
+METRICAS_BARRAS = ("Frases", "Pacientes")
+
+_LOGGER = logging.getLogger("kneechat.arranque")
+_lock = threading.Lock()
+_hilo = None
+
+
+def _importar_graficos():
+    """Importa los módulos de gráficos (los que app.py importa en cada sección)."""
+    import plotly.express  # noqa: F401
+
+    import kneechat.dispersion  # noqa: F401
+    import kneechat.figuras  # noqa: F401
+    import kneechat.graficos  # noqa: F401
+
+
+def _figuras_iniciales(estado):
+    """PNG de las selecciones por defecto de la pestaña de dudas y reflexiones."""
+    from kneechat.figuras import figura_barras_frecuencia, figura_nube_terminos
+    from kneechat.terminos import DIMENSIONES
+
+    datos = estado.datos
+    terminos = estado.indices.terminos
+    for dimension in DIMENSIONES:
+        figura_barras_frecuencia(estado.cubo, datos.version, dimension, METRICAS_BARRAS)
+        if datos.categorias.get(dimension):
+            figura_nube_terminos(terminos, datos.version, dimension, datos.categorias[dimension][0])
+
+
+def precalentar(figuras=True):
+    """
+    Llena las cachés de la cohorte por defecto: dataset (y su snapshot),
+    índices, intervalos bootstrap, recursos estáticos y, con figuras, las
+    importaciones de gráficos y los PNG por defecto. Devuelve {paso: segundos}.
+    """
+    from kneechat.cohortes import COHORTE_PRINCIPAL, leer_registro
+    from kneechat.datos import cargar_dataset
+    from kneechat.ingesta import DIR_ALMACEN, estado_ingesta
+    from kneechat.recursos import html_logo
+
+    tiempos = {}
+
+    def paso(nombre, funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos[nombre] = time.perf_counter() - inicio
+        return resultado
+
+    # La cohorte que app.py abre por defecto, como la carga app.py
+    cohorte = leer_registro()[0]
+    almacen = DIR_ALMACEN if cohorte.id == COHORTE_PRINCIPAL else None
+    estado = paso("dataset", lambda: estado_ingesta(cargar_dataset(cohorte.ruta), almacen))
+    indices = estado.indices
+    paso("recursos", html_logo)
+    paso("índices", lambda: (indices.frases, indices.busqueda, indices.terminos, indices.pacientes))
+    paso("intervalos", lambda: indices.intervalos)
+    if figuras:
+        paso("importaciones de gráficos", _importar_graficos)
+        paso("figuras", lambda: _figuras_iniciales(estado))
+    return tiempos
+
+
+def precalentamiento_activo():
+    return os.environ.get(ENV_PRECALENTAR, "").lower() not in VALORES_INACTIVO
+
+
+def _precalentar_registrando():
+    try:
+        tiempos = precalentar()
+    except Exception:
+        # Si falla, cada sección calcula lo suyo al abrirse, como sin precalentar
+        _LOGGER.exception("error al precalentar las cachés")
+        return
+    _LOGGER.info(
+        "cachés precalentadas: %s", ", ".join(f"{k} {v:.2f} s" for k, v in tiempos.items())
+    )
+
+
+def precalentar_en_segundo_plano():
+    """Lanza precalentar() en un hilo, una sola vez por proceso. Devuelve el hilo (o None)."""
+    global _hilo
+    if not precalentamiento_activo():
+        return None
+    with _lock:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_precalentar_registrando, name="kneechat-precalentar", daemon=True)
+            _hilo.start()
+    return _hilo
+
+
+def esperar_precalentamiento(timeout=None):
+    """Espera a que termine el precalentamiento en segundo plano, si se lanzó."""
+    if _hilo is not None:
+        _hilo.join(timeout)
+
+
+def main(argumentos=None):
+    argumentos = sys.argv[1:] if argumentos is None else argumentos
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    if precalentamiento_activo():
+        # Antes de arrancar el servidor: no se acepta ninguna sesión en frío
+        _precalentar_registrando()
+        # Ya hecho: que app.py no lo vuelva a lanzar
+        os.environ[ENV_PRECALENTAR] = "0"
+
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", str(RUTA_APP), *argumentos]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
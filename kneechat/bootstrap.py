@@ -0,0 +1,123 @@
+"""
+Intervalos de confianza bootstrap del sentimiento medio por entrevista.
+
+Con 2-5 frases por entrevista, 1.96·SEM da intervalos poco fiables (supone
+normalidad y la desviación típica está mal estimada). Aquí se remuestrean
+todas las entrevistas a la vez: una sola matriz de índices aleatorios
+(n_boot × n_frases) en la que cada frase se sustituye por otra al azar de su
+misma entrevista, y las medias por entrevista se obtienen con sumas por
+tramos (np.add.reduceat). El IC es el percentil 2.5-97.5 de esas medias.
+
+Por debajo de MIN_FRASES_IC frases el remuestreo apenas tiene valores
+distintos (con 1 frase el IC es un punto), así que esas entrevistas se
+marcan como sin IC estimable en lugar de descartarse a mano.
+
+Las entrevistas nuevas de kneechat.ingesta se añaden con ampliar_ic, que
+solo remuestrea sus comentarios.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from kneechat.datos import TIPO_COMENTARIO
+
+N_BOOT = 2000
+SEMILLA = 0
+NIVEL = 0.95
+MIN_FRASES_IC = 3
+# Elementos de la matriz de remuestreo por lote: acota la memoria y mantiene
+# los temporales (~2 MiB cada uno) en caché, que es lo que domina el coste
+MAX_ELEMENTOS_LOTE = 250_000
+
+
+def medias_bootstrap(valores, grupos, n_boot=N_BOOT, semilla=SEMILLA):
+    """
+    Medias bootstrap por grupo.
+
+    valores y grupos son arrays del mismo largo. Devuelve (etiquetas de grupo
+    ordenadas, matriz n_boot × n_grupos de medias remuestreadas).
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    etiquetas, codigos = np.unique(np.asarray(grupos), return_inverse=True)
+    orden = np.argsort(codigos, kind="stable")
+    x = valores[orden]
+    codigos = codigos[orden]
+    n = np.bincount(codigos, minlength=len(etiquetas))
+    inicios = np.concatenate([[0], np.cumsum(n)[:-1]])
+    # Para cada posición, el inicio y el tamaño de su entrevista
+    inicio_fila = inicios[codigos]
+    n_fila = n[codigos]
+
+    rng = np.random.default_rng(semilla)
+    medias = np.empty((n_boot, len(etiquetas)))
+    if len(x) == 0:
+        return etiquetas, medias
+    lote = max(1, MAX_ELEMENTOS_LOTE // len(x))
+    for desde in range(0, n_boot, lote):
+        hasta = min(desde + lote, n_boot)
+        # Índice remuestreado = inicio de la entrevista + floor(u · n), en el sitio
+        u = rng.random((hasta - desde, len(x)))
+        np.multiply(u, n_fila, out=u)
+        indices = u.astype(np.int64)
+        indices += inicio_fila
+        sumas = np.add.reduceat(x[indices], inicios, axis=1)
+        medias[desde:hasta] = sumas / n
+    return etiquetas, medias
+
+
+def ic_bootstrap(valores, grupos, n_boot=N_BOOT, semilla=SEMILLA, nivel=NIVEL):
+    """
+    DataFrame indexado por grupo con media, ic_inferior, ic_superior y n.
+
+    Los grupos con menos de MIN_FRASES_IC valores tienen el IC a NaN.
+    """
+    etiquetas, medias = medias_bootstrap(valores, grupos, n_boot, semilla)
+    alfa = (1 - nivel) / 2
+    inferior, superior = np.quantile(medias, [alfa, 1 - alfa], axis=0)
+    resumen = pd.DataFrame({"valor": np.asarray(valores, dtype=np.float64), "grupo": np.asarray(grupos)})
+    resumen = resumen.groupby("grupo")["valor"].agg(media="mean", n="count").reindex(etiquetas)
+    resumen["ic_inferior"] = inferior
+    resumen["ic_superior"] = superior
+    pocas = resumen["n"] < MIN_FRASES_IC
+    resumen.loc[pocas, ["ic_inferior", "ic_superior"]] = np.nan
+    resumen.index.name = None
+    return resumen[["media", "ic_inferior", "ic_superior", "n"]]
+
+
+def ic_comentarios(df, n_boot=N_BOOT, semilla=SEMILLA):
+    """IC bootstrap por entrevista de los comentarios con sentimiento de df (un DataFrame de Dataset)."""
+    comentarios = df.loc[
+        (df["tipo"] == TIPO_COMENTARIO) & df["sent_robertuito"].notna(),
+        ["id_entrevista", "sent_robertuito"],
+    ]
+    return ic_bootstrap(
+        comentarios["sent_robertuito"].to_numpy(),
+        comentarios["id_entrevista"].to_numpy(),
+        n_boot, semilla,
+    )
+
+
+def ampliar_ic(ic, df_nuevas, n_boot=N_BOOT, semilla=SEMILLA):
+    """
+    ic (de ic_comentarios) con las entrevistas de df_nuevas añadidas.
+
+    Solo se remuestrean los comentarios nuevos, así que las entrevistas de
+    df_nuevas no pueden estar ya en ic (kneechat.ingesta añade cada
+    entrevista una vez, completa). Sus intervalos salen de otro tramo del
+    generador aleatorio que si se recalculara todo: difieren solo en el
+    ruido del remuestreo.
+    """
+    nuevas = ic_comentarios(df_nuevas, n_boot, semilla)
+    if nuevas.empty:
+        return ic
+    return pd.concat([ic, nuevas]).sort_index()
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _ic_version(version, n_boot, semilla, _datos):
+    return ic_comentarios(_datos.df_comentarios, n_boot, semilla)
+
+
+def ic_sentimiento_entrevistas(datos, n_boot=N_BOOT, semilla=SEMILLA):
+    """IC bootstrap por entrevista, cacheado por versión del Dataset."""
+    return _ic_version(datos.version, n_boot, semilla, datos)
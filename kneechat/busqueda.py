@@ -0,0 +1,215 @@
+"""
+Búsqueda de texto completo sobre la columna `frase`.
+
+Índice invertido construido una vez por versión del dataset, con plegado de
+acentos, stopwords del español y un stemmer ligero por sufijos; con
+entrevistas nuevas (kneechat.ingesta) se amplía tokenizando solo sus frases.
+Las consultas se puntúan con BM25 recorriendo solo las listas de apariciones
+(postings) de los términos buscados, así que su coste no depende del tamaño
+del corpus sino de lo frecuentes que sean esos términos.
+"""
+import copy
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import streamlit as st
+
+PATRON_TOKEN = r"[a-z0-9]+"
+K1 = 1.2
+B = 0.75
+# Fusión de segmentos del índice (ver _fusionar)
+FACTOR_FUSION = 2
+
+# Stopwords del español ya sin acentos (se comparan tras el plegado)
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes asi aun aunque cada
+como con contra cual cuando de del desde donde dos el ella ellas ello ellos
+en entre era eran es esa esas ese eso esos esta estaba estado estan estar
+estas este esto estos estoy fue fueron ha habia han has hasta hay he la las
+le les lo los me mi mis mas muy nada ni no nos nosotros o os otra otras otro
+otros para pero poco por porque pues que quien se sea ser si sin sobre son su
+sus tambien tan te tener tengo tiene tienen todo todos tu tus un una unas uno
+unos usted ustedes va vamos y ya yo
+""".split())
+
+# Sufijos a recortar, del más largo al más corto (stemmer ligero)
+SUFIJOS = (
+    "amientos", "imientos", "aciones", "uciones", "amiento", "imiento",
+    "adoras", "adores", "ancias", "encias", "idades", "mente", "acion",
+    "ucion", "adora", "ador", "ancia", "encia", "idad", "ismo", "able",
+    "ible", "ista", "osos", "osas", "ando", "iendo", "aron", "ieron", "oso",
+    "osa", "aba", "ado", "ido", "ada", "ida", "ar", "er", "ir", "as", "es",
+    "os", "a", "e", "o", "s",
+)
+MIN_RAIZ = 3
+
+
+def plegar(texto):
+    """Minúsculas y sin acentos ("Anestesia" y "anestésia" -> "anestesia")."""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def plegar_corpus(frases):
+    """Versión vectorizada de plegar para una Series de frases (nulos -> "")."""
+    return (
+        frases.fillna("").astype(str).str.lower()
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    )
+
+
+def raiz(token):
+    """Recorta el sufijo más largo que deje una raíz de al menos MIN_RAIZ letras."""
+    for sufijo in SUFIJOS:
+        if token.endswith(sufijo) and len(token) - len(sufijo) >= MIN_RAIZ:
+            return token[:-len(sufijo)]
+    return token
+
+
+def tokenizar(texto):
+    """Términos indexables de un texto (plegado, sin stopwords y con raíz)."""
+    return [raiz(t) for t in re.findall(PATRON_TOKEN, plegar(texto)) if t not in STOPWORDS]
+
+
+def _fusionar(segmentos):
+    """
+    Fusiona los últimos segmentos mientras el penúltimo no sea mayor que
+    FACTOR_FUSION veces el último: quedan O(log n) segmentos y cada aparición
+    se copia O(log n) veces en total.
+    """
+    while len(segmentos) > 1 and segmentos[-2][1].nnz <= FACTOR_FUSION * segmentos[-1][1].nnz:
+        (inicio, a), (_, b) = segmentos[-2:]
+        segmentos = segmentos[:-2] + ((inicio, sp.hstack([_con_filas(a, b.shape[0]), b], format="csr")),)
+    return segmentos
+
+
+def _con_filas(matriz, filas):
+    """
+    La matriz CSR con filas vacías añadidas hasta tener `filas` (términos
+    nuevos del vocabulario). Comparte datos e índices con la original, que
+    no se modifica (resize lo haría, y la pueden estar usando otras copias).
+    """
+    relleno = np.full(filas - matriz.shape[0], matriz.indptr[-1], dtype=matriz.indptr.dtype)
+    return sp.csr_matrix(
+        (matriz.data, matriz.indices, np.concatenate([matriz.indptr, relleno])),
+        shape=(filas, matriz.shape[1]),
+    )
+
+
+def _tokens_corpus(frases):
+    """Serie (índice = posición de la frase) con un término por fila."""
+    tokens = plegar_corpus(frases).str.findall(PATRON_TOKEN).explode().dropna()
+    tokens = tokens[~tokens.isin(STOPWORDS)]
+    # El stemmer se aplica una vez por token distinto, no por aparición
+    unicos = tokens.unique()
+    raices = dict(zip(unicos, map(raiz, unicos)))
+    return tokens.map(raices)
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido por segmentos, puntuado con BM25.
+
+    Cada segmento es una matriz dispersa (término x frase) con las
+    frecuencias de un bloque de frases consecutivas. Con frases nuevas se
+    añade un segmento sin tocar los anteriores (como en MetricasKPI,
+    copiar().actualizar(frases)); los segmentos pequeños se fusionan para
+    que no se acumulen. BM25 se calcula al consultar, solo sobre las
+    apariciones de los términos buscados, con las estadísticas globales
+    (número de frases, longitud media y frases por término), así que el
+    resultado no depende de cómo se haya construido el índice.
+    """
+
+    def __init__(self, frases=()):
+        self.n_frases = 0
+        self.vocabulario = {}  # término -> fila
+        self._segmentos = ()  # (primera frase, frecuencias término x frase en CSR)
+        self._longitudes = np.empty(0, dtype=np.float32)
+        self._suma_longitudes = 0.0
+        self._frases_termino = np.empty(0, dtype=np.int64)
+        if len(frases):
+            self.actualizar(pd.Series(frases))
+
+    def copiar(self):
+        """Copia que se puede actualizar sin cambiar esta (los segmentos y arrays no se modifican en el sitio)."""
+        copia = copy.copy(self)
+        copia.vocabulario = dict(self.vocabulario)
+        return copia
+
+    def actualizar(self, frases_nuevas):
+        """Añade frases al final del índice. El coste depende de las frases nuevas."""
+        frases = frases_nuevas.reset_index(drop=True)
+        tokens = _tokens_corpus(frases)
+        for termino in pd.unique(tokens):
+            self.vocabulario.setdefault(termino, len(self.vocabulario))
+        ids_termino = tokens.map(self.vocabulario).to_numpy(dtype=np.int64)
+        docs = tokens.index.to_numpy()
+
+        # Frecuencias (término x frase); los duplicados se suman al convertir
+        tf = sp.coo_matrix(
+            (np.ones(len(docs), dtype=np.float32), (ids_termino, docs)),
+            shape=(len(self.vocabulario), len(frases)),
+        ).tocsr()
+
+        longitudes = np.bincount(docs, minlength=len(frases)).astype(np.float32)
+        self._longitudes = np.concatenate([self._longitudes, longitudes])
+        self._suma_longitudes += float(longitudes.sum())
+        frases_termino = np.zeros(len(self.vocabulario), dtype=np.int64)
+        frases_termino[:len(self._frases_termino)] = self._frases_termino
+        self._frases_termino = frases_termino + np.diff(tf.indptr)
+        self._segmentos = _fusionar(self._segmentos + ((self.n_frases, tf),))
+        self.n_frases += len(frases)
+        return self
+
+    def puntuar(self, consulta):
+        """(posiciones, puntuaciones) de las frases que contienen algún término."""
+        ids = [self.vocabulario[t] for t in set(tokenizar(consulta)) if t in self.vocabulario]
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        frases_termino = self._frases_termino[ids]
+        idf = np.log1p((self.n_frases - frases_termino + 0.5) / (frases_termino + 0.5))
+        docs, tf, idf_aparicion = [], [], []
+        for inicio, matriz in self._segmentos:
+            for termino, idf_termino in zip(ids, idf):
+                if termino >= matriz.shape[0]:
+                    continue
+                trozo = slice(matriz.indptr[termino], matriz.indptr[termino + 1])
+                docs.append(matriz.indices[trozo] + inicio)
+                tf.append(matriz.data[trozo])
+                idf_aparicion.append(np.full(trozo.stop - trozo.start, idf_termino))
+        docs, tf, idf_aparicion = np.concatenate(docs), np.concatenate(tf), np.concatenate(idf_aparicion)
+        media_long = self._suma_longitudes / self.n_frases
+        norma = K1 * (1 - B + B * self._longitudes[docs] / max(media_long, 1e-9))
+        pesos = idf_aparicion * tf * (K1 + 1) / (tf + norma)
+        posiciones, inversa = np.unique(docs, return_inverse=True)
+        return posiciones, np.bincount(inversa, weights=pesos).astype(np.float32)
+
+    def buscar(self, consulta, mascara=None, limite=None):
+        """
+        Posiciones de las frases ordenadas por relevancia BM25.
+
+        mascara: array booleano opcional (p. ej. IndiceFrases.mascara) para
+        restringir los resultados a unos filtros.
+        """
+        posiciones, puntuaciones = self.puntuar(consulta)
+        if mascara is not None:
+            dentro = mascara[posiciones]
+            posiciones, puntuaciones = posiciones[dentro], puntuaciones[dentro]
+        if limite is not None and limite < len(posiciones):
+            mejores = np.argpartition(-puntuaciones, limite)[:limite]
+            posiciones, puntuaciones = posiciones[mejores], puntuaciones[mejores]
+        orden = np.argsort(-puntuaciones, kind="stable")
+        return posiciones[orden], puntuaciones[orden]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _busqueda_version(version, _datos):
+    return IndiceBusqueda(_datos.df["frase"])
+
+
+def indice_busqueda(datos):
+    """Índice de búsqueda cacheado para la versión del Dataset."""
+    return _busqueda_version(datos.version, datos)
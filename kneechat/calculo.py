@@ -0,0 +1,102 @@
+"""
+Núcleo de cálculo del dashboard: funciones puras, sin Streamlit.
+
+Reciben el Dataset (o sus DataFrames) y devuelven tablas nuevas, sin
+modificar los DataFrames compartidos ni depender de cachés, de modo que
+app.py, el informe estático (kneechat.informe) y los benchmarks calculan lo
+mismo. Las cachés por versión viven en la capa de vista (cubo_agregados,
+ic_sentimiento_entrevistas, ...), que llama a estas funciones.
+
+    datos.leer_dataset             carga del dataset (sin caché)
+    frecuencias_categorias         frases y pacientes por categoría
+    estadisticas_entrevistas       sentimiento medio e IC por entrevista
+    distribucion_sentimiento       comentarios por categoría de sentimiento
+    tabla_distribucion_sentimiento lo mismo a partir de conteos ya agregados
+    graficos.construir_figuras     todas las figuras a partir de lo anterior
+"""
+import pandas as pd
+
+from kneechat.bootstrap import MIN_FRASES_IC, ic_comentarios
+from kneechat.datos import TIPO_COMENTARIO
+from kneechat.sentimiento import ORDEN_SENTIMIENTO, bucketizar_sentimiento
+
+METODOS_IC = ("Bootstrap", "Normal (1.96·SEM)")
+
+
+def comentarios(df):
+    """Frases de tipo Comentario/reflexión (las que expresan sentimiento)."""
+    return df[df["tipo"] == TIPO_COMENTARIO]
+
+
+def frecuencias_categorias(df, dimension):
+    """
+    Tabla [dimension, Frases, Pacientes] ordenada por frases descendente.
+
+    Pacientes es el número de entrevistas distintas con alguna frase de la
+    categoría.
+    """
+    tabla = df.groupby(dimension, observed=True).agg(
+        Frases=(dimension, "count"),
+        Pacientes=("num_entrevista", "nunique")
+    ).reset_index().sort_values(by="Frases", ascending=False, kind="stable")
+    # Texto en lugar de categoría para que los gráficos respeten este orden
+    tabla[dimension] = tabla[dimension].astype(str)
+    return tabla.reset_index(drop=True)
+
+
+def estadisticas_entrevistas(datos, metodo_ic=METODOS_IC[0], min_frases=MIN_FRASES_IC, ic=None):
+    """
+    Sentimiento medio por entrevista con su IC ~95%, ordenado por la media.
+
+    Devuelve (tabla, excluidas). La tabla tiene num_entrevista,
+    mean_robertuito, sem_robertuito, count_frases, Sentimiento, ci_sup,
+    ci_inf y point_size, y su índice es la posición en el orden. Las
+    entrevistas con menos de min_frases comentarios no tienen un IC estimable
+    y se excluyen; excluidas es cuántas.
+
+    ic es el resultado de bootstrap.ic_comentarios si ya se tiene (p. ej.
+    cacheado por versión); si no, se calcula.
+    """
+    df_comentarios = datos.df_comentarios
+    df_grouped = df_comentarios.groupby(
+        "id_entrevista"
+    )["sent_robertuito"].agg(["mean", "sem", "count"]).reset_index()
+    df_grouped.columns = ['num_entrevista', 'mean_robertuito', 'sem_robertuito', 'count_frases']
+
+    df_grouped['Sentimiento'] = bucketizar_sentimiento(df_grouped['mean_robertuito'])
+
+    if metodo_ic == "Bootstrap":
+        if ic is None:
+            ic = ic_comentarios(datos.df_comentarios)
+        ic = ic.reindex(df_grouped['num_entrevista'])
+        df_grouped['ci_sup'] = ic['ic_superior'].to_numpy() - df_grouped['mean_robertuito']
+        df_grouped['ci_inf'] = df_grouped['mean_robertuito'] - ic['ic_inferior'].to_numpy()
+    else:
+        df_grouped['ci_sup'] = df_grouped['ci_inf'] = 1.96 * df_grouped['sem_robertuito']
+
+    excluidas = int((df_grouped['count_frases'] < min_frases).sum())
+    df_grouped = df_grouped[df_grouped['count_frases'] >= min_frases]
+    df_grouped = df_grouped.assign(point_size=df_grouped['count_frases'] * 2)
+    return df_grouped.sort_values("mean_robertuito").reset_index(drop=True), excluidas
+
+
+def distribucion_sentimiento(df):
+    """Cantidad y porcentaje de comentarios por categoría de sentimiento."""
+    return tabla_distribucion_sentimiento(comentarios(df)["Sentimiento"].value_counts())
+
+
+def tabla_distribucion_sentimiento(conteos):
+    """
+    Tabla del gráfico de distribución a partir de los comentarios por categoría
+    (p. ej. MetricasKPI.comentarios_por_sentimiento, que se actualiza en
+    incrementos).
+    """
+    conteos = conteos.reindex(ORDEN_SENTIMIENTO, fill_value=0)
+    total = conteos.sum()
+    df_percent = pd.DataFrame({
+        "Sentimiento": ORDEN_SENTIMIENTO,
+        "Porcentaje": (conteos / total * 100 if total else conteos * 0.0).to_numpy(),
+        "Cantidad de frases": conteos.to_numpy(),
+    })
+    df_percent["dummy"] = "Total"  # Columna dummy para generar una única barra
+    return df_percent
@@ -0,0 +1,408 @@
+"""
+Pipeline offline de clasificación de frases (`tipo`, `DudasFrecuentes` y
+`Tiporeflexión`).
+
+Sustituye al etiquetado manual de cada oleada nueva. Un modelo lineal
+(regresión logística multinomial sobre TF-IDF de n-gramas de caracteres con
+hashing) se entrena con las filas ya etiquetadas del libro y etiqueta las
+frases sin `tipo` por lotes vectorizados, en un pool de hilos o de procesos.
+Como en el libro, la categoría de duda solo se asigna a las frases
+clasificadas como Duda/pregunta y la de reflexión a las Comentario/reflexión.
+Cada etiqueta lleva una columna confianza_<columna> con la probabilidad que
+le da el modelo (las filas etiquetadas a mano la dejan vacía).
+
+Al entrenar se estima el acierto de cada modelo con validación cruzada. Las
+columnas cuyo modelo no supera con claridad a la clase mayoritaria (ver
+supera_referencia) no se escriben: esas frases quedan sin etiqueta (y sin
+confianza) hasta que haya más filas etiquetadas a mano.
+
+Las predicciones se guardan en una caché SQLite por (modelo, hash de frase)
+con kneechat.lotes, como las puntuaciones de kneechat.puntuacion: con el
+mismo modelo una frase nunca se clasifica dos veces y una ejecución
+interrumpida continúa donde se quedó.
+
+Las frases que quedan como Comentario/reflexión sin `sent_robertuito` se
+puntúan después con kneechat.puntuacion.
+
+Uso:
+    python -m kneechat.clasificacion
+    python -m kneechat.clasificacion oleada.csv --salida oleada.parquet --procesos --trabajadores 4
+"""
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.optimize import minimize
+
+from kneechat import snapshot
+from kneechat.busqueda import plegar_corpus
+from kneechat.datos import TIPO_COMENTARIO
+from kneechat.lotes import CacheSQLite, procesar_frases
+
+RUTA_CACHE = snapshot.DIR_SNAPSHOTS / "clasificacion.sqlite"
+TAMANO_LOTE = 4096
+
+# Subcategoría -> tipo de frase al que se aplica
+SUBCATEGORIAS = {"DudasFrecuentes": "Duda/pregunta", "Tiporeflexión": TIPO_COMENTARIO}
+COLUMNAS = ("tipo", *SUBCATEGORIAS)
+COLUMNAS_SALIDA = tuple(c for col in COLUMNAS for c in (col, f"confianza_{col}"))
+
+# Características: n-gramas de 2 a 5 caracteres en un espacio de 2^20 columnas
+NGRAMAS = (2, 3, 4, 5)
+BITS_HASH = 20
+PRIMO_HASH = 1_000_003
+MEZCLA_HASH = 0x9E3779B97F4A7C15  # multiplicador de Fibonacci para repartir los bits altos
+REGULARIZACION = 1e-3
+MAX_ITERACIONES = 300
+
+# Validación cruzada al entrenar: una columna solo se escribe si su acierto
+# supera al de la clase mayoritaria por más que el error de muestreo
+# (unilateral al 95%)
+PLIEGUES = 5
+Z_REFERENCIA = 1.645
+
+
+def ngramas_hash(frases, ngramas=NGRAMAS, bits=BITS_HASH):
+    """
+    (fila, columna) de cada n-grama de caracteres de cada frase.
+
+    El texto se pliega como en la búsqueda (minúsculas, sin acentos) y se
+    rodea de espacios para marcar los bordes. El hash polinómico se calcula
+    con numpy sobre todas las frases a la vez, y es estable entre procesos
+    (a diferencia de hash()).
+    """
+    textos = (" " + plegar_corpus(pd.Series(frases, dtype=object)) + " ").tolist()
+    longitudes = np.fromiter(map(len, textos), dtype=np.int64, count=len(textos))
+    caracteres = np.frombuffer("".join(textos).encode("ascii"), dtype=np.uint8).astype(np.uint64)
+    fila = np.repeat(np.arange(len(textos)), longitudes)
+    fin = np.cumsum(longitudes)[fila]
+    posicion = np.arange(len(caracteres))
+
+    filas, columnas = [], []
+    h = np.zeros(len(caracteres), dtype=np.uint64)
+    primo, mezcla = np.uint64(PRIMO_HASH), np.uint64(MEZCLA_HASH)
+    for k in range(1, max(ngramas) + 1):
+        # h[i] pasa a ser el hash del k-grama que empieza en i (desborda en módulo 2^64)
+        h[:len(h) - k + 1] = h[:len(h) - k + 1] * primo + caracteres[k - 1:]
+        if k in ngramas:
+            validos = posicion + k <= fin
+            filas.append(fila[validos])
+            columnas.append(((h[validos] * mezcla) >> np.uint64(64 - bits)).astype(np.int64))
+    return np.concatenate(filas), np.concatenate(columnas)
+
+
+def matriz_ngramas(frases, bits=BITS_HASH):
+    """Conteos (frases x 2^bits) de n-gramas de caracteres, en CSR."""
+    filas, columnas = ngramas_hash(frases, bits=bits)
+    conteos = sp.csr_matrix(
+        (np.ones(len(filas), dtype=np.float32), (filas, columnas)),
+        shape=(len(frases), 1 << bits),
+    )
+    conteos.sum_duplicates()
+    return conteos
+
+
+class ModeloLineal:
+    """
+    Regresión logística multinomial con regularización L2 sobre TF-IDF.
+
+    Solo guarda pesos para las columnas de hashing vistas al entrenar (el
+    resto tendría peso cero), así que el modelo ocupa poco y se envía
+    barato a los procesos del pool. Las clases se ponderan de forma
+    inversa a su frecuencia para que las categorías raras no desaparezcan.
+    """
+
+    def __init__(self, conteos, etiquetas, regularizacion=REGULARIZACION):
+        self.clases, y = np.unique(np.asarray(etiquetas, dtype=str), return_inverse=True)
+        self.columnas = np.unique(conteos.indices)
+        x = conteos[:, self.columnas]
+        n = x.shape[0]
+        apariciones = np.bincount(x.indices, minlength=len(self.columnas))
+        self.idf = (np.log((1 + n) / (1 + apariciones)) + 1).astype(np.float32)
+        x = self._tfidf(x).astype(np.float64)
+
+        n_clases = len(self.clases)
+        objetivo = np.zeros((n, n_clases))
+        objetivo[np.arange(n), y] = 1.0
+        pesos = (n / (n_clases * np.bincount(y, minlength=n_clases)))[y][:, None]
+        pesos /= pesos.sum()
+
+        def perdida(parametros):
+            w = parametros[:-n_clases].reshape(-1, n_clases)
+            b = parametros[-n_clases:]
+            logits = x @ w + b
+            logits -= logits.max(axis=1, keepdims=True)
+            log_p = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+            error = (np.exp(log_p) - objetivo) * pesos
+            valor = -(pesos * objetivo * log_p).sum() + regularizacion / 2 * (w * w).sum()
+            gradiente = np.concatenate([(x.T @ error + regularizacion * w).ravel(), error.sum(axis=0)])
+            return valor, gradiente
+
+        inicial = np.zeros(len(self.columnas) * n_clases + n_clases)
+        optimo = minimize(perdida, inicial, jac=True, method="L-BFGS-B",
+                          options={"maxiter": MAX_ITERACIONES})
+        self.pesos = optimo.x[:-n_clases].reshape(-1, n_clases).astype(np.float32)
+        self.sesgo = optimo.x[-n_clases:].astype(np.float32)
+
+    def _tfidf(self, x):
+        """tf sublineal (1 + log) por idf, con filas de norma L2 unidad."""
+        x = x.copy()
+        x.data = 1 + np.log(x.data)
+        x = x @ sp.diags(self.idf)
+        normas = np.sqrt(np.asarray(x.multiply(x).sum(axis=1)).ravel())
+        normas[normas == 0] = 1
+        return sp.diags(1 / normas.astype(np.float32)) @ x
+
+    def probabilidades(self, conteos):
+        """Matriz (frases x clases) de probabilidades."""
+        logits = self._tfidf(conteos[:, self.columnas]) @ self.pesos + self.sesgo
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        return p / p.sum(axis=1, keepdims=True)
+
+    def predecir(self, conteos):
+        """(etiquetas, confianzas) de cada frase."""
+        p = self.probabilidades(conteos)
+        mejor = p.argmax(axis=1)
+        return self.clases[mejor], p[np.arange(len(mejor)), mejor]
+
+
+def _entrenamiento(df):
+    """{columna: (conteos, etiquetas)} de las filas etiquetadas de cada columna."""
+    etiquetadas = df[df["tipo"].notna()]
+    conteos = matriz_ngramas(etiquetadas["frase"].astype(str).to_numpy())
+    datos = {"tipo": (conteos, etiquetadas["tipo"].astype(str).to_numpy())}
+    for columna in SUBCATEGORIAS:
+        con_etiqueta = etiquetadas[columna].notna().to_numpy()
+        datos[columna] = (conteos[con_etiqueta], etiquetadas.loc[con_etiqueta, columna].astype(str).to_numpy())
+    return datos
+
+
+def validacion_cruzada(df, pliegues=PLIEGUES, semilla=0):
+    """
+    {columna: (acierto, acierto de la clase mayoritaria, filas)} con validación cruzada.
+
+    Cada columna se evalúa sobre sus filas etiquetadas (las subcategorías,
+    sobre las frases de su tipo). La referencia predice siempre la clase más
+    frecuente del pliegue de entrenamiento.
+    """
+    resultado = {}
+    for columna, (conteos, etiquetas) in _entrenamiento(df).items():
+        orden = np.random.default_rng(semilla).permutation(len(etiquetas))
+        aciertos, referencia = [], []
+        for prueba in np.array_split(orden, pliegues):
+            entrenamiento = np.setdiff1d(orden, prueba)
+            predichas, _ = ModeloLineal(conteos[entrenamiento], etiquetas[entrenamiento]).predecir(conteos[prueba])
+            clases, frecuencias = np.unique(etiquetas[entrenamiento], return_counts=True)
+            aciertos.append(predichas == etiquetas[prueba])
+            referencia.append(etiquetas[prueba] == clases[frecuencias.argmax()])
+        resultado[columna] = (
+            float(np.concatenate(aciertos).mean()), float(np.concatenate(referencia).mean()), len(etiquetas),
+        )
+    return resultado
+
+
+def supera_referencia(acierto, referencia, n):
+    """
+    Si el acierto supera al de la clase mayoritaria con n filas evaluadas.
+
+    El margen es Z_REFERENCIA errores típicos de una proporción igual a la
+    referencia: con 55 frases y referencia 0.49 hace falta ~0.60, con 300
+    frases y referencia 0.56 basta ~0.61.
+    """
+    return acierto > referencia + Z_REFERENCIA * np.sqrt(referencia * (1 - referencia) / n)
+
+
+class Clasificador:
+    """
+    Los tres modelos (tipo y sus dos subcategorías) entrenados con las filas etiquetadas.
+
+    validacion es el resultado de validacion_cruzada y fiables las columnas
+    que se escriben (las que pasan supera_referencia); las demás se dejan
+    vacías.
+    """
+
+    def __init__(self, df):
+        self.modelos = {
+            columna: ModeloLineal(conteos, etiquetas)
+            for columna, (conteos, etiquetas) in _entrenamiento(df).items()
+        }
+        self.validacion = validacion_cruzada(df)
+        self.fiables = frozenset(
+            columna for columna, validacion in self.validacion.items() if supera_referencia(*validacion)
+        )
+
+        # Versión del modelo (clave de la caché): datos de entrenamiento y parámetros
+        etiquetadas = df[df["tipo"].notna()]
+        huella = hashlib.sha256(repr((NGRAMAS, BITS_HASH, REGULARIZACION, PLIEGUES, Z_REFERENCIA)).encode())
+        huella.update(pd.util.hash_pandas_object(
+            etiquetadas[["frase", *COLUMNAS]].astype(str), index=False
+        ).to_numpy().tobytes())
+        self.version = huella.hexdigest()[:16]
+
+    def clasificar(self, frases):
+        """DataFrame con COLUMNAS_SALIDA (etiqueta y confianza de cada columna) por frase."""
+        conteos = matriz_ngramas(frases)
+        resultado = {}
+        tipos = np.full(len(frases), None, dtype=object)
+        for columna in COLUMNAS:
+            etiquetas = np.full(len(frases), None, dtype=object)
+            confianzas = np.full(len(frases), np.nan, dtype=np.float32)
+            aplica = np.ones(len(frases), dtype=bool) if columna == "tipo" else tipos == SUBCATEGORIAS[columna]
+            if columna in self.fiables and aplica.any():
+                etiquetas[aplica], confianzas[aplica] = self.modelos[columna].predecir(conteos[aplica])
+            if columna == "tipo":
+                tipos = etiquetas
+            resultado[columna] = etiquetas
+            resultado[f"confianza_{columna}"] = confianzas
+        return pd.DataFrame(resultado, columns=COLUMNAS_SALIDA)
+
+
+class CachePredicciones(CacheSQLite):
+    """Caché persistente (SQLite) de predicciones por (versión del modelo, hash de frase)."""
+
+    def __init__(self, ruta=RUTA_CACHE):
+        super().__init__(ruta, "predicciones", "modelo", [
+            "tipo TEXT", "confianza_tipo REAL", "dudas TEXT", "confianza_dudas REAL",
+            "reflexion TEXT", "confianza_reflexion REAL",
+        ])
+
+
+def _filas(clasificador, frases):
+    """Predicciones de un lote como tuplas (sin NaN, para guardarlas en SQLite)."""
+    resultado = clasificador.clasificar(frases).astype(object)
+    return list(resultado.where(resultado.notna(), None).itertuples(index=False, name=None))
+
+
+def clasificar_frases(frases, clasificador, cache=None, tamano_lote=TAMANO_LOTE,
+                      trabajadores=1, procesos=False, progreso=None):
+    """
+    Clasifica una lista de frases y devuelve un DataFrame con COLUMNAS_SALIDA.
+
+    El clasificador se envía una vez a cada proceso del pool. La caché y el
+    reparto en lotes son los de kneechat.lotes.procesar_frases.
+    """
+    filas = procesar_frases(
+        frases, cache or CachePredicciones(), clasificador.version, _filas, objeto=clasificador,
+        tamano_lote=tamano_lote, trabajadores=trabajadores, procesos=procesos, progreso=progreso,
+    )
+    resultado = pd.DataFrame(filas, columns=COLUMNAS_SALIDA)
+    for columna in COLUMNAS:
+        resultado[f"confianza_{columna}"] = resultado[f"confianza_{columna}"].astype("float32")
+    return resultado
+
+
+def filas_pendientes(df):
+    """Máscara de filas sin `tipo` (las que hay que clasificar)."""
+    if "tipo" not in df.columns:
+        return pd.Series(True, index=df.index)
+    return df["tipo"].isna()
+
+
+def etiquetar(df, clasificador, **kwargs):
+    """
+    Copia de df con las filas pendientes etiquetadas y las columnas de confianza.
+
+    Las etiquetas quedan en las mismas columnas y con los mismos valores que
+    las del libro, así que las tablas y gráficos del dashboard las agrupan
+    sin cambios. Devuelve (df, filas etiquetadas).
+    """
+    df = df.copy()
+    mascara = filas_pendientes(df).to_numpy()
+    for columna in COLUMNAS_SALIDA:
+        if columna not in df.columns:
+            df[columna] = np.nan if columna.startswith("confianza_") else None
+    if not mascara.any():
+        return df, 0
+    predicciones = clasificar_frases(df.loc[mascara, "frase"].astype(str).tolist(), clasificador, **kwargs)
+    for columna in COLUMNAS_SALIDA:
+        valores = df[columna].astype("float32" if columna.startswith("confianza_") else object)
+        valores[mascara] = predicciones[columna].to_numpy()
+        df[columna] = valores
+    return df, int(mascara.sum())
+
+
+def clasificar_snapshot(ruta_xlsx, clasificador=None, **kwargs):
+    """
+    Etiqueta las filas sin `tipo` del snapshot del libro y lo reescribe.
+
+    Si no se pasa clasificador se entrena con las filas etiquetadas del
+    propio libro. Como en kneechat.puntuacion, el hash de versión del
+    snapshot cambia para que las cachés del dashboard se recalculen.
+    Devuelve el número de filas etiquetadas.
+    """
+    ruta_snap = snapshot.ruta_snapshot(ruta_xlsx)
+    if snapshot.leer_metadatos(ruta_snap) is None:
+        snapshot.convertir(ruta_xlsx, ruta_snap)
+    df = snapshot.leer_snapshot(ruta_snap)
+    metadatos = snapshot.leer_metadatos(ruta_snap)
+
+    if not filas_pendientes(df).any():
+        return 0
+    clasificador = clasificador or Clasificador(df)
+    df, n = etiquetar(df, clasificador, **kwargs)
+
+    huella = hashlib.sha256(metadatos["hash"].encode())
+    huella.update(pd.util.hash_pandas_object(df[list(COLUMNAS)].astype(str), index=False).to_numpy().tobytes())
+    metadatos = {**metadatos, "hash": huella.hexdigest()[:16], "clasificado_con": clasificador.version}
+    snapshot.escribir_snapshot(snapshot.tipar(df), ruta_snap, metadatos)
+    return n
+
+
+def clasificar_archivo(origen, salida, entrenamiento, clasificador=None, **kwargs):
+    """
+    Etiqueta las frases sin `tipo` de una oleada nueva y la escribe en salida.
+
+    Si no se pasa clasificador se entrena con las filas etiquetadas de
+    entrenamiento (el libro principal). La salida (.parquet, .csv o .xlsx)
+    puede registrarse como cohorte con kneechat.cohortes. Devuelve el número
+    de filas etiquetadas.
+    """
+    clasificador = clasificador or Clasificador(snapshot.leer_origen(entrenamiento))
+    df, n = etiquetar(snapshot.leer_origen(origen), clasificador, **kwargs)
+    salida = Path(salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    if salida.suffix.lower() == ".parquet":
+        df.to_parquet(salida, index=False)
+    elif salida.suffix.lower() == ".csv":
+        df.to_csv(salida, index=False)
+    else:
+        df.to_excel(salida, index=False)
+    return n
+
+
+def main(argv=None):
+    from kneechat.datos import RUTA_DATASET
+
+    parser = argparse.ArgumentParser(description="Clasifica las frases sin etiquetar.")
+    parser.add_argument("origen", nargs="?", default=str(RUTA_DATASET),
+                        help="libro o fichero de la oleada (.xlsx, .csv o .parquet)")
+    parser.add_argument("--salida", help="escribir aquí la oleada etiquetada (si no, se etiqueta el snapshot del libro)")
+    parser.add_argument("--entrenamiento", default=str(RUTA_DATASET),
+                        help="libro con las filas etiquetadas para entrenar (con --salida)")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE)
+    parser.add_argument("--trabajadores", type=int, default=1)
+    parser.add_argument("--procesos", action="store_true", help="usar procesos en lugar de hilos")
+    args = parser.parse_args(argv)
+
+    clasificador = Clasificador(snapshot.leer_origen(args.entrenamiento if args.salida else args.origen))
+    for columna, (acierto, referencia, filas) in clasificador.validacion.items():
+        estado = "se escribe" if columna in clasificador.fiables else "NO se escribe (no supera a la clase mayoritaria)"
+        print(f"{columna}: acierto {acierto:.2f}, clase mayoritaria {referencia:.2f} ({filas} filas), {estado}")
+    opciones = dict(
+        clasificador=clasificador, tamano_lote=args.lote, trabajadores=args.trabajadores,
+        procesos=args.procesos, progreso=lambda i, total: print(f"lote {i}/{total}", flush=True),
+    )
+    if args.salida:
+        n = clasificar_archivo(args.origen, args.salida, args.entrenamiento, **opciones)
+    else:
+        n = clasificar_snapshot(args.origen, **opciones)
+    print(json.dumps({"filas_etiquetadas": n, "columnas": sorted(clasificador.fiables)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Registro de cohortes (hospitales y oleadas de entrevistas).
+
+El registro es un directorio (KNEECHAT_COHORTES, por defecto cohortes/) con un
+snapshot Arrow por cohorte y un manifiesto cohortes.json. Junto a cada
+snapshot se guarda un resumen de agregados (<id>.resumen.json) con las frases y
+pacientes por categoría y el sentimiento medio, de modo que las comparaciones
+entre cohortes se hacen con los resúmenes, sin cargar ni concatenar sus
+DataFrames. Los datos completos de una cohorte solo se cargan al
+seleccionarla, a través de la caché acotada de kneechat.datos.
+
+El dataset principal (el que recibe las entrevistas de kneechat.ingesta)
+está siempre en el registro, el primero; el manifiesto añade cohortes y, con
+una entrada de id "principal", cambia su nombre, sitio u oleada. Su resumen
+sale del estado de la ingesta, con las entrevistas ingeridas, como el resto
+del dashboard. Las entradas del manifiesto sin fichero se descartan con un
+aviso.
+
+Uso:
+    python -m kneechat.cohortes registrar hospital_b_2025 datos.xlsx --nombre "Hospital B (2025)"
+    python -m kneechat.cohortes listar
+"""
+import argparse
+import json
+import logging
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from kneechat import snapshot
+from kneechat.agregados import CuboAgregados, cubo_agregados
+from kneechat.datos import RUTA_DATASET, cargar_dataset, huella_archivo, leer_dataset
+from kneechat.ingesta import DIR_ALMACEN, estado_ingesta
+from kneechat.metricas import MetricasKPI, metricas_kpi
+
+DIR_COHORTES = Path(
+    os.environ.get("KNEECHAT_COHORTES")
+    or Path(__file__).resolve().parent.parent / "cohortes"
+)
+MANIFIESTO = "cohortes.json"
+COHORTE_PRINCIPAL = "principal"
+
+Cohorte = namedtuple("Cohorte", ["id", "nombre", "sitio", "oleada", "ruta"])
+
+_LOGGER = logging.getLogger("kneechat.cohortes")
+
+
+def _escribir_json(ruta, contenido):
+    temporal = Path(ruta).with_suffix(".tmp")
+    temporal.write_text(json.dumps(contenido, indent=2, ensure_ascii=False), encoding="utf-8")
+    temporal.replace(ruta)
+
+
+def leer_registro(directorio=DIR_COHORTES):
+    """Lista de Cohorte: el dataset principal y después las del manifiesto."""
+    cohortes = {COHORTE_PRINCIPAL: Cohorte(COHORTE_PRINCIPAL, "Dataset principal", "", "", RUTA_DATASET)}
+    ruta_manifiesto = Path(directorio) / MANIFIESTO
+    entradas = []
+    if ruta_manifiesto.exists():
+        entradas = json.loads(ruta_manifiesto.read_text(encoding="utf-8"))
+    for e in entradas:
+        # Las entradas se superponen a lo que ya hay (p. ej. el nombre de la principal)
+        cohorte = cohortes.get(e["id"])
+        if cohorte is None:
+            if "fichero" not in e:
+                _LOGGER.warning("%s: la cohorte %r no tiene fichero; se ignora", ruta_manifiesto, e["id"])
+                continue
+            cohorte = Cohorte(e["id"], e["id"], "", "", None)
+        cambios = {campo: e[campo] for campo in ("nombre", "sitio", "oleada") if campo in e}
+        if "fichero" in e:
+            cambios["ruta"] = Path(directorio) / e["fichero"]
+        cohortes[e["id"]] = cohorte._replace(**cambios)
+    return list(cohortes.values())
+
+
+def ruta_resumen(cohorte):
+    return Path(cohorte.ruta).with_suffix(".resumen.json")
+
+
+def resumir(cubo, metricas, version):
+    """Resumen serializable de una cohorte a partir de su cubo y sus métricas."""
+    media, ic_inferior, ic_superior = metricas.sentimiento_medio()
+    return {
+        "version": version,
+        "frases_totales": int(cubo.frases_totales),
+        "pacientes_totales": int(cubo.pacientes_totales),
+        "tablas": {
+            dimension: cubo.tabla(dimension).to_dict("records")
+            for dimension in ("tipo", "DudasFrecuentes", "Tiporeflexión")
+        },
+        "sentimiento": {"media": media, "ic_inferior": ic_inferior, "ic_superior": ic_superior},
+        "entrevistas_sentimiento": metricas.entrevistas_por_sentimiento(),
+    }
+
+
+def registrar(origen, id_cohorte, nombre=None, sitio="", oleada="", directorio=DIR_COHORTES):
+    """
+    Añade (o reemplaza) una cohorte en el registro.
+
+    Convierte el origen (.xlsx, .csv o .parquet) a snapshot dentro del
+    directorio, escribe su resumen y actualiza el manifiesto.
+    """
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    fichero = f"{id_cohorte}.arrow"
+    snapshot.convertir(origen, directorio / fichero)
+
+    cohorte = Cohorte(id_cohorte, nombre or id_cohorte, sitio, oleada, directorio / fichero)
+    datos = leer_dataset(cohorte.ruta)
+    resumen = resumir(CuboAgregados(datos.df, datos.df_relevante),
+                      MetricasKPI.desde_dataframe(datos.df), datos.version)
+    _escribir_json(ruta_resumen(cohorte), resumen)
+
+    ruta_manifiesto = directorio / MANIFIESTO
+    entradas = []
+    if ruta_manifiesto.exists():
+        entradas = json.loads(ruta_manifiesto.read_text(encoding="utf-8"))
+    entradas = [e for e in entradas if e["id"] != id_cohorte]
+    entradas.append({"id": id_cohorte, "nombre": cohorte.nombre, "sitio": sitio,
+                     "oleada": oleada, "fichero": fichero})
+    _escribir_json(ruta_manifiesto, entradas)
+    return cohorte, resumen
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _resumen_version(id_cohorte, ruta, mtime_ns, tamano):
+    # La huella del snapshot forma parte de la clave: si se regenera, se relee.
+    cohorte = Cohorte(id_cohorte, id_cohorte, "", "", Path(ruta))
+    es_snapshot = Path(ruta).suffix == ".arrow"
+    if es_snapshot:
+        version = (snapshot.leer_metadatos(ruta) or {}).get("hash")
+        try:
+            resumen = json.loads(ruta_resumen(cohorte).read_text(encoding="utf-8"))
+            if resumen.get("version") == version:
+                return resumen
+        except (FileNotFoundError, ValueError):
+            pass
+    # Sin resumen vigente: se calcula una vez a partir de la cohorte cargada
+    datos = cargar_dataset(ruta)
+    resumen = resumir(cubo_agregados(datos), metricas_kpi(datos), datos.version)
+    if es_snapshot:
+        try:
+            _escribir_json(ruta_resumen(cohorte), resumen)
+        except OSError:
+            pass
+    return resumen
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _resumen_ingesta(version, _estado):
+    return resumir(_estado.cubo, _estado.metricas, version)
+
+
+def resumen_cohorte(cohorte, almacen=DIR_ALMACEN):
+    """
+    Resumen de agregados de la cohorte (no carga sus frases si está vigente).
+
+    El de la principal se hace con el cubo y las métricas de la ingesta en
+    almacen (sin almacen, solo con el libro).
+    """
+    if cohorte.id == COHORTE_PRINCIPAL and almacen is not None:
+        estado = estado_ingesta(cargar_dataset(cohorte.ruta), almacen)
+        return _resumen_ingesta(estado.datos.version, estado)
+    return _resumen_version(cohorte.id, *huella_archivo(cohorte.ruta))
+
+
+def comparar_categorias(cohortes, dimension, almacen=DIR_ALMACEN):
+    """
+    Frases y pacientes por categoría de cada cohorte, en formato largo.
+
+    Columnas: Cohorte, dimension, Frases, Pacientes, % frases, % pacientes.
+    Los porcentajes son sobre los totales de cada cohorte.
+    """
+    tablas = []
+    for cohorte in cohortes:
+        resumen = resumen_cohorte(cohorte, almacen)
+        tabla = pd.DataFrame(resumen["tablas"][dimension], columns=[dimension, "Frases", "Pacientes"])
+        tabla.insert(0, "Cohorte", cohorte.nombre)
+        tabla["% frases"] = tabla["Frases"] / max(tabla["Frases"].sum(), 1) * 100
+        tabla["% pacientes"] = tabla["Pacientes"] / max(resumen["pacientes_totales"], 1) * 100
+        tablas.append(tabla)
+    return pd.concat(tablas, ignore_index=True)
+
+
+def comparar_sentimiento(cohortes, almacen=DIR_ALMACEN):
+    """Sentimiento medio por entrevista (con IC ~95%) de cada cohorte."""
+    filas = []
+    for cohorte in cohortes:
+        resumen = resumen_cohorte(cohorte, almacen)
+        filas.append({
+            "Cohorte": cohorte.nombre,
+            "Entrevistas": resumen["pacientes_totales"],
+            "Frases": resumen["frases_totales"],
+            **resumen["sentimiento"],
+            **resumen["entrevistas_sentimiento"],
+        })
+    return pd.DataFrame(filas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registro de cohortes de KneeChat.")
+    parser.add_argument("--directorio", default=str(DIR_COHORTES))
+    sub = parser.add_subparsers(dest="orden", required=True)
+    alta = sub.add_parser("registrar", help="añadir o reemplazar una cohorte")
+    alta.add_argument("id")
+    alta.add_argument("origen", help="fichero .xlsx, .csv o .parquet")
+    alta.add_argument("--nombre")
+    alta.add_argument("--sitio", default="")
+    alta.add_argument("--oleada", default="")
+    sub.add_parser("listar", help="mostrar las cohortes registradas")
+    args = parser.parse_args(argv)
+
+    if args.orden == "registrar":
+        cohorte, resumen = registrar(args.origen, args.id, args.nombre, args.sitio,
+                                     args.oleada, args.directorio)
+        print(f"{cohorte.ruta}: {resumen['frases_totales']} frases, "
+              f"{resumen['pacientes_totales']} pacientes, versión {resumen['version']}")
+    else:
+        for cohorte in leer_registro(args.directorio):
+            print(f"{cohorte.id}\t{cohorte.nombre}\t{cohorte.sitio}\t{cohorte.oleada}\t{cohorte.ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""
+Capa de acceso a datos del dashboard de KneeChat.
+
+Streamlit vuelve a ejecutar app.py en cada interacción, así que el libro de
+Excel se lee una sola vez por versión del fichero y el resultado se comparte
+entre reruns y sesiones. La versión se detecta por ruta, mtime y tamaño, que
+son baratos de consultar en cada rerun.
+
+La primera carga de cada versión usa el snapshot columnar de
+kneechat.snapshot si está al día, y si no lo regenera a partir del libro.
+
+La variable de entorno KNEECHAT_DATASET permite apuntar a otro origen (.xlsx,
+.csv o .parquet), p. ej. un dataset sintético para benchmarks. Los snapshots
+.arrow (las cohortes de kneechat.cohortes) se leen directamente.
+
+El Dataset que se comparte es de solo lectura: las columnas derivadas y las
+vistas que usan las sesiones (frases relevantes, comentarios, id de entrevista
+como texto, categorías de los selectores) se calculan una vez al cargarlo, y
+cualquier intento de modificarlo en el sitio da TypeError en lugar de
+cambiar, sin avisar, los datos de las demás sesiones.
+
+Al ingerir entrevistas (kneechat.ingesta) el Dataset se amplía solo con las
+filas nuevas: cada vista guarda una lista de trozos, uno por ampliación, y se
+concatena una vez, la primera vez que se pide.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from kneechat import snapshot
+from kneechat.sentimiento import bucketizar_sentimiento
+
+RUTA_DATASET = Path(
+    os.environ.get("KNEECHAT_DATASET")
+    or Path(__file__).resolve().parent.parent / "Dataset kneechat - ES.xlsx"
+)
+TIPO_IRRELEVANTE = "Interacción Irrelevante"
+
+TIPO_COMENTARIO = "Comentario/reflexión"
+# Dimensiones cuyas categorías se ofrecen en los selectores del dashboard
+DIMENSIONES_CATEGORIAS = ("tipo", "DudasFrecuentes", "Tiporeflexión")
+
+MENSAJE_SOLO_LECTURA = (
+    "Los DataFrames del Dataset se comparten entre todas las sesiones y son de "
+    "solo lectura; usa .copy() o crea columnas en un DataFrame derivado."
+)
+
+
+def _solo_lectura(*args, **kwargs):
+    raise TypeError(MENSAJE_SOLO_LECTURA)
+
+
+class _IndexadorSoloLectura:
+    """loc/iloc/at/iat que permiten leer pero no asignar."""
+
+    def __init__(self, indexador):
+        self._indexador = indexador
+
+    def __getitem__(self, clave):
+        return self._indexador[clave]
+
+    __setitem__ = _solo_lectura
+
+    def __getattr__(self, nombre):
+        return getattr(self._indexador, nombre)
+
+
+class MarcoSoloLectura(pd.DataFrame):
+    """
+    DataFrame compartido que no se puede modificar en el sitio.
+
+    Cualquier operación que devuelva un DataFrame nuevo (filtrar, seleccionar
+    columnas, copy, assign, ...) da un DataFrame normal; con Copy-on-Write de
+    pandas no se copian los datos hasta que se modifica, y modificarlo nunca
+    afecta al compartido.
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    __setitem__ = __delitem__ = insert = pop = _update_inplace = _solo_lectura
+
+    def __setattr__(self, nombre, valor):
+        # pandas guarda su estado interno en atributos con "_"; el resto
+        # (columnas, index, ...) no se puede reasignar
+        if nombre.startswith("_"):
+            return object.__setattr__(self, nombre, valor)
+        _solo_lectura()
+
+    @property
+    def loc(self):
+        return _IndexadorSoloLectura(super().loc)
+
+    @property
+    def iloc(self):
+        return _IndexadorSoloLectura(super().iloc)
+
+    @property
+    def at(self):
+        return _IndexadorSoloLectura(super().at)
+
+    @property
+    def iat(self):
+        return _IndexadorSoloLectura(super().iat)
+
+
+def _con_derivadas(df):
+    """Copia (sin copiar datos) de df con las columnas derivadas Sentimiento e id_entrevista."""
+    df = df.copy(deep=False)
+    df["Sentimiento"] = bucketizar_sentimiento(df["sent_robertuito"])
+    df["id_entrevista"] = df["num_entrevista"].astype(str)
+    return df
+
+
+def _vistas(df):
+    """(frases relevantes, comentarios) de df."""
+    relevante = df[df["tipo"] != TIPO_IRRELEVANTE]
+    return relevante, relevante[relevante["tipo"] == TIPO_COMENTARIO]
+
+
+def _tipos_categoricos(df):
+    return {columna: tipo for columna, tipo in df.dtypes.items() if isinstance(tipo, pd.CategoricalDtype)}
+
+
+def _tipos_ampliados(tipos, nuevas):
+    """tipos ({columna: tipo categórico}) con las categorías de nuevas añadidas al final."""
+    ampliados = {}
+    for columna, tipo in tipos.items():
+        unicas = pd.Index(np.asarray(nuevas[columna].dropna().unique(), dtype=object))
+        extra = unicas[tipo.categories.get_indexer(unicas) < 0]
+        if len(extra):
+            tipo = pd.CategoricalDtype(tipo.categories.append(extra), ordered=tipo.ordered)
+        ampliados[columna] = tipo
+    return ampliados
+
+
+def _concatenar(trozos, tipos):
+    """
+    Los trozos en un DataFrame (conservando sus índices), con las columnas
+    categóricas en los tipos dados. Las categorías de cada trozo son un
+    prefijo de las de tipos (solo se añaden al final), así que sus códigos
+    sirven tal cual.
+    """
+    alineados = []
+    for trozo in trozos:
+        trozo = trozo.copy(deep=False)  # los trozos se comparten: no se modifican
+        for columna, tipo in tipos.items():
+            if trozo[columna].dtype != tipo:
+                # from_codes reutiliza los códigos (cat.add_categories revalida
+                # todas las categorías existentes)
+                trozo[columna] = pd.Categorical.from_codes(trozo[columna].cat.codes, dtype=tipo)
+        alineados.append(trozo)
+    return alineados[0] if len(alineados) == 1 else pd.concat(alineados)
+
+
+VISTAS = ("df", "df_relevante", "df_comentarios")
+
+
+class Dataset:
+    """
+    Dataset de solo lectura compartido por todas las sesiones.
+
+    Las columnas derivadas y las vistas se calculan una vez al construirlo:
+        df                 todas las frases, con Sentimiento (categoría del
+                           sentimiento) e id_entrevista (num_entrevista como str)
+        df_relevante       sin interacciones irrelevantes
+        df_comentarios     solo Comentario/reflexión
+        categorias         {dimensión: categorías en orden de aparición}
+        version            hash del contenido del origen (clave de cachés derivadas)
+
+    Ni el Dataset ni sus DataFrames se pueden modificar (TypeError).
+    """
+
+    __slots__ = ("_trozos", "_marcos", "_tipos", "_filas", "_bloqueo", "categorias", "version")
+
+    def __init__(self, df, version):
+        df = _con_derivadas(df)
+        relevante, comentarios = _vistas(df)
+        self._asignar(dict(zip(VISTAS, ((df,), (relevante,), (comentarios,)))), _tipos_categoricos(df), {
+            dimension: tuple(df[dimension].dropna().astype(str).unique())
+            for dimension in DIMENSIONES_CATEGORIAS if dimension in df.columns
+        }, version)
+
+    def _asignar(self, trozos, tipos, categorias, version):
+        asignar = super().__setattr__
+        asignar("_trozos", trozos)  # vista -> tupla de DataFrames, uno por ampliación
+        asignar("_marcos", dict.fromkeys(VISTAS))  # vista -> MarcoSoloLectura ya concatenado
+        asignar("_tipos", tipos)
+        asignar("_filas", sum(len(trozo) for trozo in trozos["df"]))
+        asignar("_bloqueo", threading.Lock())
+        asignar("categorias", MappingProxyType(categorias))
+        asignar("version", version)
+
+    def _vista(self, nombre):
+        marco = self._marcos[nombre]
+        if marco is None:
+            with self._bloqueo:
+                marco = self._marcos[nombre]
+                if marco is None:
+                    concatenado = _concatenar(self._trozos[nombre], self._tipos)
+                    marco = self._marcos[nombre] = MarcoSoloLectura(concatenado)
+                    # Las ampliaciones siguientes parten del DataFrame ya concatenado
+                    self._trozos[nombre] = (concatenado,)
+        return marco
+
+    @property
+    def df(self):
+        return self._vista("df")
+
+    @property
+    def df_relevante(self):
+        return self._vista("df_relevante")
+
+    @property
+    def df_comentarios(self):
+        return self._vista("df_comentarios")
+
+    def __len__(self):
+        return self._filas
+
+    def filas(self, inicio):
+        """Las filas de df desde la posición inicio (de solo lectura), sin concatenar las anteriores."""
+        trozos, fin = [], self._filas
+        for trozo in reversed(self._trozos["df"]):
+            if fin <= inicio:
+                break
+            fin -= len(trozo)
+            trozos.append(trozo.iloc[max(inicio - fin, 0):])
+        if not trozos:
+            return MarcoSoloLectura(self._trozos["df"][0].iloc[:0])
+        return MarcoSoloLectura(_concatenar(trozos[::-1], self._tipos))
+
+    def ampliar(self, nuevas, version):
+        """
+        Dataset nuevo con las filas de este más nuevas (con las columnas del origen).
+
+        Es lo mismo que construirlo con todas las filas, pero solo se
+        procesan las filas nuevas: sus columnas derivadas, vistas y
+        categorías se calculan y se añaden como un trozo más de cada vista.
+        Las filas de este Dataset no se copian ni se modifican; cada vista
+        del ampliado se concatena la primera vez que se pide. Las columnas
+        categóricas amplían sus categorías.
+        """
+        inicio = self._filas
+        columnas = self._trozos["df"][0].columns
+        nuevas = _con_derivadas(nuevas.set_axis(pd.RangeIndex(inicio, inicio + len(nuevas))))
+        nuevas = nuevas.reindex(columns=columnas)
+        tipos = _tipos_ampliados(self._tipos, nuevas)
+        for columna, tipo in tipos.items():
+            nuevas[columna] = pd.Categorical(nuevas[columna], dtype=tipo)
+        categorias = dict(self.categorias)
+        for dimension, existentes in categorias.items():
+            vistas = set(existentes)
+            unicas = nuevas[dimension].dropna().astype(str).unique()
+            categorias[dimension] = existentes + tuple(c for c in unicas if c not in vistas)
+        ampliado = object.__new__(Dataset)
+        trozos = dict(zip(VISTAS, (nuevas, *_vistas(nuevas))))
+        ampliado._asignar(
+            {nombre: self._trozos[nombre] + (trozos[nombre],) for nombre in VISTAS},
+            tipos, categorias, version,
+        )
+        return ampliado
+
+    __setattr__ = __delattr__ = _solo_lectura
+
+    def __repr__(self):
+        return f"Dataset(version={self.version!r}, frases={len(self)})"
+
+
+def huella_archivo(ruta):
+    """Devuelve (ruta absoluta, mtime en ns, tamaño) del fichero."""
+    ruta = Path(ruta).resolve()
+    info = ruta.stat()
+    return str(ruta), info.st_mtime_ns, info.st_size
+
+
+def hash_archivo(ruta):
+    """Hash corto (sha256) del contenido del fichero."""
+    return hashlib.sha256(Path(ruta).read_bytes()).hexdigest()[:16]
+
+
+def leer_excel(ruta=RUTA_DATASET):
+    """Lee el libro directamente con openpyxl, sin snapshot ni caché."""
+    return Dataset(pd.read_excel(ruta), hash_archivo(ruta))
+
+
+def _leer_via_snapshot(ruta):
+    _, mtime_ns, tamano = huella_archivo(ruta)
+    ruta_snap = snapshot.ruta_snapshot(ruta)
+    metadatos = snapshot.snapshot_vigente(ruta_snap, mtime_ns, tamano)
+    if metadatos is not None:
+        return snapshot.leer_snapshot(ruta_snap), metadatos
+    try:
+        return snapshot.convertir(ruta, ruta_snap)
+    except OSError:
+        return snapshot.tipar(snapshot.leer_origen(ruta)), {"hash": hash_archivo(ruta)}
+
+
+def leer_dataset(ruta=RUTA_DATASET):
+    """
+    Lee el dataset sin caché en memoria, pasando por el snapshot columnar.
+
+    Si el snapshot no existe o corresponde a otra versión del libro, se
+    regenera. Si no se puede escribir (p. ej. sistema de ficheros de solo
+    lectura) se usa igualmente el libro ya tipado.
+    """
+    if Path(ruta).suffix.lower() == ".arrow":
+        # Cohortes del registro (kneechat.cohortes): el origen ya es un snapshot
+        df = snapshot.leer_snapshot(ruta)
+        metadatos = snapshot.leer_metadatos(ruta) or {"hash": hash_archivo(ruta)}
+    else:
+        df, metadatos = _leer_via_snapshot(ruta)
+    # Columnas derivadas (p. ej. la categoría de sentimiento, vectorizada) y
+    # vistas, una vez por versión del dataset
+    return Dataset(df, metadatos["hash"])
+
+
+def _mtime_snapshot(ruta):
+    try:
+        return snapshot.ruta_snapshot(ruta).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cargar_version(ruta, mtime_ns, tamano, mtime_snapshot):
+    # Los argumentos tras la ruta solo forman parte de la clave de caché: si
+    # el libro o su snapshot cambian (p. ej. al puntuar frases nuevas con
+    # kneechat.puntuacion), la clave cambia y se vuelve a leer.
+    return leer_dataset(ruta)
+
+
+def cargar_dataset(ruta=RUTA_DATASET):
+    """
+    Devuelve el Dataset cacheado para la versión actual del fichero.
+
+    Todas las sesiones reciben los mismos objetos (sin copias); sus DataFrames
+    son de solo lectura.
+    """
+    return _cargar_version(*huella_archivo(ruta), _mtime_snapshot(ruta))
+
+
+def limpiar_cache():
+    """Vacía la caché de carga (útil en benchmarks para medir en frío)."""
+    _cargar_version.clear()
@@ -0,0 +1,168 @@
+"""
+Gráfico de sentimiento promedio por entrevista, apto para muchas entrevistas.
+
+Con pocas entrevistas se dibuja un punto por entrevista (con su IC, tamaño y
+datos de hover), como siempre. A partir de UMBRAL_WEBGL puntos se usa una
+traza WebGL (scattergl), y a partir de UMBRAL_BANDAS ya no se envía un punto
+por entrevista: las entrevistas, ordenadas por sentimiento, se agrupan en el
+servidor en NUM_BANDAS tramos consecutivos y se dibuja la mediana de cada
+tramo con bandas de cuantiles. El dashboard ofrece un rango para acercarse a
+un tramo y ver de nuevo los puntos individuales.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+UMBRAL_WEBGL = 1_000
+UMBRAL_BANDAS = 5_000
+NUM_BANDAS = 200
+# Tope del JSON de la figura (lo comprueba tests/test_dispersion.py)
+MAX_BYTES_FIGURA = 512 * 1024
+
+COLORES_SENTIMIENTO = {
+    "Muy negativo": "darkred",
+    "Negativo": "lightcoral",
+    "Neutral": "gray",
+    "Positivo": "lightgreen",
+    "Muy positivo": "darkgreen"
+}
+TITULO = "Sentimientos Promedio por Entrevista (IC ~95%)"
+ETIQUETA_X = "Entrevistas ordenadas por sentimiento"
+ETIQUETA_Y = "Puntuación de Sentimiento"
+
+
+def _estilo(fig):
+    """Leyenda, márgenes y líneas de referencia comunes a ambos modos."""
+    fig.update_layout(
+        title_x=0.1,
+        legend_title_text="",
+        legend=dict(
+            orientation="h",   # horizontal -> todos los elementos en una fila
+            xanchor="left",
+            yanchor="middle",
+            x=0.0,
+            y=1.1,
+            traceorder="normal",
+            bgcolor="rgba(0,0,0,0)",
+            borderwidth=0
+        ),
+        margin=dict(t=140)  # deja espacio arriba para título + leyenda
+    )
+    # Líneas horizontales de referencia
+    fig.add_hline(y=0.3, line_dash="dash", line_color="green", opacity=0.3)
+    fig.add_hline(y=0, line_dash="dash", line_color="grey", opacity=0.3)
+    fig.add_hline(y=-0.3, line_dash="dash", line_color="red", opacity=0.3)
+    return fig
+
+
+def figura_puntos(df_sorted, webgl=False):
+    """Un punto por entrevista; df_sorted viene ordenado y su índice es la posición."""
+    fig = px.scatter(
+        df_sorted,
+        x=df_sorted.index,  # el índice representa el orden por sentimiento
+        y="mean_robertuito",
+        color="Sentimiento",
+        color_discrete_map=COLORES_SENTIMIENTO,
+        error_y="ci_sup",
+        error_y_minus="ci_inf",
+        labels={"index": ETIQUETA_X, "x": ETIQUETA_X, "mean_robertuito": ETIQUETA_Y},
+        title=TITULO,
+        size="point_size",
+        hover_data={
+            "count_frases": True,
+            "mean_robertuito": ':.2f',
+            "num_entrevista": True  # número real de entrevista en el hover
+        },
+        render_mode="webgl" if webgl else "auto",
+    )
+    # customdata viene por traza desde hover_data: [count_frases, num_entrevista]
+    fig.update_traces(
+        hovertemplate=(
+            "<b>Entrevista: %{customdata[1]}</b><br>" +
+            "Puntuación: %{y:.2f}<br>" +
+            "Cantidad de frases: %{customdata[0]}<extra></extra>"
+        ),
+    )
+    return _estilo(fig)
+
+
+def bandas_cuantiles(df_sorted, num_bandas=NUM_BANDAS):
+    """
+    Resumen por tramos de entrevistas consecutivas (ya ordenadas por sentimiento).
+
+    Una fila por tramo: posición central, número de entrevistas, mediana y
+    cuantiles 5/95 de la media, y mediana de los extremos del IC.
+    """
+    n = len(df_sorted)
+    tramo = np.minimum(np.arange(n) * num_bandas // max(n, 1), num_bandas - 1)
+    medias = df_sorted["mean_robertuito"].to_numpy()
+    tabla = pd.DataFrame({
+        "tramo": tramo,
+        "posicion": df_sorted.index.to_numpy(),
+        "media": medias,
+        "ic_inferior": medias - df_sorted["ci_inf"].to_numpy(),
+        "ic_superior": medias + df_sorted["ci_sup"].to_numpy(),
+    })
+    grupos = tabla.groupby("tramo")
+    return pd.DataFrame({
+        "desde": grupos["posicion"].min(),
+        "hasta": grupos["posicion"].max(),
+        "posicion": grupos["posicion"].median(),
+        "entrevistas": grupos.size(),
+        "mediana": grupos["media"].median(),
+        "p05": grupos["media"].quantile(0.05),
+        "p95": grupos["media"].quantile(0.95),
+        "ic_inferior": grupos["ic_inferior"].median(),
+        "ic_superior": grupos["ic_superior"].median(),
+    }).reset_index(drop=True)
+
+
+def figura_bandas(bandas):
+    """Mediana por tramo con la banda de cuantiles 5-95 y el IC mediano."""
+    x = bandas["posicion"]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=x, y=bandas["ic_superior"], mode="lines", line=dict(width=0),
+        hoverinfo="skip", showlegend=False,
+    ))
+    fig.add_trace(go.Scatter(
+        x=x, y=bandas["ic_inferior"], mode="lines", line=dict(width=0),
+        fill="tonexty", fillcolor="rgba(128,128,128,0.2)", name="IC ~95% (mediana)",
+        hoverinfo="skip",
+    ))
+    fig.add_trace(go.Scatter(
+        x=x, y=bandas["p95"], mode="lines", line=dict(width=0),
+        hoverinfo="skip", showlegend=False,
+    ))
+    fig.add_trace(go.Scatter(
+        x=x, y=bandas["p05"], mode="lines", line=dict(width=0),
+        fill="tonexty", fillcolor="rgba(52,163,211,0.35)", name="Cuantiles 5-95 de la media",
+        hoverinfo="skip",
+    ))
+    fig.add_trace(go.Scatter(
+        x=x, y=bandas["mediana"], mode="lines", line=dict(color="#34a3d3", width=2),
+        name="Mediana del tramo",
+        customdata=bandas[["desde", "hasta", "entrevistas", "p05", "p95"]].to_numpy(),
+        hovertemplate=(
+            "<b>Entrevistas %{customdata[0]}-%{customdata[1]}</b> (%{customdata[2]})<br>" +
+            "Mediana: %{y:.2f}<br>" +
+            "Cuantiles 5-95: %{customdata[3]:.2f} a %{customdata[4]:.2f}<extra></extra>"
+        ),
+    ))
+    fig.update_layout(
+        title=TITULO + " · resumen por tramos",
+        xaxis_title=ETIQUETA_X,
+        yaxis_title=ETIQUETA_Y,
+    )
+    return _estilo(fig)
+
+
+def figura_sentimiento_entrevistas(df_sorted):
+    """Elige el modo según el número de entrevistas. Devuelve (figura, modo)."""
+    n = len(df_sorted)
+    if n > UMBRAL_BANDAS:
+        return figura_bandas(bandas_cuantiles(df_sorted)), "bandas"
+    if n > UMBRAL_WEBGL:
+        return figura_puntos(df_sorted, webgl=True), "webgl"
+    return figura_puntos(df_sorted), "puntos"
@@ -0,0 +1,151 @@
+"""
+Caché de gráficos de matplotlib/seaborn renderizados.
+
+Renderizar con matplotlib es el paso más caro de la página y las figuras de
+pyplot que no se cierran se acumulan en el proceso del servidor. Los gráficos
+de barras de Dudas y Reflexiones se renderizan una vez a PNG, se cierra la
+figura y los bytes se guardan en una caché LRU acotada, compartida por todas
+las sesiones y con clave (versión del dataset, id del gráfico, selección).
+Las nubes de términos de cada categoría (wordcloud) usan la misma caché.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+from wordcloud import WordCloud
+
+MAX_FIGURAS = 64
+PALETA_FRECUENCIA = {"Frases": "#34a3d3", "Pacientes": "#b7b7bd"}
+# Como st.pyplot, pero con dpi 180: a 200 dpi una figura de 8" supera el
+# ancho máximo de st.image (1460 px) y Streamlit la redimensiona y recodifica
+# en cada rerun.
+OPCIONES_PNG = {"format": "png", "dpi": 180, "bbox_inches": "tight"}
+MAX_PALABRAS_NUBE = 80
+
+
+class CacheLRU:
+    """Diccionario LRU acotado y seguro entre hilos (sesiones)."""
+
+    def __init__(self, max_entradas=MAX_FIGURAS):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._calculando = {}  # clave -> lock mientras alguien la calcula
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def obtener(self, clave, calcular):
+        """
+        Valor de la clave, o calcular() si no está. Si varias sesiones (o el
+        precalentamiento de kneechat.arranque) piden a la vez la misma clave,
+        solo una la calcula y las demás esperan su resultado. None no se guarda.
+        """
+        valor = self.get(clave)
+        if valor is not None:
+            return valor
+        with self._lock:
+            lock_clave = self._calculando.setdefault(clave, threading.Lock())
+        with lock_clave:
+            valor = self.get(clave)
+            if valor is None:
+                valor = calcular()
+                if valor is not None:
+                    self.put(clave, valor)
+        with self._lock:
+            self._calculando.pop(clave, None)
+        return valor
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def bytes_totales(self):
+        with self._lock:
+            return sum(len(v) for v in self._datos.values())
+
+
+_cache = CacheLRU()
+
+
+def renderizar_barras_frecuencia(df_melted, dimension):
+    """
+    Barras horizontales de frecuencia (Frases/Pacientes) por categoría.
+
+    Devuelve el PNG en bytes; la figura se cierra siempre.
+    """
+    fig, ax = plt.subplots(figsize=(8, 5))
+    try:
+        sns.barplot(
+            data=df_melted,
+            x="Frecuencia",
+            y=dimension,
+            hue="Tipo",
+            palette=PALETA_FRECUENCIA,
+            ax=ax
+        )
+        ax.tick_params(axis="y", labelrotation=0)
+        plt.setp(ax.get_yticklabels(), ha="right")
+        ax.set_xlabel("Frecuencia")
+        ax.set_ylabel("")
+        ax.legend(title="Tipo")
+        for container in ax.containers:
+            ax.bar_label(container, fmt='%d', label_type='edge', fontsize=10)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, **OPCIONES_PNG)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def figura_barras_frecuencia(cubo, version, dimension, metricas):
+    """PNG cacheado del gráfico de frecuencias de una dimensión del cubo."""
+    clave = (version, "barras_" + dimension, tuple(sorted(metricas)))
+    return _cache.obtener(clave, lambda: renderizar_barras_frecuencia(cubo.melted(dimension, metricas), dimension))
+
+
+def _color_nube(*args, **kwargs):
+    return PALETA_FRECUENCIA["Frases"]
+
+
+def renderizar_nube_terminos(frecuencias):
+    """Nube de palabras a partir de {término: apariciones}. PNG en bytes."""
+    nube = WordCloud(
+        width=800, height=400, background_color="white", max_words=MAX_PALABRAS_NUBE,
+        color_func=_color_nube, random_state=0,
+    ).generate_from_frequencies(frecuencias)
+    buffer = io.BytesIO()
+    nube.to_image().save(buffer, format="png")
+    return buffer.getvalue()
+
+
+def figura_nube_terminos(terminos, version, dimension, categoria):
+    """PNG cacheado de la nube de términos de una categoría; None si no tiene términos."""
+    clave = (version, "nube_" + dimension, categoria)
+
+    def renderizar():
+        frecuencias = terminos.frecuencias(dimension, categoria, MAX_PALABRAS_NUBE)
+        return renderizar_nube_terminos(frecuencias) if frecuencias else None
+
+    return _cache.obtener(clave, renderizar)
+
+
+def limpiar_cache():
+    _cache.clear()
@@ -0,0 +1,162 @@
+"""
+Figuras de Plotly del dashboard.
+
+Construyen la figura a partir de datos ya agregados, sin llamadas a
+Streamlit, para que app.py y el informe estático (kneechat.informe) usen
+exactamente los mismos gráficos. construir_figuras() genera todas las del
+dashboard a partir del núcleo de cálculo (kneechat.calculo).
+"""
+import plotly.express as px
+import plotly.graph_objects as go
+
+from kneechat.agregados import ETIQUETAS_TIPO, CuboAgregados
+from kneechat.calculo import distribucion_sentimiento, estadisticas_entrevistas
+from kneechat.dispersion import COLORES_SENTIMIENTO, figura_sentimiento_entrevistas
+
+
+def figura_categorizacion(cubo, metrica="Frases"):
+    """Barras de frases o de pacientes únicos por tipo de frase."""
+    tipos = list(ETIQUETAS_TIPO.values())
+    if metrica == "Frases":
+        total = cubo.frases_totales
+        valores = [cubo.frases("tipo", tipo) for tipo in ETIQUETAS_TIPO]
+        nombre = f"Frases (N: {total})"
+        titulo = f"Frases por tipo (N: {total})"
+        titulo_y = f"Cantidad de frases (N: {total})"
+        descripcion = "Frases en categoría"
+        denominador = "total de frases"
+    else:
+        total = cubo.pacientes_totales
+        valores = [cubo.pacientes("tipo", tipo) for tipo in ETIQUETAS_TIPO]
+        nombre = f"Pacientes únicos (N: {total})"
+        titulo = f"Pacientes únicos por tipo (N: {total})"
+        titulo_y = f"Pacientes únicos (N: {total})"
+        descripcion = "Pacientes únicos en categoría"
+        denominador = "total de pacientes"
+
+    etiquetas = [f"{(v / total * 100):.1f}%\n({v})" for v in valores]
+    # Hover text explicativo
+    hover = [
+        f"<b>Categoría:</b> {t}<br>"
+        f"<b>Métrica:</b> {descripcion}: {v:,}<br>"
+        f"<b>Denominador (fijo):</b> {denominador} = {total:,}<br>"
+        f"<b>%:</b> {v:,} / {total:,} = {v / total * 100:.1f}%"
+        for t, v in zip(tipos, valores)
+    ]
+
+    fig = go.Figure()
+    fig.add_trace(
+        go.Bar(
+            x=tipos,
+            y=valores,
+            name=nombre,
+            text=etiquetas,
+            textposition="outside",
+            hovertext=hover,
+            hoverinfo="text",
+            marker=dict(line=dict(width=0))
+        )
+    )
+    fig.update_layout(
+        title=titulo,
+        xaxis=dict(title=""),
+        yaxis=dict(title=titulo_y, rangemode="tozero", showgrid=True),
+        margin=dict(t=90, b=110, l=60, r=60),
+        uniformtext_minsize=9,
+        uniformtext_mode='hide'
+    )
+    # Ajuste de fuente de etiqueta multilínea para que quepa mejor
+    fig.update_traces(textfont=dict(size=11, family="Arial"))
+    return fig
+
+
+def figura_distribucion_sentimiento(df_percent):
+    """Barra horizontal 100% apilada con el porcentaje de frases por sentimiento."""
+    # custom_data para que cada segmento tenga su "Cantidad de frases"
+    fig = px.bar(
+        df_percent,
+        x="Cantidad de frases",
+        y="dummy",
+        color="Sentimiento",
+        text="Porcentaje",
+        orientation="h",
+        custom_data=["Cantidad de frases"],
+        color_discrete_map=COLORES_SENTIMIENTO,
+        labels={"Cantidad de frases": "Cantidad de frases", "dummy": ""},
+        title="Porcentaje de Frases por Categoría de Sentimiento",
+        hover_data={"Cantidad de frases": True}
+    )
+    fig.update_layout(
+        title="",
+        legend_title_text="",
+        legend=dict(
+            orientation="h",   # horizontal -> todos los elementos en una fila
+            xanchor="left",
+            yanchor="middle",
+            x=0.0,
+            y=1,
+            traceorder="normal",
+            bgcolor="rgba(0,0,0,0)",
+            borderwidth=0
+        ),
+        # 100% apilado
+        barmode="stack",
+        barnorm="percent"
+    )
+    # Texto centrado, en negrita y de mayor tamaño dentro de cada segmento, y
+    # tooltip con la cantidad de frases de cada segmento.
+    fig.update_traces(
+        texttemplate="%{text:.1f}%",
+        textposition="inside",
+        textfont=dict(size=18, color="white", family="Arial Black"),
+        hovertemplate="<b>%{fullData.name}</b><br>Porcentaje: %{x:.1f}%<br>Cantidad de frases: %{customdata[0]}<extra></extra>"
+    )
+    return fig
+
+
+def figura_coocurrencia(tabla):
+    """
+    Mapa de calor de pacientes que plantean a la vez dos categorías (tabla de
+    MatrizPacientes.coocurrencia).
+    """
+    fig = px.imshow(
+        tabla, text_auto=True, aspect="auto", color_continuous_scale="Blues",
+        labels=dict(x=tabla.columns.name, y=tabla.index.name, color="Pacientes"),
+    )
+    fig.update_traces(
+        hovertemplate="<b>%{y}</b> y <b>%{x}</b><br>Pacientes: %{z}<extra></extra>"
+    )
+    fig.update_layout(
+        title="Pacientes que plantean ambas categorías",
+        xaxis=dict(title="", tickangle=-30),
+        yaxis=dict(title=""),
+        margin=dict(t=60, b=110, l=60, r=20),
+    )
+    return fig
+
+
+def construir_figuras(datos, cubo=None, estadisticas=None):
+    """
+    Todas las figuras del dashboard, por nombre.
+
+    Las de Plotly son figuras; "dudas" y "reflexiones" son PNG (bytes) con
+    frases y pacientes. cubo y estadisticas (la tabla de
+    calculo.estadisticas_entrevistas) se calculan si no se pasan.
+    """
+    # matplotlib/seaborn solo para estas dos; las figuras de Plotly no los necesitan
+    from kneechat.figuras import renderizar_barras_frecuencia
+
+    if cubo is None:
+        cubo = CuboAgregados(datos.df, datos.df_relevante)
+    if estadisticas is None:
+        estadisticas = estadisticas_entrevistas(datos)[0]
+    return {
+        "categorizacion_frases": figura_categorizacion(cubo, "Frases"),
+        "categorizacion_pacientes": figura_categorizacion(cubo, "Pacientes"),
+        "dudas": renderizar_barras_frecuencia(cubo.melted("DudasFrecuentes"), "DudasFrecuentes"),
+        "reflexiones": renderizar_barras_frecuencia(cubo.melted("Tiporeflexión"), "Tiporeflexión"),
+        "sentimiento_entrevistas": figura_sentimiento_entrevistas(estadisticas)[0],
+        "distribucion_sentimiento": figura_distribucion_sentimiento(
+            distribucion_sentimiento(datos.df_relevante)
+        ),
+    }
@@ -0,0 +1,278 @@
+"""
+Informe estático del dashboard (HTML autocontenido y, opcionalmente, PDF).
+
+La mayoría de los lectores solo consultan el dashboard. Este comando hace una
+sola vez los mismos cálculos que app.py (kneechat.calculo, los gráficos de
+kneechat.graficos, kneechat.figuras y kneechat.dispersion) y escribe un HTML
+sin dependencias externas: figuras de Plotly embebidas, PNG y logo en base64
+y tablas de frases por categoría. Se puede servir desde cualquier hosting
+estático.
+
+Los informes se guardan en .kneechat_cache/informes/<versión del dataset>/ y
+solo se regeneran si cambia el dataset (o con --forzar).
+
+El PDF necesita `kaleido` para convertir las figuras de Plotly a imagen.
+
+Uso:
+    python -m kneechat.informe [--dataset ruta] [--salida public/index.html] [--pdf] [--forzar]
+"""
+import argparse
+import base64
+import html
+import shutil
+import time
+from pathlib import Path
+
+from kneechat import snapshot
+from kneechat.agregados import CuboAgregados
+from kneechat.calculo import estadisticas_entrevistas
+from kneechat.datos import RUTA_DATASET, leer_dataset
+from kneechat.graficos import construir_figuras
+from kneechat.metricas import MetricasKPI
+
+# Subir al cambiar el contenido del informe: invalida los ya generados
+VERSION_INFORME = 1
+DIR_INFORMES = snapshot.DIR_SNAPSHOTS / "informes"
+RUTA_LOGO = Path(__file__).resolve().parent.parent / "chatbotlogo.png"
+# Filas máximas por tabla de frases (el resto se indica con una nota)
+MAX_FRASES_TABLA = 500
+TITULOS_FIGURAS = {
+    "categorizacion_frases": "Frases por tipo",
+    "categorizacion_pacientes": "Pacientes por tipo",
+    "sentimiento_entrevistas": "Sentimiento por entrevista",
+    "distribucion_sentimiento": "Distribución de sentimiento",
+}
+
+ESTILO = """
+body { font-family: "Source Sans Pro", Arial, sans-serif; max-width: 1200px; margin: 0 auto; padding: 1em; color: #31333f; }
+h1 { text-align: center; }
+.cards { display: flex; gap: 1em; margin: 1em 0; }
+.card { flex: 1; padding: 10px; border-radius: 10px; text-align: center; color: white; }
+.card h4 { margin: 0; }
+.card p { font-size: 24px; font-weight: bold; margin: 5px 0; }
+.fila { display: flex; gap: 1em; flex-wrap: wrap; }
+.fila > div { flex: 1; min-width: 400px; }
+img.grafico { max-width: 100%; }
+table { border-collapse: collapse; font-size: 14px; width: 100%; }
+th, td { border-bottom: 1px solid #ddd; padding: 4px 8px; text-align: left; }
+details { margin: 0.5em 0; }
+summary { cursor: pointer; font-weight: bold; }
+.nota { color: #808495; font-size: 13px; }
+"""
+
+
+def _cards(valores, color="#34a3d3"):
+    partes = []
+    for titulo, valor, *resto in valores:
+        fondo = resto[0] if resto else color
+        partes.append(
+            f'<div class="card" style="background-color: {fondo};">'
+            f"<h4>{html.escape(titulo)}</h4><p>{html.escape(str(valor))}</p></div>"
+        )
+    return '<div class="cards">' + "".join(partes) + "</div>"
+
+
+def _png(datos_png, alt, ancho=None):
+    b64 = base64.b64encode(datos_png).decode()
+    atributo_ancho = f' width="{ancho}"' if ancho else ""
+    return f'<img class="grafico" alt="{html.escape(alt)}"{atributo_ancho} src="data:image/png;base64,{b64}">'
+
+
+def _tabla(df, columnas):
+    nota = ""
+    if len(df) > MAX_FRASES_TABLA:
+        nota = f'<p class="nota">Se muestran {MAX_FRASES_TABLA} de {len(df)} frases.</p>'
+        df = df.head(MAX_FRASES_TABLA)
+    return df[columnas].to_html(index=False, na_rep="", float_format="{:.2f}".format) + nota
+
+
+def _tablas_por_categoria(df, dimension, columnas, categorias):
+    partes = []
+    for categoria in categorias:
+        frases = df[df[dimension].astype(str) == categoria]
+        partes.append(
+            f"<details><summary>{html.escape(categoria)} ({len(frases)})</summary>"
+            f"{_tabla(frases, columnas)}</details>"
+        )
+    return "".join(partes)
+
+
+class Informe:
+    """Secciones del informe: figuras de Plotly, PNG y fragmentos HTML."""
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.cubo = CuboAgregados(datos.df, datos.df_relevante)
+        self.metricas = MetricasKPI.desde_dataframe(datos.df)
+        df_sorted, self.excluidas = estadisticas_entrevistas(datos)
+        figuras = construir_figuras(datos, self.cubo, df_sorted)
+        self.pngs = {
+            "DudasFrecuentes": figuras.pop("dudas"),
+            "Tiporeflexión": figuras.pop("reflexiones"),
+        }
+        self.figuras = {TITULOS_FIGURAS[nombre]: fig for nombre, fig in figuras.items()}
+
+    def _plotly(self, titulo, incluir_js):
+        return self.figuras[titulo].to_html(
+            full_html=False, include_plotlyjs=incluir_js, config={"displaylogo": False}
+        )
+
+    def html(self, plotly_js=True):
+        """HTML completo. plotly_js: True (embebido) o "cdn"."""
+        df = self.datos.df_relevante
+        metricas = self.metricas
+        media, ic_inf, ic_sup = metricas.sentimiento_medio()
+        por_sentimiento = metricas.entrevistas_por_sentimiento()
+        logo = _png(RUTA_LOGO.read_bytes(), "KneeChat", ancho=140) if RUTA_LOGO.exists() else ""
+
+        partes = [
+            '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8">',
+            "<title>Dashboard de KneeChat · informe</title>",
+            f"<style>{ESTILO}</style></head><body>",
+            f'<div style="text-align:center;">{logo}</div>',
+            "<h1>📊 Dashboard de KneeChat 🦿</h1>",
+            f'<p class="nota">Informe estático generado el {time.strftime("%Y-%m-%d %H:%M")} '
+            f"· versión del dataset {html.escape(self.datos.version)}</p>",
+            "<h2>Indicadores Generales</h2>",
+            _cards([
+                ("Entrevistas realizadas", metricas.entrevistas),
+                ("Número total de frases de pacientes", metricas.frases_totales),
+                ("Comentarios espontáneos", metricas.frases_tipo("Comentario/reflexión")),
+                ("Preguntas o dudas", metricas.frases_tipo("Duda/pregunta")),
+            ]),
+            "<h2>Categorización General</h2>",
+            '<div class="fila"><div>', self._plotly("Frases por tipo", plotly_js), "</div><div>",
+            self._plotly("Pacientes por tipo", False), "</div></div>",
+            "<h2>Dudas/Preguntas</h2>",
+            '<div class="fila"><div>', _png(self.pngs["DudasFrecuentes"], "Dudas/Preguntas"), "</div><div>",
+            _tablas_por_categoria(df, "DudasFrecuentes", ["frase", "num_entrevista"],
+                                  self.cubo.categorias("DudasFrecuentes")),
+            "</div></div>",
+            "<h2>Reflexiones/Comentarios</h2>",
+            '<div class="fila"><div>', _png(self.pngs["Tiporeflexión"], "Reflexiones/Comentarios"), "</div><div>",
+            _tablas_por_categoria(df, "Tiporeflexión", ["frase", "sent_robertuito", "Sentimiento", "num_entrevista"],
+                                  self.cubo.categorias("Tiporeflexión")),
+            "</div></div>",
+            "<h2>Análisis de Sentimiento</h2>",
+            _cards([
+                ("Promedio General de Sentimiento", f"{media:.2f} IC:[{ic_inf:.3f}, {ic_sup:.3f}]", "#FF4B4B"),
+                ("Entrevistas Negativas (Promedio)", por_sentimiento["Negativas"], "#D9534F"),
+                ("Entrevistas Positivas (Promedio)", por_sentimiento["Positivas"], "#5CB85C"),
+                ("Entrevistas Neutras", por_sentimiento["Neutras"], "#5BC0DE"),
+            ]),
+            self._plotly("Sentimiento por entrevista", False),
+        ]
+        if self.excluidas:
+            partes.append(f'<p class="nota">{self.excluidas} entrevista(s) con muy pocos comentarios '
+                          "no se muestran: su intervalo de confianza no es estimable.</p>")
+        partes += [
+            "<h2>Distribución de Sentimiento</h2>",
+            self._plotly("Distribución de sentimiento", False),
+            "</body></html>",
+        ]
+        return "\n".join(partes)
+
+    def pdf(self, ruta):
+        """
+        PDF con los indicadores y una página por figura (sin tablas de frases).
+
+        Requiere kaleido para exportar las figuras de Plotly.
+        """
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            raise RuntimeError(
+                "El PDF necesita kaleido para exportar las figuras de Plotly (pip install kaleido)"
+            ) from None
+        import io
+
+        import matplotlib.image as mpimg
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        metricas = self.metricas
+        media, ic_inf, ic_sup = metricas.sentimiento_medio()
+        imagenes = {titulo: fig.to_image(format="png", scale=2) for titulo, fig in self.figuras.items()}
+        imagenes["Dudas/Preguntas"] = self.pngs["DudasFrecuentes"]
+        imagenes["Reflexiones/Comentarios"] = self.pngs["Tiporeflexión"]
+
+        with PdfPages(ruta) as pdf:
+            fig = plt.figure(figsize=(8.27, 11.69))
+            try:
+                fig.text(0.5, 0.92, "Dashboard de KneeChat", ha="center", fontsize=22)
+                lineas = [
+                    f"Versión del dataset: {self.datos.version}",
+                    f"Entrevistas realizadas: {metricas.entrevistas}",
+                    f"Frases de pacientes: {metricas.frases_totales}",
+                    f"Comentarios espontáneos: {metricas.frases_tipo('Comentario/reflexión')}",
+                    f"Preguntas o dudas: {metricas.frases_tipo('Duda/pregunta')}",
+                    f"Sentimiento medio por entrevista: {media:.2f} (IC {ic_inf:.3f} a {ic_sup:.3f})",
+                ]
+                fig.text(0.1, 0.85, "\n".join(lineas), va="top", fontsize=12, linespacing=1.8)
+                pdf.savefig(fig)
+            finally:
+                plt.close(fig)
+            for titulo, png in imagenes.items():
+                fig = plt.figure(figsize=(11.69, 8.27))
+                try:
+                    ax = fig.add_axes([0.03, 0.03, 0.94, 0.86])
+                    ax.imshow(mpimg.imread(io.BytesIO(png), format="png"))
+                    ax.axis("off")
+                    fig.suptitle(titulo, fontsize=16)
+                    pdf.savefig(fig)
+                finally:
+                    plt.close(fig)
+
+
+def exportar(ruta_dataset=RUTA_DATASET, pdf=False, plotly_js=True, forzar=False):
+    """
+    Genera (o reutiliza) el informe de la versión actual del dataset.
+
+    Devuelve el directorio del informe, con informe.html y, si se pide, informe.pdf.
+    """
+    datos = leer_dataset(ruta_dataset)
+    destino = DIR_INFORMES / f"{datos.version}_v{VERSION_INFORME}"
+    ruta_html = destino / ("informe.html" if plotly_js is True else "informe_cdn.html")
+    ruta_pdf = destino / "informe.pdf"
+    pendientes = forzar or not ruta_html.exists() or (pdf and not ruta_pdf.exists())
+    if not pendientes:
+        return destino
+
+    destino.mkdir(parents=True, exist_ok=True)
+    informe = Informe(datos)
+    if forzar or not ruta_html.exists():
+        temporal = ruta_html.with_suffix(".tmp")
+        temporal.write_text(informe.html(plotly_js), encoding="utf-8")
+        temporal.replace(ruta_html)
+    if pdf and (forzar or not ruta_pdf.exists()):
+        temporal = ruta_pdf.with_suffix(".tmp")
+        informe.pdf(temporal)
+        temporal.replace(ruta_pdf)
+    return destino
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta el dashboard como informe estático.")
+    parser.add_argument("--dataset", default=str(RUTA_DATASET), help="fichero .xlsx, .csv, .parquet o .arrow")
+    parser.add_argument("--salida", help="copiar el HTML a esta ruta (p. ej. public/index.html)")
+    parser.add_argument("--pdf", action="store_true", help="generar también el PDF (requiere kaleido)")
+    parser.add_argument("--cdn", action="store_true", help="cargar plotly.js desde su CDN en lugar de embeberlo")
+    parser.add_argument("--forzar", action="store_true", help="regenerar aunque ya exista")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    try:
+        destino = exportar(args.dataset, args.pdf, "cdn" if args.cdn else True, args.forzar)
+    except RuntimeError as error:
+        parser.exit(1, f"error: {error}\n")
+    ruta_html = destino / ("informe_cdn.html" if args.cdn else "informe.html")
+    if args.salida:
+        Path(args.salida).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(ruta_html, args.salida)
+        if args.pdf:
+            shutil.copyfile(destino / "informe.pdf", Path(args.salida).with_suffix(".pdf"))
+    print(f"{args.salida or ruta_html} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
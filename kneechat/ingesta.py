@@ -0,0 +1,461 @@
+"""
+Ingesta de entrevistas nuevas desde un directorio de entrada.
+
+Cada fichero que se deja en el directorio de entrada (KNEECHAT_ENTRADA, por
+defecto entrada/) contiene las frases de una entrevista (.xlsx, .csv o
+.parquet, con las columnas del libro). Se valida su esquema y, si es
+correcto, se completa (Completador: las frases sin `tipo` se clasifican con
+kneechat.clasificacion y las Comentario/reflexión sin `sent_robertuito` se
+puntúan con kneechat.puntuacion), se añade al almacén (KNEECHAT_ALMACEN, por
+defecto almacen/) como una partición Parquet nueva y se mueve a
+entrada/procesados/; si no, se mueve a entrada/rechazados/ junto a un
+.errores.txt con los motivos. El almacén solo crece: las particiones no se
+reescriben y su manifiesto (particiones.json) se reemplaza de forma atómica.
+
+El dashboard no vuelve a leer el corpus cuando llegan particiones: DatosVivos
+lee solo las nuevas, amplía con ellas el Dataset (Dataset.ampliar) y
+actualiza el cubo de agregados, las métricas y los índices ya calculados, de
+modo que el coste de cada ingesta depende de las filas nuevas.
+Las sesiones abiertas comprueban el manifiesto periódicamente (un stat) y se
+vuelven a ejecutar cuando hay una versión nueva, sin recargar la página.
+
+Uso:
+    python -m kneechat.ingesta
+    python -m kneechat.ingesta --vigilar 5
+    python -m kneechat.ingesta --backend robertuito --modelo /ruta/robertuito
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from kneechat import clasificacion, puntuacion, snapshot
+from kneechat.agregados import CuboAgregados, cubo_agregados
+from kneechat.bootstrap import ampliar_ic, ic_sentimiento_entrevistas
+from kneechat.busqueda import indice_busqueda
+from kneechat.datos import RUTA_DATASET, TIPO_IRRELEVANTE, leer_dataset
+from kneechat.metricas import MetricasKPI, metricas_kpi
+from kneechat.navegador import indice_frases
+from kneechat.pacientes import matriz_pacientes
+from kneechat.terminos import indice_terminos
+
+RAIZ = Path(__file__).resolve().parent.parent
+DIR_ENTRADA = Path(os.environ.get("KNEECHAT_ENTRADA") or RAIZ / "entrada")
+DIR_ALMACEN = Path(os.environ.get("KNEECHAT_ALMACEN") or RAIZ / "almacen")
+MANIFIESTO = "particiones.json"
+EXTENSIONES = (".xlsx", ".csv", ".parquet")
+# Segundos entre comprobaciones del manifiesto en cada sesión del dashboard
+INTERVALO_REFRESCO = 10
+
+COLUMNAS = ("num_entrevista", "frase", "tipo", "DudasFrecuentes", "Tiporeflexión", "sent_robertuito")
+TIPOS = ("Comentario/reflexión", "Duda/pregunta", TIPO_IRRELEVANTE)
+# Esquema fijo de las particiones (una columna vacía no cambia su tipo)
+ESQUEMA = pa.schema([(columna, pa.string()) for columna in COLUMNAS[:-1]] + [("sent_robertuito", pa.float32())])
+# Cada subcategoría solo puede aparecer en frases de su tipo
+SUBCATEGORIAS = {"DudasFrecuentes": "Duda/pregunta", "Tiporeflexión": "Comentario/reflexión"}
+
+# datos: Dataset con el libro y todas las particiones; cubo y metricas, sus
+# agregados; particiones: cuántas particiones del manifiesto incluye;
+# indices: IndicesDataset de datos.
+EstadoIngesta = namedtuple("EstadoIngesta", ["datos", "cubo", "metricas", "particiones", "indices"])
+
+
+def validar(df, entrevistas_existentes=()):
+    """Lista de problemas del fichero; vacía si se puede ingerir."""
+    faltan = [columna for columna in COLUMNAS if columna not in df.columns]
+    if faltan:
+        return [f"faltan columnas: {', '.join(faltan)}"]
+    if df.empty:
+        return ["el fichero no tiene frases"]
+
+    errores = []
+    entrevistas = df["num_entrevista"].dropna().astype(str).unique()
+    if df["num_entrevista"].isna().any():
+        errores.append("hay frases sin num_entrevista")
+    if len(entrevistas) != 1:
+        errores.append(f"se esperaba una entrevista por fichero y hay {len(entrevistas)}")
+    elif entrevistas[0] in entrevistas_existentes:
+        errores.append(f"la entrevista {entrevistas[0]} ya está en el dataset")
+    if df["frase"].isna().any():
+        errores.append("hay frases vacías")
+
+    # Las frases sin tipo se clasifican al ingerir (Completador)
+    tipos = df["tipo"].astype("string")
+    desconocidos = sorted(set(tipos.dropna()) - set(TIPOS))
+    if desconocidos:
+        errores.append(f"tipos no válidos: {desconocidos}")
+    for columna, tipo in SUBCATEGORIAS.items():
+        fuera = df[columna].notna() & tipos.ne(tipo).fillna(True)
+        if fuera.any():
+            errores.append(f"{columna} en {int(fuera.sum())} frases que no son de tipo {tipo}")
+
+    sent = pd.to_numeric(df["sent_robertuito"], errors="coerce")
+    if (sent.isna() & df["sent_robertuito"].notna()).any():
+        errores.append("sent_robertuito tiene valores no numéricos")
+    if ((sent < -1) | (sent > 1)).any():
+        errores.append("sent_robertuito fuera de [-1, 1]")
+    return errores
+
+
+class Completador:
+    """
+    Completa las frases de cada fichero antes de escribir su partición.
+
+    Las frases sin `tipo` se etiquetan con clasificacion.etiquetar (el
+    modelo se entrena con las filas etiquetadas de entrenamiento la primera
+    vez que hace falta) y, después, las Comentario/reflexión sin
+    `sent_robertuito` se puntúan con puntuacion.puntuar_frases. Las dos usan
+    kneechat.lotes: una frase ya procesada sale de la caché en disco.
+    """
+
+    def __init__(self, backend="lexico", opciones=None, entrenamiento=RUTA_DATASET, clasificador=None,
+                 cache_predicciones=None, cache_puntuaciones=None):
+        self.backend = backend
+        self.opciones = opciones
+        self.entrenamiento = entrenamiento
+        self._clasificador = clasificador
+        self.cache_predicciones = cache_predicciones
+        self.cache_puntuaciones = cache_puntuaciones
+
+    @property
+    def clasificador(self):
+        if self._clasificador is None:
+            self._clasificador = clasificacion.Clasificador(snapshot.leer_origen(self.entrenamiento))
+        return self._clasificador
+
+    def completar(self, df):
+        """Copia de df con las frases sin tipo clasificadas y las pendientes de sentimiento puntuadas."""
+        df = df.copy()
+        if clasificacion.filas_pendientes(df).any():
+            self.cache_predicciones = self.cache_predicciones or clasificacion.CachePredicciones()
+            df, _ = clasificacion.etiquetar(df, self.clasificador, cache=self.cache_predicciones)
+        df["sent_robertuito"] = pd.to_numeric(df["sent_robertuito"]).astype("float32")
+        pendientes = puntuacion.filas_pendientes(df)
+        if pendientes.any():
+            self.cache_puntuaciones = self.cache_puntuaciones or puntuacion.CachePuntuaciones()
+            df.loc[pendientes, "sent_robertuito"] = puntuacion.puntuar_frases(
+                df.loc[pendientes, "frase"].astype(str).tolist(), self.backend, self.opciones,
+                cache=self.cache_puntuaciones,
+            )
+        return df
+
+
+def normalizar(df):
+    """Solo las columnas del esquema, con texto como str y sentimiento float32."""
+    df = df[list(COLUMNAS)].copy()
+    for columna in COLUMNAS[:-1]:
+        df[columna] = df[columna].map(str, na_action="ignore")
+    df["sent_robertuito"] = pd.to_numeric(df["sent_robertuito"]).astype("float32")
+    return df.reset_index(drop=True)
+
+
+class Almacen:
+    """
+    Particiones Parquet (una por fichero ingerido) y su manifiesto.
+
+    Se supone un único proceso de ingesta; el dashboard solo lee.
+    """
+
+    def __init__(self, directorio=DIR_ALMACEN):
+        self.directorio = Path(directorio)
+        self.manifiesto = self.directorio / MANIFIESTO
+
+    def huella(self):
+        """mtime del manifiesto (barato de consultar), o None si no hay almacén."""
+        try:
+            return self.manifiesto.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def particiones(self):
+        """Entradas del manifiesto en orden de ingesta."""
+        try:
+            return json.loads(self.manifiesto.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return []
+
+    def anadir(self, df, origen):
+        """Escribe df como partición nueva y la añade al manifiesto. Devuelve su entrada."""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        particiones = self.particiones()
+        entrada = {
+            "fichero": f"parte-{len(particiones):06d}.parquet",
+            "entrevista": str(df["num_entrevista"].iat[0]),
+            "frases": len(df),
+            "origen": Path(origen).name,
+        }
+        # Como en snapshot.escribir_snapshot: temporal + rename, para que el
+        # dashboard nunca vea una partición o un manifiesto a medias
+        ruta = self.directorio / entrada["fichero"]
+        temporal = ruta.with_suffix(".tmp")
+        pq.write_table(pa.Table.from_pandas(df, schema=ESQUEMA, preserve_index=False), temporal)
+        temporal.replace(ruta)
+        temporal = self.manifiesto.with_suffix(".tmp")
+        temporal.write_text(json.dumps(particiones + [entrada], indent=2, ensure_ascii=False),
+                            encoding="utf-8")
+        temporal.replace(self.manifiesto)
+        return entrada
+
+    def leer(self, particiones):
+        """Frases de las particiones indicadas (entradas del manifiesto), tipadas como el snapshot."""
+        tabla = pa.concat_tables([pq.read_table(self.directorio / p["fichero"]) for p in particiones])
+        return snapshot.tipar(tabla.to_pandas())
+
+
+def _mover(ruta, directorio):
+    directorio.mkdir(parents=True, exist_ok=True)
+    destino = directorio / ruta.name
+    ruta.replace(destino)
+    return destino
+
+
+def entrevistas_presentes(almacen):
+    """Entrevistas del libro y del almacén (las que ya no se pueden ingerir)."""
+    presentes = set(leer_dataset(RUTA_DATASET).df["num_entrevista"].astype(str))
+    presentes.update(p["entrevista"] for p in almacen.particiones())
+    return presentes
+
+
+def ingerir(entrada=DIR_ENTRADA, almacen=None, entrevistas_existentes=None, completador=None):
+    """
+    Procesa los ficheros del directorio de entrada. Devuelve (ingeridos, rechazados).
+
+    entrevistas_existentes es el conjunto de entrevistas ya presentes (se
+    actualiza con las ingeridas); si no se da, se calcula a partir del libro
+    y del almacén. completador (por defecto Completador()) clasifica y puntúa
+    las frases que lo necesiten; si el modelo de tipo no es fiable, los
+    ficheros con frases sin tipo se rechazan.
+    """
+    entrada = Path(entrada)
+    almacen = almacen or Almacen()
+    completador = completador or Completador()
+    if entrevistas_existentes is None:
+        entrevistas_existentes = entrevistas_presentes(almacen)
+
+    ingeridos, rechazados = [], []
+    ficheros = sorted(r for r in entrada.glob("*") if r.is_file() and r.suffix.lower() in EXTENSIONES)
+    for ruta in ficheros:
+        try:
+            df = snapshot.leer_origen(ruta)
+            errores = validar(df, entrevistas_existentes)
+        except Exception as error:  # fichero ilegible: se rechaza igual que uno inválido
+            errores = [f"no se pudo leer: {error}"]
+        if not errores:
+            # Un fallo del modelo no es culpa del fichero: se propaga y el
+            # fichero sigue en la entrada para el próximo intento
+            df = completador.completar(df)
+            sin_tipo = int(df["tipo"].isna().sum())
+            if sin_tipo:
+                errores = [f"{sin_tipo} frases sin tipo que el clasificador no etiqueta (no es fiable)"]
+        if errores:
+            destino = _mover(ruta, entrada / "rechazados")
+            destino.with_name(destino.name + ".errores.txt").write_text("\n".join(errores) + "\n",
+                                                                       encoding="utf-8")
+            rechazados.append((ruta.name, errores))
+            continue
+        particion = almacen.anadir(normalizar(df), ruta)
+        entrevistas_existentes.add(particion["entrevista"])
+        _mover(ruta, entrada / "procesados")
+        ingeridos.append(particion)
+    return ingeridos, rechazados
+
+
+class IndicesDataset:
+    """
+    Índices de un Dataset (frases, búsqueda, términos, pacientes e
+    intervalos bootstrap), calculados la primera vez que se piden.
+
+    Del libro se usan los accesores cacheados por versión de cada módulo.
+    Cuando DatosVivos publica un Dataset ampliado, ampliar() copia los
+    índices que ya estaban calculados y les añade solo las filas nuevas; los
+    que nadie había pedido se calculan completos si se piden.
+    """
+
+    def __init__(self, datos, calculados=None):
+        self.datos = datos
+        self._calculados = dict(calculados or {})
+        self._locks = {nombre: threading.Lock() for nombre in INDICES}
+
+    def _obtener(self, nombre):
+        indice = self._calculados.get(nombre)
+        if indice is None:
+            with self._locks[nombre]:
+                indice = self._calculados.get(nombre)
+                if indice is None:
+                    indice = self._calculados[nombre] = INDICES[nombre][0](self.datos)
+        return indice
+
+    @property
+    def frases(self):
+        """navegador.IndiceFrases"""
+        return self._obtener("frases")
+
+    @property
+    def busqueda(self):
+        """busqueda.IndiceBusqueda"""
+        return self._obtener("busqueda")
+
+    @property
+    def terminos(self):
+        """terminos.IndiceTerminos"""
+        return self._obtener("terminos")
+
+    @property
+    def pacientes(self):
+        """pacientes.MatrizPacientes"""
+        return self._obtener("pacientes")
+
+    @property
+    def intervalos(self):
+        """IC bootstrap por entrevista (bootstrap.ic_sentimiento_entrevistas)."""
+        return self._obtener("intervalos")
+
+    def ampliar(self, datos):
+        """
+        Índices de datos, un Dataset con las filas de este más otras al final.
+
+        Los índices ya calculados se copian y se actualizan con las filas
+        nuevas (los de este objeto no cambian); el coste depende de las filas
+        nuevas, no del corpus.
+        """
+        inicio = len(self.datos)
+        calculados = {}
+        for nombre, indice in list(self._calculados.items()):
+            ampliar = INDICES[nombre][1]
+            if ampliar is not None:
+                calculados[nombre] = ampliar(indice, datos, inicio)
+        return IndicesDataset(datos, calculados)
+
+
+# nombre -> (índice completo del Dataset, índice ampliado desde el anterior
+# con las filas a partir de inicio, o None si se recalcula completo)
+INDICES = {
+    "frases": (
+        indice_frases,
+        lambda indice, datos, inicio: indice.ampliar(datos.filas(inicio), lambda: datos.df),
+    ),
+    "busqueda": (
+        indice_busqueda,
+        lambda indice, datos, inicio: indice.copiar().actualizar(datos.filas(inicio)["frase"]),
+    ),
+    "terminos": (
+        indice_terminos,
+        lambda indice, datos, inicio: indice.copiar().actualizar(datos.filas(inicio)),
+    ),
+    "pacientes": (
+        matriz_pacientes,
+        lambda matriz, datos, inicio: matriz.copiar().actualizar(datos.filas(inicio)),
+    ),
+    "intervalos": (
+        ic_sentimiento_entrevistas,
+        lambda ic, datos, inicio: ampliar_ic(ic, datos.filas(inicio)),
+    ),
+}
+
+
+class DatosVivos:
+    """
+    Dataset principal más las particiones del almacén, actualizado en incrementos.
+
+    Se comparte entre sesiones; cada actualización publica un EstadoIngesta
+    nuevo sin modificar el anterior, que otras sesiones pueden estar usando.
+    """
+
+    def __init__(self, base, almacen, cubo=None, metricas=None):
+        self.almacen = almacen
+        self._lock = threading.Lock()
+        self._huella = None
+        self.estado = EstadoIngesta(
+            base,
+            cubo if cubo is not None else CuboAgregados(base.df, base.df_relevante),
+            metricas if metricas is not None else MetricasKPI.desde_dataframe(base.df),
+            0,
+            IndicesDataset(base),
+        )
+
+    def actualizar(self):
+        """Incorpora las particiones nuevas del almacén, si las hay. Devuelve el estado."""
+        huella = self.almacen.huella()
+        if huella == self._huella:
+            return self.estado
+        with self._lock:
+            if huella == self._huella:
+                return self.estado
+            estado = self.estado
+            particiones = self.almacen.particiones()
+            nuevas_particiones = particiones[estado.particiones:]
+            if nuevas_particiones:
+                nuevas = self.almacen.leer(nuevas_particiones)
+                nuevas_relevantes = nuevas[nuevas["tipo"] != TIPO_IRRELEVANTE]
+                version = hashlib.sha256(
+                    "".join([estado.datos.version] + [p["fichero"] for p in nuevas_particiones]).encode()
+                ).hexdigest()[:16]
+                datos = estado.datos.ampliar(nuevas, version)
+                # Los agregados y los índices se copian antes de actualizar:
+                # el estado anterior no cambia
+                self.estado = EstadoIngesta(
+                    datos,
+                    estado.cubo.copiar().actualizar(nuevas, nuevas_relevantes),
+                    estado.metricas.copiar().actualizar(nuevas),
+                    len(particiones),
+                    estado.indices.ampliar(datos),
+                )
+            self._huella = huella
+            return self.estado
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _datos_vivos(version, _base, directorio):
+    return DatosVivos(_base, Almacen(directorio), cubo_agregados(_base), metricas_kpi(_base))
+
+
+def estado_ingesta(base, directorio=DIR_ALMACEN):
+    """
+    Estado actual del dataset con las entrevistas ingeridas.
+
+    base es el Dataset del libro (kneechat.datos.cargar_dataset). Sin
+    directorio (p. ej. otras cohortes) no se añade nada.
+    """
+    if directorio is None:
+        return EstadoIngesta(base, cubo_agregados(base), metricas_kpi(base), 0, IndicesDataset(base))
+    return _datos_vivos(base.version, base, str(directorio)).actualizar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingesta de entrevistas nuevas de KneeChat.")
+    parser.add_argument("--entrada", default=str(DIR_ENTRADA))
+    parser.add_argument("--almacen", default=str(DIR_ALMACEN))
+    parser.add_argument("--vigilar", type=float, metavar="SEGUNDOS",
+                        help="seguir comprobando el directorio cada SEGUNDOS")
+    parser.add_argument("--backend", choices=sorted(puntuacion.BACKENDS), default=puntuacion.BackendLexico.nombre,
+                        help="backend para puntuar el sentimiento de las frases que no lo traen")
+    parser.add_argument("--modelo", help="carpeta local con los pesos de Robertuito")
+    args = parser.parse_args(argv)
+
+    almacen = Almacen(args.almacen)
+    existentes = entrevistas_presentes(almacen)
+    opciones = {"modelo": args.modelo} if args.backend == puntuacion.BackendRobertuito.nombre else {}
+    completador = Completador(args.backend, opciones)
+    while True:
+        ingeridos, rechazados = ingerir(args.entrada, almacen, existentes, completador)
+        for particion in ingeridos:
+            print(f"{particion['origen']}: entrevista {particion['entrevista']}, "
+                  f"{particion['frases']} frases -> {particion['fichero']}")
+        for nombre, errores in rechazados:
+            print(f"{nombre}: rechazado ({'; '.join(errores)})")
+        if not args.vigilar:
+            break
+        time.sleep(args.vigilar)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Procesamiento offline de frases por lotes con caché persistente.
+
+Lo comparten la puntuación de sentimiento (kneechat.puntuacion) y la
+clasificación de frases (kneechat.clasificacion): cada resultado se guarda en
+una caché SQLite por (clave, hash del contenido de la frase), donde la clave
+es el backend o la versión del modelo. Las frases ya en la caché (o
+repetidas) no se vuelven a procesar, las pendientes se reparten en lotes en
+un pool de hilos o de procesos y cada lote se guarda en cuanto termina, así
+que una ejecución interrumpida se reanuda sin repetir trabajo.
+"""
+import functools
+import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+# Parámetros por consulta (SQLite admite como mínimo 999)
+BLOQUE_CONSULTA = 500
+
+
+def hash_frase(frase):
+    return hashlib.sha1(frase.encode("utf-8")).hexdigest()
+
+
+class CacheSQLite:
+    """
+    Caché persistente (SQLite) de resultados por (clave, hash de frase).
+
+    columnas son las de los valores, como "nombre TIPO". Con una sola columna
+    cada valor es un escalar; con varias, una tupla.
+    """
+
+    def __init__(self, ruta, tabla, columna_clave, columnas):
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        self._tabla = tabla
+        self._columna_clave = columna_clave
+        self._n_columnas = len(columnas)
+        self._conexion = sqlite3.connect(str(ruta))
+        self._conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS {tabla} ("
+            f"{columna_clave} TEXT, hash TEXT, {', '.join(columnas)}, PRIMARY KEY ({columna_clave}, hash))"
+        )
+
+    def buscar(self, clave, hashes):
+        """{hash: valor} de los hashes que ya están en la caché."""
+        encontrados = {}
+        hashes = list(hashes)
+        # Consultas en bloques para no superar el límite de parámetros de SQLite
+        for i in range(0, len(hashes), BLOQUE_CONSULTA):
+            bloque = hashes[i:i + BLOQUE_CONSULTA]
+            marcas = ",".join("?" * len(bloque))
+            filas = self._conexion.execute(
+                f"SELECT * FROM {self._tabla} WHERE {self._columna_clave} = ? AND hash IN ({marcas})",
+                [clave, *bloque],
+            )
+            if self._n_columnas == 1:
+                encontrados.update((fila[1], fila[2]) for fila in filas)
+            else:
+                encontrados.update((fila[1], fila[2:]) for fila in filas)
+        return encontrados
+
+    def guardar(self, clave, hashes, valores):
+        if self._n_columnas == 1:
+            valores = ((valor,) for valor in valores)
+        marcas = ", ".join("?" * (self._n_columnas + 2))
+        with self._conexion:
+            self._conexion.executemany(
+                f"INSERT OR REPLACE INTO {self._tabla} VALUES ({marcas})",
+                [(clave, h, *fila) for h, fila in zip(hashes, valores)],
+            )
+
+    def cerrar(self):
+        self._conexion.close()
+
+
+# Objeto con el que trabaja cada proceso del pool (se recibe o se crea una vez por proceso)
+_objeto_proceso = None
+
+
+def _iniciar_proceso(objeto, crear):
+    global _objeto_proceso
+    _objeto_proceso = crear() if crear is not None else objeto
+
+
+def _procesar_en_proceso(procesar, lote):
+    return procesar(_objeto_proceso, lote)
+
+
+def procesar_frases(frases, cache, clave, procesar, objeto=None, crear=None, tamano_lote=64,
+                    trabajadores=1, procesos=False, progreso=None):
+    """
+    Lista con el resultado de cada frase, en el orden de frases.
+
+    procesar(objeto, lote) devuelve un resultado por frase del lote (lo que
+    se guarda en la caché). objeto se envía una vez a cada proceso del pool;
+    si no se puede serializar (p. ej. un modelo cargado), crear es una
+    función sin argumentos, serializable, que lo construye en cada proceso.
+    progreso(n, total) se llama al terminar cada lote.
+    """
+    hashes = [hash_frase(f) for f in frases]
+    conocidas = cache.buscar(clave, set(hashes))
+
+    pendientes = {}
+    for h, frase in zip(hashes, frases):
+        if h not in conocidas:
+            pendientes.setdefault(h, frase)
+    claves = list(pendientes)
+    lotes = [claves[i:i + tamano_lote] for i in range(0, len(claves), tamano_lote)]
+
+    if lotes:
+        if procesos:
+            pool = ProcessPoolExecutor(
+                max_workers=trabajadores, initializer=_iniciar_proceso, initargs=(objeto, crear),
+            )
+            funcion = functools.partial(_procesar_en_proceso, procesar)
+        else:
+            pool = ThreadPoolExecutor(max_workers=trabajadores)
+            funcion = functools.partial(procesar, crear() if crear is not None else objeto)
+        with pool:
+            resultados = pool.map(funcion, ([pendientes[h] for h in lote] for lote in lotes))
+            for n, (lote, valores) in enumerate(zip(lotes, resultados), start=1):
+                cache.guardar(clave, lote, valores)
+                conocidas.update(zip(lote, valores))
+                if progreso:
+                    progreso(n, len(lotes))
+
+    return [conocidas[h] for h in hashes]
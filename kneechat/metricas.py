@@ -0,0 +1,148 @@
+"""
+Motor incremental de indicadores (KPIs) del dashboard.
+
+Los cards de cabecera y de sentimiento se calculan a partir de los datos en
+lugar de estar escritos a mano. Para que sigan siendo baratos cuando el corpus
+crece, el motor guarda sumas acumuladas por entrevista (suma, suma de
+cuadrados y número de frases) y los comentarios por categoría de sentimiento,
+y al añadir entrevistas nuevas solo procesa las filas nuevas; las métricas
+globales se derivan de esos acumulados.
+"""
+import copy
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from kneechat.datos import TIPO_COMENTARIO
+from kneechat.sentimiento import ORDEN_SENTIMIENTO, bucketizar_sentimiento
+
+
+# Umbrales de la media de una entrevista para considerarla negativa/positiva
+UMBRAL_NEGATIVO = -0.3
+UMBRAL_POSITIVO = 0.3
+Z_95 = 1.96
+
+
+class MetricasKPI:
+    """
+    Acumulados por entrevista y por tipo de frase.
+
+    Uso:
+        metricas = MetricasKPI().actualizar(df)
+        metricas.actualizar(df_entrevistas_nuevas)
+    """
+
+    def __init__(self):
+        self.frases_totales = 0
+        self.frases_por_tipo = Counter()
+        self._entrevistas = set()
+        # Acumulados del sentimiento de Comentario/reflexión, por entrevista
+        self._acumulados = pd.DataFrame(
+            {"suma": [], "suma_cuad": [], "n": []}, dtype="float64"
+        )
+        self._por_sentimiento = Counter()
+
+    def actualizar(self, df_nuevas):
+        """Incorpora filas nuevas. El coste depende solo de df_nuevas."""
+        self.frases_totales += len(df_nuevas)
+        self.frases_por_tipo.update(
+            df_nuevas["tipo"].value_counts(sort=False).to_dict()
+        )
+        self._entrevistas.update(df_nuevas["num_entrevista"].astype(str).unique())
+
+        comentarios = df_nuevas.loc[
+            (df_nuevas["tipo"] == TIPO_COMENTARIO) & df_nuevas["sent_robertuito"].notna(),
+            ["num_entrevista", "sent_robertuito"],
+        ]
+        if not comentarios.empty:
+            sent = comentarios["sent_robertuito"].astype("float64")
+            nuevos = pd.DataFrame({
+                "suma": sent,
+                "suma_cuad": sent ** 2,
+                "n": 1.0,
+            }).groupby(comentarios["num_entrevista"].astype(str).to_numpy()).sum()
+            self._acumulados = self._acumulados.add(nuevos, fill_value=0)
+            # Con los valores tal cual (float32 en el snapshot), no los pasados a float64
+            self._por_sentimiento.update(
+                bucketizar_sentimiento(comentarios["sent_robertuito"]).value_counts(sort=False).to_dict()
+            )
+        return self
+
+    @classmethod
+    def desde_dataframe(cls, df):
+        return cls().actualizar(df)
+
+    def copiar(self):
+        """Copia que se puede actualizar sin cambiar esta (actualizar no modifica los DataFrames en el sitio)."""
+        copia = copy.copy(self)
+        copia.frases_por_tipo = Counter(self.frases_por_tipo)
+        copia._entrevistas = set(self._entrevistas)
+        copia._por_sentimiento = Counter(self._por_sentimiento)
+        return copia
+
+    @property
+    def entrevistas(self):
+        """Número de entrevistas distintas (pacientes)."""
+        return len(self._entrevistas)
+
+    def frases_tipo(self, tipo):
+        return self.frases_por_tipo.get(tipo, 0)
+
+    def por_entrevista(self):
+        """DataFrame indexado por entrevista con media, desviación típica, SEM y n."""
+        acum = self._acumulados
+        n = acum["n"]
+        media = acum["suma"] / n
+        # Varianza muestral a partir de los acumulados (ddof=1)
+        varianza = (acum["suma_cuad"] - n * media ** 2) / (n - 1)
+        std = np.sqrt(varianza.clip(lower=0))
+        return pd.DataFrame({
+            "media": media,
+            "std": std,
+            "sem": std / np.sqrt(n),
+            "n": n.astype("int64"),
+        })
+
+    def comentarios_por_sentimiento(self):
+        """Comentarios por categoría de sentimiento, en el orden de ORDEN_SENTIMIENTO."""
+        return pd.Series(
+            [self._por_sentimiento.get(categoria, 0) for categoria in ORDEN_SENTIMIENTO],
+            index=ORDEN_SENTIMIENTO, name="count",
+        )
+
+    def sentimiento_medio(self):
+        """
+        Media del sentimiento a nivel de entrevista y su IC ~95%.
+
+        Cada entrevista cuenta una vez (media de las medias por entrevista).
+        Devuelve (media, ic_inferior, ic_superior).
+        """
+        medias = self.por_entrevista()["media"]
+        if medias.empty:
+            return float("nan"), float("nan"), float("nan")
+        media = float(medias.mean())
+        margen = Z_95 * medias.std() / np.sqrt(len(medias)) if len(medias) > 1 else float("nan")
+        return media, media - margen, media + margen
+
+    def entrevistas_por_sentimiento(self):
+        """Número de entrevistas negativas, positivas y neutras según su media."""
+        medias = self.por_entrevista()["media"]
+        negativas = int((medias < UMBRAL_NEGATIVO).sum())
+        positivas = int((medias > UMBRAL_POSITIVO).sum())
+        return {
+            "Negativas": negativas,
+            "Positivas": positivas,
+            "Neutras": len(medias) - negativas - positivas,
+        }
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _metricas_version(version, _datos):
+    return MetricasKPI.desde_dataframe(_datos.df)
+
+
+def metricas_kpi(datos):
+    """Métricas cacheadas para la versión del Dataset."""
+    return _metricas_version(datos.version, datos)
@@ -0,0 +1,301 @@
+"""
+Navegador de frases paginado y filtrable en el servidor.
+
+Las tablas de ejemplos enviaban el DataFrame filtrado completo al navegador
+en cada rerun. Aquí el filtrado (tipo, categoría, sentimiento, entrevista),
+la ordenación y la paginación se resuelven en el servidor sobre índices
+precalculados una vez por versión del dataset, y solo se serializa la página
+visible. Con entrevistas nuevas (kneechat.ingesta) el índice se amplía
+codificando solo sus filas. Opcionalmente admite búsqueda de texto con
+kneechat.busqueda.
+"""
+import copy
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from kneechat import perfil
+from kneechat.sentimiento import ORDEN_SENTIMIENTO
+
+COLUMNAS_FILTRO = ("tipo", "DudasFrecuentes", "Tiporeflexión", "Sentimiento", "num_entrevista")
+TAMANOS_PAGINA = [10, 25, 50, 100]
+SIN_ORDEN = "(orden original)"
+# Combinaciones de filtros cuyas opciones se guardan en el índice
+MAX_VALORES = 256
+ETIQUETAS_COLUMNA = {
+    "tipo": "Tipo de frase",
+    "DudasFrecuentes": "Categoría de duda",
+    "Tiporeflexión": "Categoría de comentario",
+    "Sentimiento": "Sentimiento",
+    "num_entrevista": "Entrevista",
+}
+
+
+def _clave_entrevista(serie):
+    """Clave numérica para ordenar identificadores del tipo "P_12"."""
+    numeros = pd.to_numeric(serie.astype(str).str.extract(r"(\d+)")[0], errors="coerce")
+    return numeros if numeros.notna().any() else serie.astype(str)
+
+
+def _distintos(valores):
+    """Valores distintos no nulos, en orden de aparición."""
+    return pd.Index(np.asarray(valores.dropna().unique(), dtype=object))
+
+
+def _numero_entrevista(valores):
+    """Número de cada identificador del tipo "P_12" (NaN si no tiene)."""
+    return pd.to_numeric(
+        pd.Series(np.asarray(valores, dtype=object)).astype(str).str.extract(r"(\d+)")[0], errors="coerce"
+    ).to_numpy(dtype=np.float64)
+
+
+def _ordenar_categorias(col, valores, numeros=None):
+    """
+    (valores distintos de col en el orden en que se ofrecen en los filtros,
+    números de entrevista de esos valores o None).
+
+    numeros son los números de entrevista de valores, si ya se conocen.
+    Como _clave_entrevista: por número si alguno lo tiene, si no por texto.
+    """
+    if col == "Sentimiento":
+        return pd.Index(ORDEN_SENTIMIENTO), None
+    valores = pd.Index(valores)
+    if col != "num_entrevista":
+        return valores.sort_values(), None
+    if numeros is None:
+        numeros = _numero_entrevista(valores)
+    clave = numeros if not np.isnan(numeros).all() else np.asarray(valores, dtype=object).astype(str)
+    orden = np.argsort(clave, kind="stable")
+    return valores[orden], numeros[orden]
+
+
+def _tipo_codigos(n_categorias):
+    """El entero con signo más pequeño para códigos 0..n_categorias - 1 y -1 (nulo)."""
+    return np.result_type(np.int8, np.min_scalar_type(n_categorias))
+
+
+class IndiceFrases:
+    """
+    Índices de filtrado y ordenación sobre las frases.
+
+    Cada columna de filtro se guarda como códigos de categoría (enteros), así
+    que filtrar es comparar arrays de enteros; las permutaciones de orden se
+    calculan la primera vez que se piden y se reutilizan. Lo mismo con las
+    opciones de los filtros: el índice se comparte entre sesiones y así todas
+    reciben la misma tupla en lugar de construir su propia lista en cada rerun
+    (miles de cadenas con el filtro de entrevista).
+    """
+
+    def __init__(self, df):
+        self._df = df.reset_index(drop=True)
+        self._fuente = None
+        self._filas = len(self._df)
+        self._codigos = {}
+        self._categorias = {}
+        self._numeros = None  # número de cada categoría de num_entrevista
+        for col in COLUMNAS_FILTRO:
+            if col not in self.df.columns:
+                continue
+            valores = self.df[col]
+            categorias, numeros = _ordenar_categorias(col, _distintos(valores))
+            if numeros is not None:
+                self._numeros = numeros
+            codigos = pd.Categorical(valores, categories=categorias).codes
+            self._codigos[col] = codigos.astype(_tipo_codigos(len(categorias)))
+            self._categorias[col] = categorias
+        self._ordenes = {}
+        self._valores = {}
+
+    @property
+    def df(self):
+        df = self._df
+        if df is None:
+            # Índice ampliado: el DataFrame completo se pide la primera vez que
+            # hace falta (si dos sesiones lo piden a la vez, ambas obtienen lo mismo)
+            df = self._df = self._fuente().reset_index(drop=True)
+        return df
+
+    def ampliar(self, nuevas, df):
+        """
+        Índice con las filas de este más nuevas al final.
+
+        df es una función sin argumentos que devuelve el DataFrame con todas
+        las filas; solo se llama cuando se piden filas del índice (ordenar o
+        paginar). Solo se codifican las filas nuevas; si traen valores nuevos,
+        se ordenan junto con las categorías existentes (sin volver a analizar
+        estas) y los códigos existentes se traducen al orden nuevo (una
+        indexación de enteros). Este índice no cambia.
+        """
+        ampliado = copy.copy(self)
+        ampliado._df = None
+        ampliado._fuente = df
+        ampliado._filas = self._filas + len(nuevas)
+        ampliado._codigos = {}
+        ampliado._categorias = {}
+        for col, categorias in self._categorias.items():
+            valores = nuevas[col]
+            codigos = self._codigos[col]
+            unicos = _distintos(valores)
+            extra = unicos[categorias.get_indexer(unicos) < 0]
+            if len(extra):
+                numeros = None
+                if col == "num_entrevista":
+                    numeros = np.concatenate([self._numeros, _numero_entrevista(extra)])
+                nuevas, numeros = _ordenar_categorias(col, categorias.append(extra), numeros)
+                if numeros is not None:
+                    ampliado._numeros = numeros
+                traduccion = np.append(nuevas.get_indexer(categorias), -1)  # -1 -> -1 (nulos)
+                codigos, categorias = traduccion[codigos], nuevas
+            ampliado._codigos[col] = np.concatenate(
+                [codigos, pd.Categorical(valores, categories=categorias).codes]
+            ).astype(_tipo_codigos(len(categorias)))
+            ampliado._categorias[col] = categorias
+        ampliado._ordenes = {}
+        ampliado._valores = {}
+        return ampliado
+
+    def __len__(self):
+        return self._filas
+
+    def valores(self, col, filtros=None):
+        """Valores presentes en col (opcionalmente dentro de otros filtros), como tupla."""
+        clave = (col,) + tuple(sorted(
+            (c, tuple(v) if isinstance(v, (list, tuple, set)) else v)
+            for c, v in (filtros or {}).items() if v is not None and v != []
+        ))
+        valores = self._valores.get(clave)
+        if valores is None:
+            codigos = self._codigos[col]
+            if filtros:
+                codigos = codigos[self.mascara(filtros)]
+            presentes = np.unique(codigos[codigos >= 0])
+            valores = tuple(self._categorias[col][presentes].tolist())
+            if len(self._valores) >= MAX_VALORES:
+                self._valores.clear()
+            self._valores[clave] = valores
+        return valores
+
+    def mascara(self, filtros):
+        """
+        Máscara booleana de las filas que cumplen todos los filtros.
+
+        filtros: {columna: valor o lista de valores}. Listas vacías o None no
+        filtran.
+        """
+        mascara = np.ones(len(self), dtype=bool)
+        for col, valores in filtros.items():
+            if valores is None:
+                continue
+            if isinstance(valores, (list, tuple, set)):
+                if not valores:
+                    continue
+            else:
+                valores = [valores]
+            categorias = self._categorias[col]
+            buscados = [categorias.get_loc(v) for v in valores if v in categorias]
+            mascara &= np.isin(self._codigos[col], buscados)
+        return mascara
+
+    def _orden(self, col):
+        if col not in self._ordenes:
+            clave = _clave_entrevista(self.df[col]) if col == "num_entrevista" else self.df[col]
+            # Orden estable; los nulos quedan al final
+            self._ordenes[col] = np.asarray(
+                clave.sort_values(kind="stable", na_position="last").index
+            )
+        return self._ordenes[col]
+
+    def posiciones(self, filtros, orden=None, descendente=False):
+        """Posiciones de las filas filtradas, en el orden pedido."""
+        mascara = self.mascara(filtros)
+        if orden is None:
+            posiciones = np.flatnonzero(mascara)
+        else:
+            permutacion = self._orden(orden)
+            posiciones = permutacion[mascara[permutacion]]
+        return posiciones[::-1] if descendente else posiciones
+
+    def pagina(self, posiciones, columnas, pagina, tamano):
+        """Filas de una página (pagina empieza en 1)."""
+        inicio = (pagina - 1) * tamano
+        return self.df.iloc[posiciones[inicio:inicio + tamano]][columnas]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _indice_version(version, _datos):
+    return IndiceFrases(_datos.df)
+
+
+def indice_frases(datos):
+    """Índice de frases cacheado para la versión del Dataset."""
+    return _indice_version(datos.version, datos)
+
+
+def navegador_frases(indice, clave, filtros=None, columnas=("frase",), filtros_usuario=(),
+                     busqueda=None):
+    """
+    Muestra una tabla paginada de frases.
+
+    filtros: filtros fijos decididos por la página (p. ej. la categoría del
+        selectbox de la sección).
+    filtros_usuario: columnas que el usuario puede filtrar desde el propio
+        navegador.
+    busqueda: IndiceBusqueda opcional; si se da, se muestra un cuadro de
+        búsqueda y los resultados se ordenan por relevancia.
+    clave: prefijo único para las claves de los widgets.
+    """
+    filtros = dict(filtros or {})
+    columnas = list(columnas)
+
+    consulta = ""
+    if busqueda is not None:
+        consulta = st.text_input(
+            "Buscar en las frases", key=f"{clave}_consulta",
+            placeholder="p. ej. anestesia, espera, dolor",
+        ).strip()
+
+    with st.expander("Filtros y orden", expanded=False):
+        for col in filtros_usuario:
+            filtros[col] = st.multiselect(
+                ETIQUETAS_COLUMNA.get(col, col), indice.valores(col, filtros), key=f"{clave}_filtro_{col}"
+            )
+        col_orden, col_sentido = st.columns(2)
+        opciones_orden = [SIN_ORDEN] + list(dict.fromkeys(columnas + ["num_entrevista"]))
+        orden = col_orden.selectbox("Ordenar por", opciones_orden, key=f"{clave}_orden")
+        descendente = col_sentido.toggle("Descendente", key=f"{clave}_desc")
+
+    if consulta and orden == SIN_ORDEN:
+        # Sin orden explícito, los resultados de la búsqueda van por relevancia
+        posiciones, _ = busqueda.buscar(consulta, indice.mascara(filtros))
+        if descendente:
+            posiciones = posiciones[::-1]
+    else:
+        posiciones = indice.posiciones(
+            filtros, None if orden == SIN_ORDEN else orden, descendente
+        )
+        if consulta:
+            posiciones = posiciones[np.isin(posiciones, busqueda.puntuar(consulta)[0])]
+    total = len(posiciones)
+
+    col_tamano, col_pagina, col_info = st.columns([1, 1, 2])
+    tamano = col_tamano.selectbox(
+        "Filas por página", TAMANOS_PAGINA, index=1, key=f"{clave}_tamano"
+    )
+    paginas = max(1, math.ceil(total / tamano))
+    # Si cambian los filtros y la página guardada ya no existe, volver a la 1
+    clave_pagina = f"{clave}_pagina"
+    if st.session_state.get(clave_pagina, 1) > paginas:
+        st.session_state[clave_pagina] = 1
+    pagina = col_pagina.number_input(
+        "Página", min_value=1, max_value=paginas, step=1, key=clave_pagina
+    )
+    inicio = (pagina - 1) * tamano
+    col_info.caption(
+        f"Mostrando {min(inicio + 1, total)}–{min(inicio + tamano, total)} de {total} frases"
+    )
+
+    visibles = indice.pagina(posiciones, columnas, pagina, tamano)
+    st.dataframe(visibles, width="stretch", hide_index=True)
+    perfil.registrar(visibles)
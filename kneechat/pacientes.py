@@ -0,0 +1,261 @@
+"""
+Matriz dispersa pacientes x categorías.
+
+Hasta ahora el único número por paciente era nunique("num_entrevista") de
+cada categoría. Aquí se guarda, para cada paciente (entrevista) y cada
+categoría de tipo, DudasFrecuentes y Tiporeflexión, cuántas frases suyas hay
+en ella, más la suma y el número de sus comentarios con sentimiento. Se
+construye una vez por versión del dataset (como IndiceTerminos, se puede
+copiar y actualizar con filas nuevas, y kneechat.ingesta lo hace con las
+entrevistas ingeridas) y de ella salen sin recorrer las frases:
+
+    coocurrencia        pacientes que plantean a la vez dos categorías
+                        (producto de matrices dispersas de incidencia)
+    pacientes_con       pacientes que plantean todas las categorías dadas
+    perfil              categorías y sentimiento de un paciente
+    sentimiento_medio   sentimiento medio de cada paciente (opcionalmente de
+                        los que plantean una categoría)
+"""
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import streamlit as st
+
+from kneechat.datos import TIPO_COMENTARIO
+
+DIMENSIONES = ("tipo", "DudasFrecuentes", "Tiporeflexión")
+
+
+def _con_forma(matriz, forma):
+    """
+    La matriz CSR con las filas y columnas vacías que le falten hasta forma.
+    Comparte datos e índices con la original, que no se modifica (resize lo
+    haría, y la pueden estar usando copias anteriores de la matriz).
+    """
+    relleno = np.full(forma[0] - matriz.shape[0], matriz.indptr[-1], dtype=matriz.indptr.dtype)
+    return sp.csr_matrix((matriz.data, matriz.indices, np.concatenate([matriz.indptr, relleno])), shape=forma)
+
+
+class MatrizPacientes:
+    """
+    Frases de cada paciente por (dimensión, categoría).
+
+    Filas: pacientes (id_entrevista) en orden de aparición. Columnas: las
+    categorías de todas las dimensiones, en orden de aparición. Las
+    consultas se pueden hacer desde varios hilos (sesiones); los resultados
+    derivados que se guardan la primera vez se calculan con un cerrojo.
+
+    Uso:
+        matriz = MatrizPacientes().actualizar(df)
+        ampliada = matriz.copiar().actualizar(df_frases_nuevas)
+    """
+
+    def __init__(self, dimensiones=DIMENSIONES):
+        self.pacientes = {}  # id -> fila
+        self.columnas = {dimension: {} for dimension in dimensiones}  # categoría -> columna
+        self.ids = np.empty(0, dtype=object)
+        self._n_columnas = 0
+        self._conteos = sp.csr_matrix((0, 0), dtype=np.int32)
+        self._suma_sentimiento = np.zeros(0)
+        self._comentarios = np.zeros(0, dtype=np.int64)
+        self._bloqueo = threading.RLock()
+        self._limpiar_derivados()
+
+    def copiar(self):
+        """Copia que se puede actualizar sin cambiar esta (actualizar no modifica los arrays en el sitio)."""
+        copia = copy.copy(self)
+        copia.pacientes = dict(self.pacientes)
+        copia.columnas = {dimension: dict(columnas) for dimension, columnas in self.columnas.items()}
+        copia._bloqueo = threading.RLock()
+        copia._limpiar_derivados()
+        return copia
+
+    def _derivado(self, atributo, calcular):
+        """Valor de atributo, calculado la primera vez con calcular()."""
+        valor = getattr(self, atributo)
+        if valor is None:
+            with self._bloqueo:
+                valor = getattr(self, atributo)
+                if valor is None:
+                    valor = calcular()
+                    setattr(self, atributo, valor)
+        return valor
+
+    def _limpiar_derivados(self):
+        self._indice = None
+        self._etiquetas = None
+        self._incidencia = None
+        self._por_columna = None
+        self._coocurrencias = {}
+
+    def actualizar(self, df_nuevas):
+        """Incorpora filas nuevas. El coste depende solo de df_nuevas."""
+        # Se factoriza cada columna y solo se buscan en los diccionarios los valores distintos
+        codigos, unicos = pd.factorize(df_nuevas["id_entrevista"])
+        nuevos = [paciente for paciente in unicos.tolist() if paciente not in self.pacientes]
+        for paciente in nuevos:
+            self.pacientes[paciente] = len(self.pacientes)
+        self.ids = np.concatenate([self.ids, np.array(nuevos, dtype=object)])
+        filas = np.array([self.pacientes[paciente] for paciente in unicos.tolist()], dtype=np.int64)[codigos]
+
+        filas_celdas, columnas_celdas = [], []
+        for dimension, columnas in self.columnas.items():
+            codigos, categorias = pd.factorize(df_nuevas[dimension])
+            for categoria in map(str, categorias.tolist()):
+                if categoria not in columnas:
+                    columnas[categoria] = self._n_columnas
+                    self._n_columnas += 1
+            presentes = codigos >= 0
+            filas_celdas.append(filas[presentes])
+            columnas_celdas.append(
+                np.array([columnas[str(c)] for c in categorias.tolist()], dtype=np.int64)[codigos[presentes]]
+            )
+        filas_celdas = np.concatenate(filas_celdas)
+        forma = (len(self.pacientes), self._n_columnas)
+        # coo -> csr suma las celdas repetidas (una por frase)
+        nuevos_conteos = sp.coo_matrix(
+            (np.ones(len(filas_celdas), dtype=np.int32), (filas_celdas, np.concatenate(columnas_celdas))),
+            shape=forma,
+        ).tocsr()
+        self._conteos = _con_forma(self._conteos, forma) + nuevos_conteos
+
+        sentimiento = df_nuevas["sent_robertuito"].to_numpy(dtype=float)
+        comentarios = (df_nuevas["tipo"] == TIPO_COMENTARIO).to_numpy() & ~np.isnan(sentimiento)
+        # Arrays nuevos (no en el sitio) por si hay copias que los comparten
+        self._suma_sentimiento = np.concatenate([self._suma_sentimiento, np.zeros(len(nuevos))])
+        self._comentarios = np.concatenate([self._comentarios, np.zeros(len(nuevos), dtype=np.int64)])
+        filas_comentarios = filas[comentarios]
+        self._suma_sentimiento = self._suma_sentimiento + np.bincount(
+            filas_comentarios, sentimiento[comentarios], minlength=forma[0])
+        self._comentarios = self._comentarios + np.bincount(filas_comentarios, minlength=forma[0])
+        self._limpiar_derivados()
+        return self
+
+    @classmethod
+    def desde_dataframe(cls, df, dimensiones=DIMENSIONES):
+        return cls(dimensiones).actualizar(df)
+
+    def __len__(self):
+        return len(self.pacientes)
+
+    @property
+    def incidencia(self):
+        """Matriz 0/1: el paciente tiene alguna frase en la categoría."""
+        def calcular():
+            incidencia = self._conteos.copy()
+            incidencia.data = np.ones_like(incidencia.data)
+            return incidencia
+        return self._derivado("_incidencia", calcular)
+
+    def _columnas(self, dimension):
+        columnas = self.columnas[dimension]
+        return list(columnas), np.fromiter(columnas.values(), dtype=np.int64, count=len(columnas))
+
+    def coocurrencia(self, dimension_a, dimension_b):
+        """
+        Tabla categorías de dimension_a x categorías de dimension_b con el
+        número de pacientes que plantean ambas. Con la misma dimensión, la
+        diagonal es el número de pacientes de cada categoría.
+        """
+        clave = (dimension_a, dimension_b)
+        tabla = self._coocurrencias.get(clave)
+        if tabla is not None:
+            return tabla
+        with self._bloqueo:
+            if clave in self._coocurrencias:
+                return self._coocurrencias[clave]
+            categorias_a, columnas_a = self._columnas(dimension_a)
+            categorias_b, columnas_b = self._columnas(dimension_b)
+            # Las columnas se recortan en CSC; el segundo factor es pequeño (pacientes x
+            # categorías de una dimensión) y denso el producto es más rápido
+            por_columna = self._incidencia_columnas()
+            producto = por_columna[:, columnas_a].T @ por_columna[:, columnas_b].toarray()
+            self._coocurrencias[clave] = pd.DataFrame(
+                producto, index=pd.Index(categorias_a, name=dimension_a),
+                columns=pd.Index(categorias_b, name=dimension_b),
+            )
+        return self._coocurrencias[clave]
+
+    def _incidencia_columnas(self):
+        """La incidencia en CSC, para recortar por columnas."""
+        return self._derivado("_por_columna", lambda: self.incidencia.tocsc())
+
+    def _filas_columna(self, columna):
+        matriz = self._incidencia_columnas()
+        return matriz.indices[matriz.indptr[columna]:matriz.indptr[columna + 1]]
+
+    def filas_con(self, categorias):
+        """Filas (ordenadas) de los pacientes con todas las (dimensión, categoría) dadas."""
+        filas = None
+        for dimension, categoria in categorias:
+            columna = self.columnas[dimension].get(categoria)
+            if columna is None:
+                return np.empty(0, dtype=np.int64)
+            en_columna = self._filas_columna(columna)
+            filas = en_columna if filas is None else np.intersect1d(filas, en_columna, assume_unique=True)
+        return np.arange(len(self.pacientes)) if filas is None else filas
+
+    def pacientes_con(self, categorias):
+        """Ids de los pacientes que plantean todas las (dimensión, categoría) dadas."""
+        return self.ids[self.filas_con(categorias)]
+
+    def sentimiento_medio(self, filas=None):
+        """Sentimiento medio de los comentarios de cada paciente (NaN sin comentarios)."""
+        if filas is None:
+            filas = slice(None)
+        comentarios = self._comentarios[filas]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medias = np.where(comentarios > 0, self._suma_sentimiento[filas] / comentarios, np.nan)
+        indice = self._derivado("_indice", lambda: pd.Index(self.ids, name="num_entrevista"))
+        return pd.Series(medias, index=indice[filas], name="sentimiento")
+
+    def sentimiento_categoria(self, dimension, categoria):
+        """Sentimiento medio de cada paciente que plantea la categoría."""
+        return self.sentimiento_medio(self.filas_con([(dimension, categoria)]))
+
+    def perfil(self, paciente):
+        """
+        Tabla [Dimensión, Categoría, Frases] de un paciente y su resumen
+        {frases, comentarios, sentimiento}. Con un id desconocido, (None, None).
+        """
+        fila = self.pacientes.get(paciente)
+        if fila is None:
+            return None, None
+        trozo = slice(self._conteos.indptr[fila], self._conteos.indptr[fila + 1])
+        columnas, frases = self._conteos.indices[trozo], self._conteos.data[trozo]
+        etiquetas = self._derivado("_etiquetas", self._calcular_etiquetas)[columnas]
+        orden = np.lexsort((-frases, etiquetas[:, 0].astype(np.int64)))
+        tabla = pd.DataFrame({
+            "Dimensión": etiquetas[orden, 1],
+            "Categoría": etiquetas[orden, 2],
+            "Frases": frases[orden],
+        })
+        comentarios = int(self._comentarios[fila])
+        resumen = {
+            # Cada frase tiene un tipo: el total sale de esas columnas
+            "frases": int(frases[etiquetas[:, 1] == "tipo"].sum()),
+            "comentarios": comentarios,
+            "sentimiento": self._suma_sentimiento[fila] / comentarios if comentarios else np.nan,
+        }
+        return tabla, resumen
+
+    def _calcular_etiquetas(self):
+        """(orden de la dimensión, dimensión, categoría) de cada columna."""
+        etiquetas = [None] * self._n_columnas
+        for orden, (dimension, categorias) in enumerate(self.columnas.items()):
+            for categoria, columna in categorias.items():
+                etiquetas[columna] = (orden, dimension, categoria)
+        return np.array(etiquetas, dtype=object).reshape(-1, 3)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _pacientes_version(version, _datos):
+    return MatrizPacientes.desde_dataframe(_datos.df)
+
+
+def matriz_pacientes(datos):
+    """Matriz pacientes x categorías cacheada para la versión del Dataset."""
+    return _pacientes_version(datos.version, datos)
@@ -0,0 +1,181 @@
+"""
+Perfilado opcional del tiempo y del tamaño enviado por cada sección.
+
+Se activa con la variable de entorno KNEECHAT_PERFIL=1 o con el parámetro
+?perfil=1 en la URL. Cuando está activo, app.py marca el inicio de cada
+sección con perfil.seccion("...") y registra lo que envía al navegador
+(figuras, tablas, imágenes) con perfil.registrar(obj). Al final del script
+se muestra un resumen en la barra lateral y se añade una línea JSON al log
+(KNEECHAT_PERFIL_LOG, por defecto .kneechat_cache/perfil.jsonl).
+
+Las secciones declaradas con @perfil.fragmento("...") son fragmentos de
+Streamlit: cuando un widget suyo solo vuelve a ejecutar el fragmento, esa
+ejecución parcial se mide aparte y se añade al log con el campo "fragmento".
+
+Desactivado, todas las llamadas son no-ops baratas.
+"""
+import contextvars
+import functools
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+ENV_PERFIL = "KNEECHAT_PERFIL"
+ENV_LOG = "KNEECHAT_PERFIL_LOG"
+RUTA_LOG = Path(__file__).resolve().parent.parent / ".kneechat_cache" / "perfil.jsonl"
+VALORES_ACTIVO = ("1", "true", "si", "sí", "yes")
+
+_actual = contextvars.ContextVar("perfilador", default=None)
+
+
+def perfil_activo():
+    """True si el perfilado está pedido por entorno o por query param."""
+    if os.environ.get(ENV_PERFIL, "").lower() in VALORES_ACTIVO:
+        return True
+    try:
+        return st.query_params.get("perfil", "").lower() in VALORES_ACTIVO
+    except Exception:
+        # Fuera de una sesión de Streamlit no hay query params
+        return False
+
+
+def tamano_serializado(obj):
+    """Bytes aproximados que Streamlit envía al frontend para obj."""
+    if obj is None:
+        return 0
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj.encode("utf-8"))
+    if isinstance(obj, pd.DataFrame):
+        # st.dataframe serializa en Arrow IPC
+        buffer = io.BytesIO()
+        tabla = pa.Table.from_pandas(obj)
+        with pa.ipc.new_stream(buffer, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        return buffer.tell()
+    if hasattr(obj, "to_json"):
+        # Figuras de Plotly
+        return len(obj.to_json().encode("utf-8"))
+    return 0
+
+
+class Perfilador:
+    """Tiempos y bytes por sección de una ejecución del script."""
+
+    def __init__(self, activo):
+        self.activo = activo
+        self.secciones = []
+        self._inicio = time.perf_counter()
+        self._abierta = None
+
+    def seccion(self, nombre):
+        """Cierra la sección en curso (si la hay) y empieza otra."""
+        if not self.activo:
+            return
+        self._cerrar()
+        self._abierta = {"seccion": nombre, "inicio": time.perf_counter(), "bytes": 0}
+
+    def registrar(self, obj):
+        """Suma a la sección en curso el tamaño serializado de obj."""
+        if self.activo and self._abierta is not None:
+            self._abierta["bytes"] += tamano_serializado(obj)
+
+    def _cerrar(self):
+        if self._abierta is None:
+            return
+        abierta, self._abierta = self._abierta, None
+        self.secciones.append({
+            "seccion": abierta["seccion"],
+            "ms": round((time.perf_counter() - abierta["inicio"]) * 1000, 2),
+            "bytes": abierta["bytes"],
+        })
+
+    def finalizar(self, ruta_log=None, fragmento=None):
+        """
+        Cierra la última sección, la muestra en la barra lateral y la escribe en el log.
+
+        Con fragmento (ejecución parcial de ese fragmento) solo se escribe en
+        el log: un fragmento no puede añadir elementos a la barra lateral.
+        """
+        if not self.activo:
+            return None
+        self._cerrar()
+        registro = {
+            "timestamp": time.time(),
+            "total_ms": round((time.perf_counter() - self._inicio) * 1000, 2),
+            "total_bytes": sum(s["bytes"] for s in self.secciones),
+            "secciones": self.secciones,
+        }
+        if fragmento:
+            registro["fragmento"] = fragmento
+        ruta_log = Path(ruta_log or os.environ.get(ENV_LOG) or RUTA_LOG)
+        ruta_log.parent.mkdir(parents=True, exist_ok=True)
+        with ruta_log.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        if fragmento:
+            return registro
+
+        with st.sidebar.expander("🛠️ Perfil de la página", expanded=True):
+            st.caption(
+                f"Total: {registro['total_ms']:.0f} ms · "
+                f"{registro['total_bytes'] / 1024:.1f} KiB enviados"
+            )
+            st.dataframe(pd.DataFrame(self.secciones), hide_index=True, width="stretch")
+        return registro
+
+
+def iniciar():
+    """Crea el perfilador de esta ejecución del script."""
+    perfilador = Perfilador(perfil_activo())
+    _actual.set(perfilador)
+    return perfilador
+
+
+def actual():
+    """Perfilador de la ejecución en curso (inactivo si no se ha iniciado)."""
+    return _actual.get() or Perfilador(False)
+
+
+def seccion(nombre):
+    actual().seccion(nombre)
+
+
+def registrar(obj):
+    actual().registrar(obj)
+
+
+def _ejecucion_parcial():
+    """True si esta ejecución solo vuelve a ejecutar fragmentos, no el script."""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+
+def fragmento(nombre):
+    """
+    Declara una sección como st.fragment y la perfila con ese nombre.
+
+    En una ejecución completa es una sección más del perfil de la página; en
+    una ejecución parcial del fragmento se mide con su propio perfilador.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _ejecucion_parcial():
+                seccion(nombre)
+                return funcion(*args, **kwargs)
+            perfilador = iniciar()
+            perfilador.seccion(nombre)
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                perfilador.finalizar(fragmento=nombre)
+        return st.fragment(envoltura)
+    return decorador
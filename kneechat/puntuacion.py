@@ -0,0 +1,202 @@
+"""
+Pipeline offline de puntuación de sentimiento (`sent_robertuito`).
+
+Lee del snapshot las frases sin puntuación, las puntúa por lotes con un
+backend local (léxico para pruebas, Robertuito si hay pesos en disco) usando
+un pool de hilos o de procesos y escribe las puntuaciones de vuelta en el
+snapshot. Cada puntuación se guarda al momento en una caché en disco por hash
+del contenido de la frase: una frase nunca se puntúa dos veces y, si el
+proceso se interrumpe, al relanzarlo continúa donde lo dejó.
+
+Uso:
+    python -m kneechat.puntuacion --backend lexico
+    python -m kneechat.puntuacion --backend robertuito --modelo /ruta/robertuito --procesos --trabajadores 4
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kneechat import snapshot
+from kneechat.busqueda import raiz, tokenizar
+from kneechat.datos import TIPO_COMENTARIO
+from kneechat.lotes import CacheSQLite, procesar_frases
+from kneechat.sentimiento import bucketizar_sentimiento
+
+RUTA_CACHE = snapshot.DIR_SNAPSHOTS / "sentimiento.sqlite"
+TAMANO_LOTE = 64
+
+
+class BackendLexico:
+    """
+    Backend de léxico, sin dependencias ni modelo.
+
+    Puntuación = (positivas - negativas) / (positivas + negativas + 1), en
+    [-1, 1]. Pensado para pruebas y para entornos sin pesos del modelo.
+    """
+
+    nombre = "lexico"
+
+    POSITIVAS = frozenset(raiz(p) for p in """
+        bien bueno buena genial tranquilo tranquila confianza contento contenta
+        feliz mejor esperanza excelente perfecto positivo seguro segura alegre
+        encantado fenomenal estupendo maravilloso agradecido optimista ilusion
+        deseando animado animada
+    """.split())
+    NEGATIVAS = frozenset(raiz(p) for p in """
+        dolor duele mal malo mala peor miedo preocupa preocupado preocupada
+        ansiedad sufrir sufro horrible terrible cansado cansada triste angustia
+        nervioso nerviosa dificil insoportable desesperado desesperada molestia
+        complicacion problema cojeo fatal aguantar harto harta
+    """.split())
+
+    def puntuar(self, frases):
+        puntuaciones = []
+        for frase in frases:
+            terminos = tokenizar(frase)
+            pos = sum(t in self.POSITIVAS for t in terminos)
+            neg = sum(t in self.NEGATIVAS for t in terminos)
+            puntuaciones.append((pos - neg) / (pos + neg + 1))
+        return puntuaciones
+
+
+class BackendRobertuito:
+    """
+    Robertuito (pysentimiento) cargado desde una carpeta local.
+
+    La puntuación es P(POS) - P(NEG), la misma escala que `sent_robertuito`.
+    Requiere `transformers` y `torch`; nunca descarga pesos de internet.
+    """
+
+    nombre = "robertuito"
+
+    def __init__(self, modelo=None):
+        modelo = modelo or os.environ.get("KNEECHAT_ROBERTUITO")
+        if not modelo or not Path(modelo).is_dir():
+            raise FileNotFoundError(
+                "No se encuentran los pesos de Robertuito; indica la carpeta con "
+                "--modelo o la variable KNEECHAT_ROBERTUITO"
+            )
+        from transformers import pipeline
+
+        self._clasificador = pipeline(
+            "text-classification", model=modelo, tokenizer=modelo,
+            top_k=None, model_kwargs={"local_files_only": True},
+        )
+
+    def puntuar(self, frases):
+        puntuaciones = []
+        for resultado in self._clasificador(list(frases), truncation=True):
+            probs = {r["label"].upper(): r["score"] for r in resultado}
+            puntuaciones.append(probs.get("POS", 0.0) - probs.get("NEG", 0.0))
+        return puntuaciones
+
+
+BACKENDS = {
+    BackendLexico.nombre: BackendLexico,
+    BackendRobertuito.nombre: BackendRobertuito,
+}
+
+
+def crear_backend(nombre, **opciones):
+    return BACKENDS[nombre](**opciones)
+
+
+class CachePuntuaciones(CacheSQLite):
+    """Caché persistente (SQLite) de puntuaciones por (backend, hash de frase)."""
+
+    def __init__(self, ruta=RUTA_CACHE):
+        super().__init__(ruta, "puntuaciones", "backend", ["puntuacion REAL"])
+
+
+def _puntuar(backend, frases):
+    return [float(p) for p in backend.puntuar(frases)]
+
+
+def puntuar_frases(frases, backend="lexico", opciones=None, cache=None,
+                   tamano_lote=TAMANO_LOTE, trabajadores=1, procesos=False, progreso=None):
+    """
+    Puntúa una lista de frases y devuelve un array de float32.
+
+    El backend se crea una vez por proceso del pool (o una vez, con hilos).
+    La caché y el reparto en lotes son los de kneechat.lotes.procesar_frases.
+    """
+    crear = functools.partial(crear_backend, backend, **(opciones or {}))
+    puntuaciones = procesar_frases(
+        frases, cache or CachePuntuaciones(), backend, _puntuar, crear=crear,
+        tamano_lote=tamano_lote, trabajadores=trabajadores, procesos=procesos, progreso=progreso,
+    )
+    return np.array(puntuaciones, dtype=np.float32)
+
+
+def filas_pendientes(df, todas=False):
+    """Máscara de filas sin puntuación (por defecto, solo Comentario/reflexión)."""
+    mascara = df["sent_robertuito"].isna()
+    if not todas:
+        mascara &= df["tipo"] == TIPO_COMENTARIO
+    return mascara
+
+
+def puntuar_snapshot(ruta_xlsx, backend="lexico", todas=False, **kwargs):
+    """
+    Puntúa las filas pendientes del snapshot y lo reescribe.
+
+    El hash de versión del snapshot cambia para que las cachés derivadas del
+    dashboard (agregados, métricas, figuras) se recalculen. Devuelve el número
+    de filas puntuadas.
+    """
+    ruta_snap = snapshot.ruta_snapshot(ruta_xlsx)
+    if snapshot.leer_metadatos(ruta_snap) is None:
+        snapshot.convertir(ruta_xlsx, ruta_snap)
+    df = snapshot.leer_snapshot(ruta_snap)
+    metadatos = snapshot.leer_metadatos(ruta_snap)
+
+    mascara = filas_pendientes(df, todas)
+    if not mascara.any():
+        return 0
+    puntuaciones = puntuar_frases(df.loc[mascara, "frase"].astype(str).tolist(), backend, **kwargs)
+
+    df["sent_robertuito"] = df["sent_robertuito"].astype("float32")
+    df.loc[mascara, "sent_robertuito"] = puntuaciones
+    if "Sentimiento" in df.columns:
+        sentimiento = df["Sentimiento"].astype(object)
+        sentimiento[mascara] = bucketizar_sentimiento(puntuaciones).astype(object)
+        df["Sentimiento"] = sentimiento
+
+    huella = hashlib.sha256(metadatos["hash"].encode())
+    huella.update(pd.util.hash_pandas_object(df["sent_robertuito"], index=False).to_numpy().tobytes())
+    metadatos = {**metadatos, "hash": huella.hexdigest()[:16], "puntuado_con": backend}
+    snapshot.escribir_snapshot(snapshot.tipar(df), ruta_snap, metadatos)
+    return int(mascara.sum())
+
+
+def main(argv=None):
+    from kneechat.datos import RUTA_DATASET
+
+    parser = argparse.ArgumentParser(description="Puntúa el sentimiento de las frases nuevas.")
+    parser.add_argument("libro", nargs="?", default=str(RUTA_DATASET))
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=BackendLexico.nombre)
+    parser.add_argument("--modelo", help="carpeta local con los pesos de Robertuito")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE)
+    parser.add_argument("--trabajadores", type=int, default=1)
+    parser.add_argument("--procesos", action="store_true", help="usar procesos en lugar de hilos")
+    parser.add_argument("--todas", action="store_true",
+                        help="puntuar también frases que no son Comentario/reflexión")
+    args = parser.parse_args(argv)
+
+    opciones = {"modelo": args.modelo} if args.backend == BackendRobertuito.nombre else {}
+    n = puntuar_snapshot(
+        args.libro, args.backend, todas=args.todas, opciones=opciones,
+        tamano_lote=args.lote, trabajadores=args.trabajadores, procesos=args.procesos,
+        progreso=lambda i, total: print(f"lote {i}/{total}", flush=True),
+    )
+    print(json.dumps({"filas_puntuadas": n, "backend": args.backend}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Recursos estáticos de la página: logo, título y CSS.
+
+app.py codificaba el logo en base64 en cada ejecución del script. Aquí el
+HTML del logo se construye una vez por proceso (en el primer uso o en el
+precalentamiento de kneechat.arranque) y el resto (título, CSS y plantilla
+de las tarjetas de indicadores) son constantes.
+"""
+import base64
+import functools
+from pathlib import Path
+
+RUTA_LOGO = Path(__file__).resolve().parent.parent / "chatbotlogo.png"
+
+HTML_TITULO = (
+    "<h1 style='text-align: center; font-size:calc(24px + 1.2vw); margin:6px 0; line-height:1.1;'>"
+    "📊 Dashboard de KneeChat 🦿</h1>"
+)
+
+# Aumentar tamaño de fuente general
+CSS_PAGINA = """
+    <style>
+    p, div[class^="css"] {
+        font-size: 30px;
+    }
+    </style>
+    """
+
+# Tarjeta de indicador (cards); color de las generales
+HTML_CARD = """
+    <div style="padding: 10px; border-radius: 10px; background-color: {bg_color}; text-align: center; color: white;">
+        <h4 style="margin: 0;">{title}</h4>
+        <p style="font-size: 24px; font-weight: bold; margin: 5px 0;">{value}</p>
+    </div>
+"""
+COLOR_CARD_GENERAL = "#34a3d3"
+
+
+@functools.lru_cache(maxsize=None)
+def html_logo(ruta=RUTA_LOGO):
+    """<div> con el logo centrado como data URI, o None si no está el fichero."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    b64 = base64.b64encode(ruta.read_bytes()).decode()
+    return f"<div style='text-align:center;'><img src='data:image/png;base64,{b64}' width='140'></div>"
@@ -0,0 +1,58 @@
+"""
+Clasificación de puntuaciones de sentimiento (escala -1 a 1) en categorías.
+
+clasificar_sentimiento() clasifica un valor suelto; bucketizar_sentimiento()
+hace lo mismo con arrays/Series completos de forma vectorizada y es lo que se
+usa para calcular la columna `Sentimiento` una vez por versión del dataset.
+"""
+import numpy as np
+import pandas as pd
+
+ORDEN_SENTIMIENTO = ["Muy negativo", "Negativo", "Neutral", "Positivo", "Muy positivo"]
+
+# Límites (muy negativo, negativo, positivo, muy positivo). Los negativos son
+# exclusivos (x < -0.6) y los positivos también (x > 0.3): -0.3 y 0.3 son
+# Neutral, -0.6 es Negativo y 0.6 es Positivo.
+UMBRALES = (-0.6, -0.3, 0.3, 0.6)
+
+
+def clasificar_sentimiento(sent):
+    if sent < -0.6:
+        return 'Muy negativo'
+    elif sent < -0.3:
+        return 'Negativo'
+    elif sent > 0.6:
+        return 'Muy positivo'
+    elif sent > 0.3:
+        return 'Positivo'
+    else:
+        return 'Neutral'
+
+
+def bucketizar_sentimiento(valores, umbrales=UMBRALES):
+    """
+    Versión vectorizada de clasificar_sentimiento.
+
+    Devuelve un Categorical ordenado según ORDEN_SENTIMIENTO (una Series con
+    el mismo índice si `valores` es una Series). A diferencia de la función
+    escalar, los valores nulos quedan como nulos en lugar de 'Neutral'.
+
+    Los umbrales se comparan en el tipo de los valores, como en la función
+    escalar: float32(0.3) pasado a float64 vale 0.30000001 > 0.3 y saldría
+    Positivo en lugar de Neutral.
+    """
+    x = np.asarray(valores)
+    if x.dtype.kind != "f":
+        x = x.astype(np.float64)
+    muy_negativo, negativo, positivo, muy_positivo = np.asarray(umbrales, dtype=x.dtype)
+    # Lado negativo: límites cerrados por la izquierda (x >= umbral sube de
+    # categoría); lado positivo: cerrados por la derecha (x > umbral sube).
+    codigos = (
+        np.digitize(x, [muy_negativo, negativo], right=False)
+        + np.digitize(x, [positivo, muy_positivo], right=True)
+    ).astype(np.int8)
+    codigos[np.isnan(x)] = -1
+    categorias = pd.Categorical.from_codes(codigos, categories=ORDEN_SENTIMIENTO, ordered=True)
+    if isinstance(valores, pd.Series):
+        return pd.Series(categorias, index=valores.index, name="Sentimiento")
+    return categorias
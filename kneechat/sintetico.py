@@ -0,0 +1,207 @@
+"""
+Generador de corpus sintéticos con la forma del dataset de KneeChat.
+
+Aprende del libro original el esquema y las distribuciones (frases por
+entrevista, `tipo`, `DudasFrecuentes` y `Tiporeflexión` según el tipo,
+`sent_robertuito` según la categoría de reflexión y la longitud y el
+vocabulario de `frase` según el tipo) y genera filas estadísticamente
+parecidas por bloques, escribiéndolas en Parquet o CSV sin tener nunca el
+corpus entero en memoria. Con la misma semilla y el mismo tamaño de bloque la
+salida es idéntica.
+
+Uso:
+    python -m kneechat.sintetico --frases 1000000 --salida corpus.parquet --semilla 0
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from kneechat import snapshot
+from kneechat.sentimiento import bucketizar_sentimiento
+
+TAMANO_BLOQUE = 100_000
+DIR_BENCH = snapshot.DIR_SNAPSHOTS / "bench"
+# Ruido añadido a las puntuaciones de sentimiento remuestreadas
+RUIDO_SENTIMIENTO = 0.05
+
+
+def _distribucion(serie):
+    """(valores, probabilidades) de una serie categórica, sin nulos."""
+    conteos = serie.dropna().astype(str).value_counts()
+    return conteos.index.to_numpy(dtype=object), (conteos / conteos.sum()).to_numpy()
+
+
+class ModeloCorpus:
+    """Distribuciones empíricas aprendidas de un DataFrame con el esquema del libro."""
+
+    def __init__(self, df):
+        self.columnas = list(df.columns)
+        tipos = df["tipo"].astype(str)
+        self.frases_por_entrevista = (
+            df.groupby("num_entrevista", observed=True).size().to_numpy()
+        )
+        self.tipos, self.p_tipos = _distribucion(tipos)
+
+        self.dudas = _distribucion(df.loc[df["DudasFrecuentes"].notna(), "DudasFrecuentes"])
+        self.tipo_dudas = tipos[df["DudasFrecuentes"].notna()].mode().iat[0]
+        self.reflexiones = _distribucion(df.loc[df["Tiporeflexión"].notna(), "Tiporeflexión"])
+        self.tipo_reflexiones = tipos[df["Tiporeflexión"].notna()].mode().iat[0]
+
+        con_sent = df[df["sent_robertuito"].notna() & df["Tiporeflexión"].notna()]
+        self.sentimiento = {
+            str(categoria): grupo.to_numpy(dtype=np.float64)
+            for categoria, grupo in con_sent.groupby("Tiporeflexión", observed=True)["sent_robertuito"]
+        }
+
+        # Longitud (en palabras) y vocabulario de las frases, por tipo
+        palabras = df["frase"].astype(str).str.split()
+        self.longitudes = {}
+        self.vocabulario = {}
+        for tipo in self.tipos:
+            del_tipo = palabras[tipos == tipo]
+            self.longitudes[tipo] = del_tipo.str.len().to_numpy()
+            vocab, p = _distribucion(del_tipo.explode())
+            self.vocabulario[tipo] = (vocab, p)
+
+    def generar_bloque(self, n_frases, rng, primera_entrevista):
+        """
+        Genera n_frases filas. Devuelve (DataFrame, siguiente número de entrevista).
+
+        Las entrevistas se numeran S_<n> a partir de primera_entrevista.
+        """
+        # Entrevistas completas hasta cubrir el bloque; la última se recorta
+        tamanos = []
+        while sum(tamanos) < n_frases:
+            tamanos.extend(rng.choice(self.frases_por_entrevista, size=64))
+        tamanos = np.array(tamanos)
+        corte = np.searchsorted(np.cumsum(tamanos), n_frases)
+        tamanos = tamanos[:corte + 1]
+        tamanos[-1] -= tamanos.sum() - n_frases
+        numeros = np.repeat(np.arange(primera_entrevista, primera_entrevista + len(tamanos)), tamanos)
+        entrevistas = pd.Series(numeros).map("S_{}".format)
+
+        tipo = rng.choice(self.tipos, size=n_frases, p=self.p_tipos)
+        dudas = np.full(n_frases, None, dtype=object)
+        reflexion = np.full(n_frases, None, dtype=object)
+        sent = np.full(n_frases, np.nan)
+
+        es_duda = tipo == self.tipo_dudas
+        dudas[es_duda] = rng.choice(self.dudas[0], size=es_duda.sum(), p=self.dudas[1])
+        es_reflexion = tipo == self.tipo_reflexiones
+        reflexion[es_reflexion] = rng.choice(
+            self.reflexiones[0], size=es_reflexion.sum(), p=self.reflexiones[1]
+        )
+        for categoria, valores in self.sentimiento.items():
+            filas = np.flatnonzero(reflexion == categoria)
+            muestra = rng.choice(valores, size=len(filas))
+            sent[filas] = muestra + rng.normal(0, RUIDO_SENTIMIENTO, size=len(filas))
+        sent = np.clip(sent, -1, 1).astype(np.float32)
+
+        frases = np.empty(n_frases, dtype=object)
+        for t in self.tipos:
+            filas = np.flatnonzero(tipo == t)
+            if len(filas) == 0:
+                continue
+            longitudes = rng.choice(self.longitudes[t], size=len(filas))
+            vocab, p = self.vocabulario[t]
+            palabras = vocab[rng.choice(len(vocab), size=longitudes.sum(), p=p)]
+            limites = np.cumsum(longitudes)[:-1]
+            frases[filas] = [" ".join(trozo) for trozo in np.split(palabras, limites)]
+
+        bloque = pd.DataFrame({
+            "num_entrevista": entrevistas,
+            "frase": frases,
+            "tipo": tipo,
+            "DudasFrecuentes": dudas,
+            "Tiporeflexión": reflexion,
+            "sent_robertuito": sent,
+        })
+        bloque["Sentimiento"] = bucketizar_sentimiento(bloque["sent_robertuito"]).astype(object)
+        return bloque[[c for c in self.columnas if c in bloque.columns]], primera_entrevista + len(tamanos)
+
+
+def generar(modelo, n_frases, semilla=0, tamano_bloque=TAMANO_BLOQUE):
+    """Generador de bloques (DataFrames) que suman n_frases filas."""
+    semillas = np.random.SeedSequence(semilla)
+    siguiente = 1
+    for inicio in range(0, n_frases, tamano_bloque):
+        rng = np.random.default_rng(semillas.spawn(1)[0])
+        bloque, siguiente = modelo.generar_bloque(
+            min(tamano_bloque, n_frases - inicio), rng, siguiente
+        )
+        yield bloque
+
+
+def _esquema_arrow():
+    return pa.schema([
+        ("num_entrevista", pa.string()),
+        ("frase", pa.string()),
+        ("tipo", pa.string()),
+        ("DudasFrecuentes", pa.string()),
+        ("Tiporeflexión", pa.string()),
+        ("sent_robertuito", pa.float32()),
+        ("Sentimiento", pa.string()),
+    ])
+
+
+def escribir(bloques, salida):
+    """Escribe los bloques en Parquet o CSV (según la extensión). Devuelve las filas."""
+    salida = Path(salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    filas = 0
+    if salida.suffix.lower() == ".csv":
+        for i, bloque in enumerate(bloques):
+            bloque.to_csv(salida, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            filas += len(bloque)
+        return filas
+    esquema = _esquema_arrow()
+    with pq.ParquetWriter(str(salida), esquema) as escritor:
+        for bloque in bloques:
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+            filas += len(bloque)
+    return filas
+
+
+def dataset_sintetico(n_frases, semilla=0, origen=None):
+    """
+    Ruta a un corpus sintético en Parquet de n_frases, generándolo si no existe.
+
+    Es el fixture de escala de los benchmarks. Con origen no se importa
+    kneechat.datos, así que se puede fijar después KNEECHAT_DATASET.
+    """
+    if origen is None:
+        from kneechat.datos import RUTA_DATASET as origen
+
+    salida = DIR_BENCH / f"sintetico_{n_frases}_s{semilla}.parquet"
+    if not salida.exists():
+        modelo = ModeloCorpus(snapshot.leer_origen(origen))
+        temporal = salida.with_suffix(".tmp.parquet")
+        escribir(generar(modelo, n_frases, semilla), temporal)
+        temporal.replace(salida)
+    return salida
+
+
+def main(argv=None):
+    from kneechat.datos import RUTA_DATASET
+
+    parser = argparse.ArgumentParser(description="Genera un corpus sintético de KneeChat.")
+    parser.add_argument("--frases", type=int, required=True)
+    parser.add_argument("--salida", required=True, help="fichero .parquet o .csv")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE)
+    parser.add_argument("--origen", default=str(RUTA_DATASET), help="dataset del que aprender")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    modelo = ModeloCorpus(snapshot.leer_origen(args.origen))
+    filas = escribir(generar(modelo, args.frases, args.semilla, args.bloque), args.salida)
+    print(f"{args.salida}: {filas} frases en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
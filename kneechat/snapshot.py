@@ -0,0 +1,125 @@
+"""
+Snapshot columnar (Arrow IPC) del libro de KneeChat.
+
+Parsear el .xlsx con openpyxl es lento y reserva mucha memoria, así que el
+libro se convierte una vez a un fichero Arrow IPC tipado que se lee con
+memory-map. El snapshot guarda en sus metadatos la huella del libro del que
+procede; si el libro cambia (mtime o tamaño), se regenera.
+
+Uso:
+    python -m kneechat.snapshot ["Dataset kneechat - ES.xlsx"]
+"""
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+DIR_SNAPSHOTS = Path(__file__).resolve().parent.parent / ".kneechat_cache"
+CLAVE_METADATOS = b"kneechat"
+
+# Tipos de almacenamiento. num_entrevista contiene identificadores del tipo
+# "P_12", así que se guarda como categoría (índices int8) en lugar de entero.
+COLUMNAS_CATEGORICAS = ["num_entrevista", "tipo", "DudasFrecuentes", "Tiporeflexión", "Sentimiento"]
+COLUMNAS_FLOAT32 = ["sent_robertuito"]
+
+
+def ruta_snapshot(ruta_xlsx):
+    """Ruta del snapshot asociado a un libro."""
+    return DIR_SNAPSHOTS / (Path(ruta_xlsx).stem + ".arrow")
+
+
+def leer_origen(ruta):
+    """Lee el dataset de origen según su extensión (.xlsx, .csv o .parquet)."""
+    sufijo = Path(ruta).suffix.lower()
+    if sufijo == ".csv":
+        return pd.read_csv(ruta)
+    if sufijo == ".parquet":
+        return pd.read_parquet(ruta)
+    return pd.read_excel(ruta)
+
+
+def tipar(df):
+    """Aplica los tipos compactos de almacenamiento al DataFrame leído del libro."""
+    df = df.copy()
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in COLUMNAS_FLOAT32:
+        if col in df.columns:
+            df[col] = df[col].astype("float32")
+    return df
+
+
+def leer_metadatos(ruta):
+    """Metadatos de origen del snapshot, o None si no existe o no es válido."""
+    try:
+        with pa.memory_map(str(ruta)) as fuente:
+            metadatos = ipc.open_file(fuente).schema.metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    if CLAVE_METADATOS not in metadatos:
+        return None
+    return json.loads(metadatos[CLAVE_METADATOS])
+
+
+def snapshot_vigente(ruta_snap, mtime_ns, tamano):
+    """Metadatos del snapshot si corresponde a esa versión del libro; si no, None."""
+    metadatos = leer_metadatos(ruta_snap)
+    if metadatos is None:
+        return None
+    if metadatos.get("mtime_ns") != mtime_ns or metadatos.get("tamano") != tamano:
+        return None
+    return metadatos
+
+
+def escribir_snapshot(df, ruta_snap, metadatos):
+    """Escribe df como Arrow IPC sin comprimir (apto para memory-map)."""
+    ruta_snap = Path(ruta_snap)
+    ruta_snap.parent.mkdir(parents=True, exist_ok=True)
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    tabla = tabla.replace_schema_metadata({
+        **(tabla.schema.metadata or {}),
+        CLAVE_METADATOS: json.dumps(metadatos).encode(),
+    })
+    # Se escribe en un temporal y se renombra para que otro proceso nunca lea
+    # un snapshot a medias.
+    temporal = ruta_snap.with_suffix(".tmp")
+    with pa.OSFile(str(temporal), "wb") as destino:
+        with ipc.new_file(destino, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+    temporal.replace(ruta_snap)
+
+
+def leer_snapshot(ruta_snap):
+    """Lee el snapshot con memory-map y lo devuelve como DataFrame."""
+    with pa.memory_map(str(ruta_snap)) as fuente:
+        tabla = ipc.open_file(fuente).read_all()
+    return tabla.to_pandas()
+
+
+def convertir(ruta_xlsx, ruta_snap=None):
+    """Convierte el libro a snapshot y devuelve (df tipado, metadatos)."""
+    from kneechat.datos import hash_archivo, huella_archivo
+
+    ruta_snap = ruta_snap or ruta_snapshot(ruta_xlsx)
+    _, mtime_ns, tamano = huella_archivo(ruta_xlsx)
+    df = tipar(leer_origen(ruta_xlsx))
+    metadatos = {
+        "origen": Path(ruta_xlsx).name,
+        "mtime_ns": mtime_ns,
+        "tamano": tamano,
+        "hash": hash_archivo(ruta_xlsx),
+    }
+    escribir_snapshot(df, ruta_snap, metadatos)
+    return df, metadatos
+
+
+if __name__ == "__main__":
+    from kneechat.datos import RUTA_DATASET
+
+    origen = Path(sys.argv[1]) if len(sys.argv) > 1 else RUTA_DATASET
+    df, metadatos = convertir(origen)
+    print(f"{ruta_snapshot(origen)}: {len(df)} filas, versión {metadatos['hash']}")
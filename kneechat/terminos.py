@@ -0,0 +1,163 @@
+"""
+Índice de términos más frecuentes por categoría (`DudasFrecuentes` y
+`Tiporeflexión`).
+
+Para cada dimensión guarda una matriz dispersa categorías x vocabulario con
+el número de apariciones de cada término, analizado como en la búsqueda
+(plegado de acentos, stopwords y raíz). Se construye una vez por versión del
+dataset y, como MetricasKPI, se puede copiar y actualizar con frases nuevas
+procesando solo esas filas (kneechat.ingesta lo hace con las entrevistas
+ingeridas). Los términos más frecuentes de una categoría salen de una fila
+de la matriz sin volver a tokenizar nada; en las tablas y nubes se muestra,
+para cada raíz, su forma más frecuente en el texto.
+"""
+import copy
+import re
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import streamlit as st
+
+from kneechat.busqueda import PATRON_TOKEN, STOPWORDS, plegar, raiz
+
+DIMENSIONES = ("DudasFrecuentes", "Tiporeflexión")
+# Palabras (solo letras, con acentos) antes de plegar; sin números
+PATRON_PALABRA = r"[^\W\d_]+"
+MIN_LONGITUD = 3
+TOP_TERMINOS = 15
+
+
+def _raiz_termino(palabra):
+    """Raíz de una palabra en minúsculas, o None si no es un término útil."""
+    plegada = plegar(palabra)
+    if len(plegada) < MIN_LONGITUD or plegada in STOPWORDS or not re.fullmatch(PATRON_TOKEN, plegada):
+        return None
+    return raiz(plegada)
+
+
+def _terminos(frases):
+    """DataFrame (posicion, raiz, forma) con un término por fila."""
+    palabras = (
+        frases.reset_index(drop=True).fillna("").astype(str).str.lower()
+        .str.findall(PATRON_PALABRA).explode().dropna()
+    )
+    # El análisis se hace una vez por palabra distinta, no por aparición
+    unicas = palabras.unique()
+    raices = palabras.map(dict(zip(unicas, map(_raiz_termino, unicas))))
+    validas = raices.notna().to_numpy()
+    return pd.DataFrame({
+        "posicion": palabras.index.to_numpy()[validas],
+        "raiz": raices.to_numpy()[validas],
+        "forma": palabras.to_numpy()[validas],
+    })
+
+
+def _ampliar_matriz(matriz, forma):
+    """
+    Matriz nueva con las filas y columnas vacías que le falten a matriz
+    hasta forma. La original no cambia (resize la modificaría en el sitio, y
+    la pueden estar usando copias anteriores del índice).
+    """
+    filas, columnas = forma
+    if columnas > matriz.shape[1]:
+        vacias = sp.csr_matrix((matriz.shape[0], columnas - matriz.shape[1]), dtype=matriz.dtype)
+        matriz = sp.hstack([matriz, vacias], format="csr")
+    if filas > matriz.shape[0]:
+        vacias = sp.csr_matrix((filas - matriz.shape[0], columnas), dtype=matriz.dtype)
+        matriz = sp.vstack([matriz, vacias], format="csr")
+    return matriz
+
+
+class IndiceTerminos:
+    """
+    Apariciones de cada término por categoría, una matriz por dimensión.
+
+    Uso:
+        indice = IndiceTerminos().actualizar(df)
+        ampliado = indice.copiar().actualizar(df_frases_nuevas)
+    """
+
+    def __init__(self, dimensiones=DIMENSIONES):
+        self.vocabulario = {}  # raíz -> columna
+        self.categorias = {dimension: {} for dimension in dimensiones}  # categoría -> fila
+        self._conteos = {dimension: sp.csr_matrix((0, 0), dtype=np.int64) for dimension in dimensiones}
+        self._formas = None  # apariciones por (raíz, forma)
+        self.formas = np.empty(0, dtype=object)  # forma más frecuente de cada columna
+
+    def copiar(self):
+        """Copia que se puede actualizar sin cambiar esta (actualizar no modifica las matrices en el sitio)."""
+        copia = copy.copy(self)
+        copia.vocabulario = dict(self.vocabulario)
+        copia.categorias = {dimension: dict(filas) for dimension, filas in self.categorias.items()}
+        copia._conteos = dict(self._conteos)
+        return copia
+
+    def actualizar(self, df_nuevas):
+        """Incorpora filas nuevas. El coste depende solo de df_nuevas."""
+        terminos = _terminos(df_nuevas["frase"])
+        for termino in pd.unique(terminos["raiz"]):
+            self.vocabulario.setdefault(termino, len(self.vocabulario))
+        columnas = terminos["raiz"].map(self.vocabulario).to_numpy()
+        posiciones = terminos["posicion"].to_numpy()
+
+        for dimension, filas in self.categorias.items():
+            categorias = df_nuevas[dimension].to_numpy()[posiciones]
+            presentes = pd.notna(categorias)
+            categorias = categorias[presentes].astype(str)
+            for categoria in pd.unique(categorias):
+                filas.setdefault(categoria, len(filas))
+            nuevos = sp.csr_matrix(
+                (np.ones(len(categorias), dtype=np.int64),
+                 (pd.Series(categorias).map(filas).to_numpy(), columnas[presentes])),
+                shape=(len(filas), len(self.vocabulario)),
+            )
+            self._conteos[dimension] = _ampliar_matriz(self._conteos[dimension], nuevos.shape) + nuevos
+
+        formas = terminos.groupby(["raiz", "forma"]).size()
+        self._formas = formas if self._formas is None else self._formas.add(formas, fill_value=0)
+        mejores = self._formas.groupby(level=0).idxmax()
+        self.formas = np.empty(len(self.vocabulario), dtype=object)
+        self.formas[mejores.index.map(self.vocabulario).to_numpy()] = [forma for _, forma in mejores]
+        return self
+
+    @classmethod
+    def desde_dataframe(cls, df, dimensiones=DIMENSIONES):
+        return cls(dimensiones).actualizar(df)
+
+    def conteos(self, dimension, categoria):
+        """(columnas, apariciones) de los términos de la categoría, sin ordenar."""
+        fila = self.categorias[dimension].get(categoria)
+        matriz = self._conteos[dimension]
+        if fila is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        trozo = slice(matriz.indptr[fila], matriz.indptr[fila + 1])
+        return matriz.indices[trozo], matriz.data[trozo]
+
+    def top_terminos(self, dimension, categoria, k=TOP_TERMINOS):
+        """Tabla [Término, Apariciones] con los k términos más frecuentes de la categoría."""
+        columnas, valores = self.conteos(dimension, categoria)
+        if k is not None and k < len(valores):
+            mejores = np.argpartition(-valores, k)[:k]
+            columnas, valores = columnas[mejores], valores[mejores]
+        # Empates por orden de aparición en el corpus, para que sea estable
+        orden = np.lexsort((columnas, -valores))
+        return pd.DataFrame({
+            "Término": self.formas[columnas[orden]],
+            "Apariciones": valores[orden],
+        })
+
+    def frecuencias(self, dimension, categoria, k=None):
+        """{término: apariciones} de la categoría (p. ej. para una nube de palabras)."""
+        tabla = self.top_terminos(dimension, categoria, k)
+        return dict(zip(tabla["Término"], tabla["Apariciones"].tolist()))
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _terminos_version(version, _datos):
+    return IndiceTerminos.desde_dataframe(_datos.df)
+
+
+def indice_terminos(datos):
+    """Índice de términos cacheado para la versión del Dataset."""
+    return _terminos_version(datos.version, datos)
@@ -0,0 +1,21 @@
+"""Fixtures comunes de los tests."""
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+
+from kneechat import snapshot  # noqa: E402
+from kneechat.clasificacion import Clasificador  # noqa: E402
+from kneechat.datos import RUTA_DATASET, leer_dataset  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def datos():
+    """Dataset del libro incluido (a través del snapshot columnar)."""
+    return leer_dataset()
+
+
+@pytest.fixture(scope="session")
+def clasificador():
+    """Clasificador entrenado con el libro incluido."""
+    return Clasificador(snapshot.leer_origen(RUTA_DATASET))
@@ -0,0 +1,23 @@
+"""Intervalos bootstrap por entrevista (kneechat.bootstrap) y su uso en la tabla del gráfico."""
+import numpy as np
+
+from kneechat.bootstrap import MIN_FRASES_IC, ic_bootstrap, ic_comentarios
+from kneechat.calculo import estadisticas_entrevistas
+
+
+def test_sin_ic_por_debajo_del_minimo():
+    valores = np.array([0.1, 0.2, 0.3, 0.5, -0.5, 0.9])
+    grupos = np.array(["a", "a", "a", "b", "b", "c"])
+    ic = ic_bootstrap(valores, grupos, n_boot=200)
+    assert ic.loc["a", "ic_inferior"] <= ic.loc["a", "media"] <= ic.loc["a", "ic_superior"]
+    assert ic.loc[["b", "c"], ["ic_inferior", "ic_superior"]].isna().all().all()
+    assert ic["n"].tolist() == [3, 2, 1]
+
+
+def test_el_grafico_no_tiene_puntos_sin_ic(datos):
+    # El mínimo de comentarios del selector empieza en MIN_FRASES_IC
+    ic = ic_comentarios(datos.df_comentarios)
+    tabla, excluidas = estadisticas_entrevistas(datos, "Bootstrap", MIN_FRASES_IC, ic=ic)
+    assert excluidas > 0
+    assert (tabla["count_frases"] >= MIN_FRASES_IC).all()
+    assert tabla[["ci_inf", "ci_sup"]].notna().all().all()
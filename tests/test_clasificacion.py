@@ -0,0 +1,58 @@
+"""Clasificación y puntuación por lotes (kneechat.clasificacion, kneechat.puntuacion, kneechat.lotes)."""
+import numpy as np
+import pytest
+
+from kneechat.clasificacion import COLUMNAS, SUBCATEGORIAS, CachePredicciones, clasificar_frases, supera_referencia
+from kneechat.lotes import hash_frase
+from kneechat.puntuacion import CachePuntuaciones, crear_backend, puntuar_frases
+
+FRASES = [
+    "me duele mucho la rodilla por las noches",
+    "¿cuándo podré volver a conducir?",
+    "estoy contento con cómo ha ido la operación",
+    "me duele mucho la rodilla por las noches",
+    "¿tendré que llevar muletas mucho tiempo?",
+    "tengo miedo de que no salga bien",
+]
+
+
+def test_dudas_frecuentes_no_supera_a_la_mayoritaria(clasificador):
+    acierto, referencia, filas = clasificador.validacion["DudasFrecuentes"]
+    assert not supera_referencia(acierto, referencia, filas)
+    assert "DudasFrecuentes" not in clasificador.fiables
+    assert {"tipo", "Tiporeflexión"} <= clasificador.fiables
+
+
+def test_las_columnas_no_fiables_quedan_vacias(clasificador, tmp_path):
+    resultado = clasificar_frases(FRASES, clasificador, cache=CachePredicciones(tmp_path / "c.sqlite"))
+    for columna in COLUMNAS:
+        if columna not in clasificador.fiables:
+            assert resultado[columna].isna().all()
+            assert resultado[f"confianza_{columna}"].isna().all()
+    for columna, tipo in SUBCATEGORIAS.items():
+        assert resultado.loc[resultado["tipo"] != tipo, columna].isna().all()
+    assert resultado["tipo"].notna().all()
+
+
+def test_hilos_procesos_y_cache_dan_lo_mismo(clasificador, tmp_path):
+    hilos = clasificar_frases(FRASES, clasificador, cache=CachePredicciones(tmp_path / "h.sqlite"),
+                              tamano_lote=2, trabajadores=2)
+    cache = CachePredicciones(tmp_path / "p.sqlite")
+    procesos = clasificar_frases(FRASES, clasificador, cache=cache, tamano_lote=2,
+                                 trabajadores=2, procesos=True)
+    en_cache = clasificar_frases(FRASES, clasificador, cache=cache)
+    for resultado in (procesos, en_cache):
+        assert resultado[list(COLUMNAS)].equals(hilos[list(COLUMNAS)])
+        np.testing.assert_allclose(resultado["confianza_tipo"], hilos["confianza_tipo"], atol=1e-6)
+    # Las frases repetidas se clasifican (y se guardan) una vez
+    assert len(cache.buscar(clasificador.version, {hash_frase(f) for f in FRASES})) == len(set(FRASES))
+
+
+def test_puntuacion_con_la_cache_compartida(tmp_path):
+    cache = CachePuntuaciones(tmp_path / "s.sqlite")
+    puntuaciones = puntuar_frases(FRASES, cache=cache, tamano_lote=2, trabajadores=2, procesos=True)
+    assert puntuaciones.dtype == np.float32
+    np.testing.assert_allclose(puntuaciones, crear_backend("lexico").puntuar(FRASES), rtol=1e-6)
+    guardadas = cache.buscar("lexico", [hash_frase(FRASES[0])])
+    assert guardadas == {hash_frase(FRASES[0]): pytest.approx(float(puntuaciones[0]))}
+    np.testing.assert_array_equal(puntuar_frases(FRASES, cache=cache), puntuaciones)
@@ -0,0 +1,66 @@
+"""Registro de cohortes (kneechat.cohortes)."""
+import json
+import logging
+
+from kneechat.cohortes import COHORTE_PRINCIPAL, MANIFIESTO, comparar_sentimiento, leer_registro, resumen_cohorte
+from kneechat.datos import RUTA_DATASET
+from kneechat.ingesta import COLUMNAS, Almacen
+
+
+def escribir_manifiesto(directorio, entradas):
+    (directorio / MANIFIESTO).write_text(json.dumps(entradas), encoding="utf-8")
+
+
+def test_sin_manifiesto_solo_la_principal(tmp_path):
+    cohortes = leer_registro(tmp_path)
+    assert [c.id for c in cohortes] == [COHORTE_PRINCIPAL]
+    assert cohortes[0].ruta == RUTA_DATASET
+
+
+def test_la_principal_sigue_con_manifiesto(tmp_path):
+    escribir_manifiesto(tmp_path, [
+        {"id": "hospital_b", "nombre": "Hospital B", "sitio": "B", "oleada": "2025", "fichero": "hospital_b.arrow"},
+    ])
+    principal, hospital_b = leer_registro(tmp_path)
+    assert principal.id == COHORTE_PRINCIPAL and principal.ruta == RUTA_DATASET
+    assert hospital_b.nombre == "Hospital B"
+    assert hospital_b.ruta == tmp_path / "hospital_b.arrow"
+
+
+def test_el_manifiesto_se_superpone_a_la_principal(tmp_path):
+    escribir_manifiesto(tmp_path, [
+        {"id": "hospital_b", "fichero": "hospital_b.arrow"},
+        {"id": COHORTE_PRINCIPAL, "nombre": "Hospital A", "sitio": "A"},
+    ])
+    cohortes = leer_registro(tmp_path)
+    assert [c.id for c in cohortes] == [COHORTE_PRINCIPAL, "hospital_b"]
+    assert cohortes[0].nombre == "Hospital A" and cohortes[0].sitio == "A"
+    assert cohortes[0].ruta == RUTA_DATASET
+    assert cohortes[1].nombre == "hospital_b"
+
+
+def test_las_entradas_sin_fichero_se_ignoran(tmp_path, caplog):
+    escribir_manifiesto(tmp_path, [
+        {"id": "sin_fichero", "nombre": "Sin fichero"},
+        {"id": "hospital_b", "fichero": "hospital_b.arrow"},
+    ])
+    with caplog.at_level(logging.WARNING, logger="kneechat.cohortes"):
+        cohortes = leer_registro(tmp_path)
+    assert [c.id for c in cohortes] == [COHORTE_PRINCIPAL, "hospital_b"]
+    assert all(c.ruta is not None for c in cohortes)
+    assert "sin_fichero" in caplog.text
+
+
+def test_el_resumen_de_la_principal_incluye_la_ingesta(datos, tmp_path):
+    principal = leer_registro(tmp_path)[0]
+    almacen = Almacen(tmp_path / "almacen")
+    nuevas = datos.df[list(COLUMNAS)].iloc[:30].assign(num_entrevista="N_1000")
+    almacen.anadir(nuevas, "N_1000.parquet")
+
+    sin_ingesta = resumen_cohorte(principal, None)
+    con_ingesta = resumen_cohorte(principal, almacen.directorio)
+    assert sin_ingesta["frases_totales"] == len(datos.df)
+    assert con_ingesta["frases_totales"] == len(datos.df) + len(nuevas)
+    assert con_ingesta["pacientes_totales"] == sin_ingesta["pacientes_totales"] + 1
+    tabla = comparar_sentimiento([principal], almacen.directorio)
+    assert tabla["Frases"].tolist() == [con_ingesta["frases_totales"]]
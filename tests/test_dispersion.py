@@ -0,0 +1,69 @@
+"""Gráfico de sentimiento por entrevista (kneechat.dispersion): modos y tope de tamaño."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from kneechat.calculo import estadisticas_entrevistas
+from kneechat.dispersion import (
+    MAX_BYTES_FIGURA, NUM_BANDAS, UMBRAL_BANDAS, UMBRAL_WEBGL, bandas_cuantiles, figura_sentimiento_entrevistas,
+)
+from kneechat.sentimiento import bucketizar_sentimiento
+
+
+def entrevistas_sinteticas(n, semilla=0):
+    """Tabla con las columnas que app.py pasa al gráfico, ya ordenada."""
+    rng = np.random.default_rng(semilla)
+    frases = rng.integers(3, 21, size=n)
+    df = pd.DataFrame({
+        "num_entrevista": [f"P_{i}" for i in range(n)],
+        "mean_robertuito": np.sort(rng.uniform(-1, 1, size=n)),
+        "ci_sup": rng.uniform(0, 0.4, size=n),
+        "ci_inf": rng.uniform(0, 0.4, size=n),
+        "count_frases": frases,
+        "point_size": frases * 2,
+    })
+    df["Sentimiento"] = bucketizar_sentimiento(df["mean_robertuito"])
+    return df
+
+
+def tamano_json(fig):
+    return len(fig.to_json().encode("utf-8"))
+
+
+@pytest.mark.parametrize("n, esperado", [
+    (41, "puntos"),
+    (UMBRAL_WEBGL, "puntos"),
+    (UMBRAL_WEBGL + 1, "webgl"),
+    (UMBRAL_BANDAS, "webgl"),
+    (UMBRAL_BANDAS + 1, "bandas"),
+    (200_000, "bandas"),
+])
+def test_modo_y_tope_de_tamano(n, esperado):
+    fig, modo = figura_sentimiento_entrevistas(entrevistas_sinteticas(n))
+    assert modo == esperado
+    assert tamano_json(fig) <= MAX_BYTES_FIGURA
+
+
+def test_acotar_el_rango_vuelve_a_los_puntos():
+    df = entrevistas_sinteticas(50_000)
+    fig, modo = figura_sentimiento_entrevistas(df.iloc[20_000:20_000 + UMBRAL_BANDAS])
+    assert modo == "webgl"
+    assert tamano_json(fig) <= MAX_BYTES_FIGURA
+    # El eje x conserva la posición en el orden global
+    assert min(min(traza.x) for traza in fig.data) >= 20_000
+
+
+def test_bandas_cubren_todas_las_entrevistas():
+    df = entrevistas_sinteticas(UMBRAL_BANDAS * 3)
+    bandas = bandas_cuantiles(df)
+    assert len(bandas) == NUM_BANDAS
+    assert bandas["entrevistas"].sum() == len(df)
+    assert (bandas["p05"] <= bandas["mediana"]).all() and (bandas["mediana"] <= bandas["p95"]).all()
+    assert bandas["mediana"].is_monotonic_increasing
+
+
+def test_libro_bajo_el_tope(datos):
+    tabla, _ = estadisticas_entrevistas(datos)
+    fig, modo = figura_sentimiento_entrevistas(tabla)
+    assert modo == "puntos"
+    assert tamano_json(fig) <= MAX_BYTES_FIGURA
@@ -0,0 +1,89 @@
+"""Caché de figuras (kneechat.figuras): memoria acotada y figuras cerradas."""
+import itertools
+import tracemalloc
+
+import matplotlib.pyplot as plt
+import pytest
+
+from kneechat import figuras
+from kneechat.agregados import CuboAgregados
+
+SELECCIONES = [["Frases", "Pacientes"], ["Frases"], ["Pacientes"], ["Pacientes", "Frases"]]
+RERUNS = 300
+# Crecimiento de memoria permitido en los reruns tras el calentamiento
+MAX_CRECIMIENTO = 1024 * 1024
+
+
+@pytest.fixture
+def cubo(datos):
+    return CuboAgregados(datos.df, datos.df_relevante)
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    figuras.limpiar_cache()
+    yield
+    figuras.limpiar_cache()
+
+
+def reruns(cubo, version):
+    """Un rerun por combinación de selecciones de los dos multiselect, en bucle."""
+    for sel_dudas, sel_reflexion in itertools.cycle(itertools.product(SELECCIONES, SELECCIONES)):
+        figuras.figura_barras_frecuencia(cubo, version, "DudasFrecuentes", sel_dudas)
+        figuras.figura_barras_frecuencia(cubo, version, "Tiporeflexión", sel_reflexion)
+        yield
+
+
+def test_reruns_no_acumulan_memoria(datos, cubo):
+    rerun = reruns(cubo, datos.version)
+    for _ in range(len(SELECCIONES) ** 2):
+        next(rerun)
+    # Dos dimensiones x tres selecciones distintas (el orden no cuenta)
+    assert len(figuras._cache) == 6
+    bytes_cache = figuras._cache.bytes_totales()
+
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        for _ in range(RERUNS):
+            next(rerun)
+        crecimiento = tracemalloc.get_traced_memory()[0] - antes
+    finally:
+        tracemalloc.stop()
+    assert crecimiento < MAX_CRECIMIENTO
+    assert len(figuras._cache) == 6
+    assert figuras._cache.bytes_totales() == bytes_cache
+    assert not plt.get_fignums()
+
+
+def test_figuras_cerradas_sin_cache(datos, cubo):
+    rerun = reruns(cubo, datos.version)
+    for _ in range(3):
+        figuras.limpiar_cache()
+        next(rerun)
+    assert not plt.get_fignums()
+
+
+def test_versiones_nuevas_no_superan_el_limite():
+    for version in range(figuras.MAX_FIGURAS + 10):
+        figuras._cache.put((str(version), "barras_DudasFrecuentes", ("Frases",)), b"png")
+    assert len(figuras._cache) == figuras.MAX_FIGURAS
+    assert figuras._cache.get(("0", "barras_DudasFrecuentes", ("Frases",))) is None
+
+
+def test_cache_lru_descarta_la_menos_usada():
+    cache = figuras.CacheLRU(max_entradas=3)
+    for clave in "abc":
+        cache.put(clave, clave.encode())
+    assert cache.get("a") == b"a"  # "a" pasa a ser la más reciente
+    cache.put("d", b"d")
+    assert cache.get("b") is None
+    assert [cache.get(clave) for clave in "acd"] == [b"a", b"c", b"d"]
+
+
+def test_obtener_no_guarda_none():
+    cache = figuras.CacheLRU()
+    assert cache.obtener("vacia", lambda: None) is None
+    assert len(cache) == 0
+    assert cache.obtener("png", lambda: b"png") == b"png"
+    assert cache.obtener("png", lambda: pytest.fail("no debería recalcular")) == b"png"
@@ -0,0 +1,225 @@
+"""Ingesta incremental (kneechat.ingesta) y Dataset.ampliar."""
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kneechat.bootstrap import ic_comentarios
+from kneechat.busqueda import IndiceBusqueda
+from kneechat.clasificacion import CachePredicciones, clasificar_frases
+from kneechat.datos import TIPO_COMENTARIO, Dataset
+from kneechat.ingesta import COLUMNAS, INDICES, Almacen, Completador, DatosVivos, ingerir
+from kneechat.navegador import COLUMNAS_FILTRO, IndiceFrases
+from kneechat.pacientes import MatrizPacientes
+from kneechat.puntuacion import CachePuntuaciones, puntuar_frases
+from kneechat.terminos import DIMENSIONES, IndiceTerminos, indice_terminos
+
+CONSULTAS = ["anestesia", "espera", "dolor", "tiempo de espera operación"]
+
+
+def entrevistas_nuevas(datos, n, prefijo="N"):
+    """Copias de las primeras n entrevistas con otro identificador, una por fichero."""
+    df = datos.df[list(COLUMNAS)].astype({"num_entrevista": str})
+    for i, (_, filas) in enumerate(df.groupby("num_entrevista", sort=False)):
+        if i == n:
+            break
+        yield f"{prefijo}_{i + 1000}", filas.assign(num_entrevista=f"{prefijo}_{i + 1000}")
+
+
+@pytest.fixture
+def vivos(datos, tmp_path):
+    return DatosVivos(datos, Almacen(tmp_path / "almacen"))
+
+
+def ingerir_nuevas(datos, vivos, tmp_path, n, prefijo):
+    entrada = tmp_path / f"entrada_{prefijo}"
+    entrada.mkdir()
+    for entrevista, filas in entrevistas_nuevas(datos, n, prefijo):
+        filas.to_parquet(entrada / f"{entrevista}.parquet", index=False)
+    ingeridos, rechazados = ingerir(entrada, vivos.almacen, set(datos.df["id_entrevista"]))
+    assert len(ingeridos) == n and not rechazados
+    return vivos.actualizar()
+
+
+def test_ampliar_es_como_construir_con_todas_las_filas(datos):
+    corte = len(datos.df) - 40
+    origen = datos.df[list(COLUMNAS)]
+    nuevas = origen.iloc[corte:].assign(num_entrevista=origen["num_entrevista"].iloc[corte:].astype(str) + "_b")
+    base = Dataset(origen.iloc[:corte], "base")
+    ampliado = base.ampliar(nuevas, "ampliado")
+    completo = Dataset(ampliado.df[list(COLUMNAS)], "completo")
+
+    assert ampliado.version == "ampliado" and len(base.df) == corte
+    for vista in ("df", "df_relevante", "df_comentarios"):
+        a, b = getattr(ampliado, vista), getattr(completo, vista)
+        assert a.index.equals(b.index), vista
+        assert a.astype(object).equals(b.astype(object)), vista
+    assert dict(ampliado.categorias) == dict(completo.categorias)
+    with pytest.raises(TypeError):
+        ampliado.df["frase"] = ""
+
+
+def test_ampliar_varias_veces_solo_anade_trozos(datos):
+    origen = datos.df[list(COLUMNAS)]
+    cortes = [0, 300, 500, 600, len(origen)]
+    trozos = [
+        origen.iloc[i:j].assign(num_entrevista=origen["num_entrevista"].iloc[i:j].astype(str) + f"_{n}")
+        for n, (i, j) in enumerate(zip(cortes, cortes[1:]))
+    ]
+    ampliado = Dataset(trozos[0], "0")
+    for n, nuevas in enumerate(trozos[1:], 1):
+        anterior, ampliado = ampliado, ampliado.ampliar(nuevas, str(n))
+        # Las filas anteriores se reutilizan sin concatenar
+        assert ampliado._trozos["df"][:-1] == anterior._trozos["df"]
+        assert all(marco is None for marco in ampliado._marcos.values())
+    completo = Dataset(pd.concat(trozos, ignore_index=True), "completo")
+
+    assert len(ampliado) == len(completo.df)
+    for inicio in (0, 250, 300, 550, len(origen) - 1, len(origen)):
+        a, b = ampliado.filas(inicio), completo.df.iloc[inicio:]
+        assert a.index.equals(b.index), inicio
+        assert a.astype(object).equals(b.astype(object)), inicio
+    for vista in ("df", "df_relevante", "df_comentarios"):
+        a, b = getattr(ampliado, vista), getattr(completo, vista)
+        assert a.astype(object).equals(b.astype(object)), vista
+        assert getattr(ampliado, vista) is a
+    assert dict(ampliado.categorias) == dict(completo.categorias)
+
+
+def test_el_tiempo_de_ampliar_no_crece_con_las_filas_existentes(datos):
+    origen = datos.df[list(COLUMNAS)].astype({"num_entrevista": str})
+    nuevas = origen.iloc[:40].assign(num_entrevista="nueva")
+
+    def minimo(copias):
+        base = Dataset(pd.concat(
+            [origen.assign(num_entrevista=origen["num_entrevista"] + f"_{i}") for i in range(copias)],
+            ignore_index=True,
+        ), "base")
+        base.ampliar(nuevas, "calentamiento")
+        segundos = []
+        for _ in range(9):
+            inicio = time.perf_counter()
+            base.ampliar(nuevas, "ampliado")
+            segundos.append(time.perf_counter() - inicio)
+        return min(segundos)
+
+    # Con ~600.000 filas existentes concatenarlo todo en cada ampliación
+    # tarda de 2 a 3 veces lo que con el libro; solo con las nuevas, lo mismo
+    assert minimo(1000) < 1.5 * minimo(1)
+
+
+def test_los_indices_se_amplian_con_las_filas_nuevas(datos, vivos, tmp_path):
+    inicial = vivos.estado
+    for nombre in INDICES:
+        getattr(inicial.indices, nombre)
+    estado = ingerir_nuevas(datos, vivos, tmp_path, 5, "N")
+    assert len(estado.datos.df) > len(datos.df)
+
+    completo = Dataset(estado.datos.df[list(COLUMNAS)], "completo")
+    frases = IndiceFrases(completo.df)
+    for columna in COLUMNAS_FILTRO:
+        assert np.array_equal(estado.indices.frases._codigos[columna], frases._codigos[columna]), columna
+        assert estado.indices.frases.valores(columna) == frases.valores(columna), columna
+    busqueda = IndiceBusqueda(completo.df["frase"])
+    for consulta in CONSULTAS:
+        posiciones, puntuaciones = busqueda.puntuar(consulta)
+        incremental = estado.indices.busqueda.puntuar(consulta)
+        assert np.array_equal(incremental[0], posiciones), consulta
+        np.testing.assert_allclose(incremental[1], puntuaciones, rtol=1e-5)
+    terminos = IndiceTerminos.desde_dataframe(completo.df)
+    for dimension in DIMENSIONES:
+        assert estado.indices.terminos.categorias[dimension].keys() == terminos.categorias[dimension].keys()
+        for categoria in terminos.categorias[dimension]:
+            a = estado.indices.terminos.top_terminos(dimension, categoria, None)
+            b = terminos.top_terminos(dimension, categoria, None)
+            assert a.sort_values("Término", ignore_index=True).equals(b.sort_values("Término", ignore_index=True))
+    pacientes = MatrizPacientes.desde_dataframe(completo.df)
+    a = pacientes.coocurrencia("DudasFrecuentes", "Tiporeflexión")
+    b = estado.indices.pacientes.coocurrencia("DudasFrecuentes", "Tiporeflexión").loc[a.index, a.columns]
+    assert (a.to_numpy() == b.to_numpy()).all()
+    assert list(estado.indices.pacientes.ids) == list(pacientes.ids)
+    ic = ic_comentarios(completo.df_comentarios)
+    assert estado.indices.intervalos.index.equals(ic.index)
+    np.testing.assert_allclose(estado.indices.intervalos["media"], ic["media"])
+
+    # El estado anterior, que otras sesiones pueden estar usando, no cambia
+    assert len(inicial.indices.frases) == len(inicial.datos.df) == len(datos.df)
+    assert inicial.indices.busqueda.n_frases == len(datos.df)
+    assert inicial.indices.terminos is indice_terminos(datos)
+    assert len(inicial.indices.pacientes) == inicial.indices.pacientes._conteos.shape[0] == datos.df["id_entrevista"].nunique()
+    assert inicial.indices.terminos.formas.size == len(inicial.indices.terminos.vocabulario)
+    assert len(inicial.indices.intervalos) == len(ic_comentarios(datos.df_comentarios))
+
+
+def test_indices_no_pedidos_se_calculan_al_pedirlos(datos, vivos, tmp_path):
+    vivos.estado.indices.frases
+    estado = ingerir_nuevas(datos, vivos, tmp_path, 2, "M")
+    assert set(estado.indices._calculados) == {"frases"}
+    assert estado.indices.busqueda.n_frases == len(estado.datos.df)
+    assert estado.indices.busqueda is estado.indices.busqueda
+
+
+def completador(clasificador, tmp_path):
+    return Completador(clasificador=clasificador, cache_predicciones=CachePredicciones(tmp_path / "c.sqlite"),
+                       cache_puntuaciones=CachePuntuaciones(tmp_path / "s.sqlite"))
+
+
+def test_las_frases_sin_tipo_ni_sentimiento_se_completan_al_ingerir(datos, clasificador, vivos, tmp_path):
+    _, filas = next(entrevistas_nuevas(datos, 1, "C"))
+    filas = filas.reset_index(drop=True)
+    sin_tipo = filas.index % 2 == 0
+    sin_sentimiento = ~sin_tipo & (filas["tipo"] == TIPO_COMENTARIO).to_numpy()
+    assert sin_sentimiento.any()
+    incompletas = filas.copy()
+    incompletas.loc[sin_tipo, ["tipo", "DudasFrecuentes", "Tiporeflexión", "sent_robertuito"]] = None
+    incompletas.loc[sin_sentimiento, "sent_robertuito"] = None
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    incompletas.to_parquet(entrada / "C.parquet", index=False)
+
+    ingeridos, rechazados = ingerir(entrada, vivos.almacen, set(datos.df["id_entrevista"]),
+                                    completador(clasificador, tmp_path))
+    assert len(ingeridos) == 1 and not rechazados
+    particion = vivos.almacen.leer(ingeridos)
+
+    # Las frases completas se escriben tal cual
+    completas = ~sin_tipo & ~sin_sentimiento
+    for columna in COLUMNAS:
+        assert particion.loc[completas, columna].astype(object).equals(filas.loc[completas, columna].astype(object))
+    # Las demás, con las etiquetas del clasificador y la puntuación del backend
+    predicciones = clasificar_frases(filas.loc[sin_tipo, "frase"].tolist(), clasificador,
+                                     cache=CachePredicciones(tmp_path / "otra.sqlite"))
+    assert particion.loc[sin_tipo, "tipo"].astype(str).tolist() == predicciones["tipo"].tolist()
+    assert particion["tipo"].notna().all()
+    comentarios = (particion["tipo"] == TIPO_COMENTARIO).to_numpy()
+    puntuadas = comentarios & (sin_tipo | sin_sentimiento)
+    np.testing.assert_allclose(
+        particion.loc[puntuadas, "sent_robertuito"],
+        puntuar_frases(particion.loc[puntuadas, "frase"].tolist(), cache=CachePuntuaciones(tmp_path / "otra.sqlite")),
+        rtol=1e-6,
+    )
+    assert particion.loc[comentarios, "sent_robertuito"].notna().all()
+
+    estado = vivos.actualizar()
+    nuevas = estado.datos.filas(len(datos))
+    assert nuevas.loc[nuevas["tipo"] == TIPO_COMENTARIO, "Sentimiento"].notna().all()
+
+
+def test_sin_modelo_de_tipo_fiable_se_rechazan_las_frases_sin_tipo(datos, clasificador, vivos, tmp_path):
+    no_fiable = copy.copy(clasificador)
+    no_fiable.fiables = clasificador.fiables - {"tipo"}
+    _, filas = next(entrevistas_nuevas(datos, 1, "R"))
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    filas.assign(tipo=None, DudasFrecuentes=None, Tiporeflexión=None).to_parquet(entrada / "R.parquet", index=False)
+    # Una subcategoría sin tipo no se puede comprobar: también se rechaza
+    filas.assign(tipo=None, num_entrevista="R_2").to_parquet(entrada / "R_2.parquet", index=False)
+
+    ingeridos, rechazados = ingerir(entrada, vivos.almacen, set(datos.df["id_entrevista"]),
+                                    completador(no_fiable, tmp_path))
+    assert not ingeridos and not vivos.almacen.particiones()
+    errores = dict(rechazados)
+    assert "sin tipo" in errores["R.parquet"][0]
+    assert any("no son de tipo" in error for error in errores["R_2.parquet"])
@@ -0,0 +1,70 @@
+"""Memoria por sesión: las sesiones comparten el Dataset y sus índices."""
+import gc
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from kneechat.arranque import esperar_precalentamiento
+from kneechat.datos import RUTA_DATASET, cargar_dataset
+
+RAIZ = Path(__file__).resolve().parent.parent
+PESTANAS = ("Categorización general", "Dudas y reflexiones", "Análisis de sentimiento")
+# Una tanda puede costar por sesión como mucho esto veces la primera
+MAX_CRECIMIENTO = 1.5
+TANDAS = (2, 4)
+
+
+def abrir_sesion():
+    at = AppTest.from_file(str(RAIZ / "app.py"), default_timeout=600)
+    for pestana in PESTANAS:
+        at.session_state["pestana"] = pestana
+        at.run()
+        assert not at.exception, at.exception[0].message
+    return at
+
+
+def dataframes_completos(n):
+    """DataFrames vivos con las n filas del Dataset (el original, vistas o copias)."""
+    gc.collect()
+    return sum(1 for objeto in gc.get_objects() if isinstance(objeto, pd.DataFrame) and len(objeto) == n)
+
+
+def test_el_dataset_compartido_es_de_solo_lectura():
+    datos = cargar_dataset(RUTA_DATASET)
+    with pytest.raises(TypeError):
+        datos.df["x"] = 0
+    with pytest.raises(TypeError):
+        datos.df_comentarios.sort_values("sent_robertuito", inplace=True)
+    with pytest.raises(TypeError):
+        datos.df = None
+    derivado = datos.df[datos.df["tipo"] == datos.df["tipo"].iat[0]]
+    derivado["x"] = 0
+    assert "x" not in datos.df.columns
+
+
+def test_la_memoria_por_sesion_no_crece_con_las_sesiones(monkeypatch):
+    monkeypatch.chdir(RAIZ)
+    n_frases = len(cargar_dataset(RUTA_DATASET).df)
+    # La primera sesión llena las cachés compartidas (índices, figuras, ...)
+    sesiones = [abrir_sesion()]
+    esperar_precalentamiento()
+    compartidos = dataframes_completos(n_frases)
+    tracemalloc.start()
+    try:
+        anterior, costes = tracemalloc.get_traced_memory()[0], []
+        for objetivo in TANDAS:
+            nuevas = objetivo + 1 - len(sesiones)
+            sesiones.extend(abrir_sesion() for _ in range(nuevas))
+            gc.collect()
+            retenida = tracemalloc.get_traced_memory()[0]
+            costes.append((retenida - anterior) / nuevas)
+            anterior = retenida
+    finally:
+        tracemalloc.stop()
+    # Cada sesión guarda el estado de sus widgets, no una copia del Dataset
+    assert dataframes_completos(n_frases) == compartidos
+    primera = max(costes[0], 2**20)
+    assert all(coste < MAX_CRECIMIENTO * primera for coste in costes), costes
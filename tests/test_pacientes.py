@@ -0,0 +1,42 @@
+"""Matriz pacientes x categorías (kneechat.pacientes)."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from kneechat.pacientes import MatrizPacientes
+
+DUDAS, REFLEXIONES = "DudasFrecuentes", "Tiporeflexión"
+
+
+def test_copiar_y_actualizar_es_como_construir_de_una_vez(datos):
+    df = datos.df
+    completa = MatrizPacientes.desde_dataframe(df)
+    incremental = MatrizPacientes.desde_dataframe(df.iloc[:300]).copiar().actualizar(df.iloc[300:])
+    a = completa.coocurrencia(DUDAS, REFLEXIONES)
+    b = incremental.coocurrencia(DUDAS, REFLEXIONES).loc[a.index, a.columns]
+    assert (a.to_numpy() == b.to_numpy()).all()
+    np.testing.assert_allclose(completa.sentimiento_medio(), incremental.sentimiento_medio().loc[completa.ids])
+    paciente = completa.ids[len(completa) // 2]
+    assert completa.perfil(paciente)[0].equals(incremental.perfil(paciente)[0])
+
+
+def test_actualizar_la_copia_no_cambia_el_original(datos):
+    df = datos.df
+    original = MatrizPacientes.desde_dataframe(df.iloc[:100])
+    antes = original.coocurrencia(DUDAS, REFLEXIONES).copy()
+    forma, pacientes = original._conteos.shape, dict(original.pacientes)
+
+    ampliada = original.copiar().actualizar(df.iloc[100:])
+    assert len(ampliada) > len(original)
+    assert original._conteos.shape == forma and original.pacientes == pacientes
+    assert original.coocurrencia(DUDAS, REFLEXIONES).equals(antes)
+    assert len(original.sentimiento_medio()) == len(pacientes)
+
+
+def test_consultas_concurrentes(datos):
+    matriz = MatrizPacientes.desde_dataframe(datos.df)
+    esperada = MatrizPacientes.desde_dataframe(datos.df).coocurrencia(DUDAS, REFLEXIONES)
+    with ThreadPoolExecutor(8) as pool:
+        tablas = list(pool.map(lambda _: matriz.coocurrencia(DUDAS, REFLEXIONES), range(32)))
+    assert all(tabla is tablas[0] for tabla in tablas)
+    assert tablas[0].equals(esperada)
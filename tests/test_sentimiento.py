@@ -0,0 +1,71 @@
+"""Bucketizado de sentimiento (kneechat.sentimiento) frente a clasificar_sentimiento."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from kneechat.metricas import MetricasKPI
+from kneechat.sentimiento import ORDEN_SENTIMIENTO, UMBRALES, bucketizar_sentimiento, clasificar_sentimiento
+
+
+def valores_frontera(tipo):
+    """Cada umbral, justo a ambos lados de él y los extremos, en el tipo dado."""
+    valores = [-1.0, 0.0, 1.0]
+    for umbral in np.asarray(UMBRALES, dtype=tipo):
+        valores += [umbral, np.nextafter(umbral, tipo(-np.inf)), np.nextafter(umbral, tipo(np.inf))]
+    return np.array(valores, dtype=tipo)
+
+
+def esperado(valores):
+    return [clasificar_sentimiento(valor) for valor in valores]
+
+
+@pytest.mark.parametrize("tipo", [np.float64, np.float32])
+def test_equivalente_en_las_fronteras(tipo):
+    valores = valores_frontera(tipo)
+    assert list(bucketizar_sentimiento(valores)) == esperado(valores)
+
+
+@pytest.mark.parametrize("tipo", [np.float64, np.float32])
+def test_equivalente_en_valores_aleatorios(tipo):
+    valores = np.random.default_rng(0).uniform(-1, 1, 20_000).astype(tipo)
+    assert list(bucketizar_sentimiento(pd.Series(valores))) == esperado(valores)
+
+
+def test_umbrales_en_float32():
+    # float32(0.3) pasado a float64 es 0.30000001: no debe cambiar de categoría
+    valores = np.array([0.3, -0.3, 0.6, -0.6], dtype=np.float32)
+    assert list(bucketizar_sentimiento(valores)) == ["Neutral", "Neutral", "Positivo", "Negativo"]
+
+
+def test_categorical_ordenado_con_nulos():
+    serie = pd.Series([0.9, np.nan, -0.9], index=[5, 6, 7], dtype="float32")
+    resultado = bucketizar_sentimiento(serie)
+    assert resultado.index.equals(serie.index)
+    assert resultado.cat.ordered
+    assert list(resultado.cat.categories) == ORDEN_SENTIMIENTO
+    assert resultado.iloc[0] == "Muy positivo" and pd.isna(resultado.iloc[1])
+
+
+def test_umbrales_configurables():
+    valores = np.array([-0.5, -0.15, 0.0, 0.15, 0.5])
+    resultado = bucketizar_sentimiento(valores, umbrales=(-0.4, -0.1, 0.1, 0.4))
+    assert list(resultado) == ORDEN_SENTIMIENTO
+
+
+def test_columna_del_dataset(datos):
+    df = datos.df
+    con_valor = df["sent_robertuito"].notna()
+    assert df.loc[~con_valor, "Sentimiento"].isna().all()
+    assert list(df.loc[con_valor, "Sentimiento"]) == esperado(df.loc[con_valor, "sent_robertuito"])
+
+
+def test_metricas_cuentan_con_los_valores_float32():
+    df = pd.DataFrame({
+        "num_entrevista": ["A", "A", "B", "B"],
+        "tipo": "Comentario/reflexión",
+        "sent_robertuito": np.array([0.3, -0.3, 0.6, -0.6], dtype=np.float32),
+    })
+    conteos = MetricasKPI.desde_dataframe(df).comentarios_por_sentimiento()
+    assert conteos.to_dict() == {
+        "Muy negativo": 0, "Negativo": 1, "Neutral": 2, "Positivo": 1, "Muy positivo": 0,
+    }
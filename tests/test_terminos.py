@@ -0,0 +1,40 @@
+"""Índice de términos por categoría (kneechat.terminos)."""
+from kneechat.terminos import DIMENSIONES, IndiceTerminos
+
+
+def tops(indice):
+    return {
+        (dimension, categoria): indice.top_terminos(dimension, categoria, None)
+        for dimension in DIMENSIONES for categoria in indice.categorias[dimension]
+    }
+
+
+def ordenada(tabla):
+    return tabla.sort_values("Término").reset_index(drop=True)
+
+
+def test_copiar_y_actualizar_es_como_construir_de_una_vez(datos):
+    df = datos.df
+    completo = IndiceTerminos.desde_dataframe(df)
+    incremental = IndiceTerminos.desde_dataframe(df.iloc[:300]).copiar().actualizar(df.iloc[300:])
+    esperado, obtenido = tops(completo), tops(incremental)
+    assert obtenido.keys() == esperado.keys()
+    for clave, tabla in esperado.items():
+        # Los empates pueden salir en otro orden (el vocabulario se numera por aparición)
+        assert ordenada(obtenido[clave]).equals(ordenada(tabla)), clave
+
+
+def test_actualizar_la_copia_no_cambia_el_original(datos):
+    df = datos.df
+    original = IndiceTerminos.desde_dataframe(df.iloc[:100])
+    antes = tops(original)
+    formas = {d: original._conteos[d].shape for d in DIMENSIONES}
+    vocabulario = dict(original.vocabulario)
+
+    ampliado = original.copiar().actualizar(df.iloc[100:])
+    assert len(ampliado.vocabulario) > len(vocabulario)
+    assert original.vocabulario == vocabulario
+    assert {d: original._conteos[d].shape for d in DIMENSIONES} == formas
+    assert tops(original).keys() == antes.keys()
+    for clave, tabla in antes.items():
+        assert original.top_terminos(*clave, None).equals(tabla), clave